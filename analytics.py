@@ -0,0 +1,253 @@
+"""Cross-instructor analytics over the full evaluation history.
+
+The ratings are read in bulk into NumPy arrays and every statistic is
+computed from them in one vectorized pass:
+
+* per-course and per-year-level averages for each question,
+* each instructor's percentile rank among all instructors, per question,
+* term-over-term averages by submission date,
+* the inter-question correlation matrix.
+
+MySQL pivots the detail rows into one row per evaluation whose ratings come
+as a single string of digits, one per question ('0' where unanswered, values
+outside 0-9 clamped), so the transfer is a few columns per evaluation rather
+than one row per rating.
+The rows are streamed through an unbuffered cursor and decoded a chunk at a
+time into column arrays.
+
+NumPy is optional (pip install numpy); the rest of the app does not need it.
+"""
+import time
+from datetime import datetime
+
+import pymysql
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from models import Instructor, columns, fetch_all
+
+ROWS_PER_CHUNK = 10000
+TERM_MONTHS = 6        # a term is this many months, counted from January (a divisor of 12)
+MIN_RESPONSES = 5      # instructors with fewer answers to a question are not ranked on it
+
+
+class AnalyticsUnavailable(Exception):
+    pass
+
+
+def evaluations_query(questions):
+    """(sql, params) reading (i_id, year level, month number, ratings) per evaluation."""
+    # Clamped to one digit so a stray out-of-range value cannot shift the columns.
+    pivot = ', '.join(['MAX(IF(q_id = %s, LEAST(GREATEST(rating_value, 0), 9), 0))'] * len(questions))
+    return f"""
+        SELECT
+            e.i_id,
+            COALESCE(s.s_year_level, ''),
+            YEAR(e.e_date_submitted) * 12 + MONTH(e.e_date_submitted) - 1,
+            r.ratings
+        FROM (
+            SELECT e_id, CONCAT({pivot}) AS ratings
+            FROM tbl_evaluation_details
+            GROUP BY e_id
+        ) r
+        JOIN tbl_evaluation e ON e.e_id = r.e_id
+        LEFT JOIN tbl_student s ON s.s_schoolID = e.s_schoolID
+        WHERE e.e_date_submitted IS NOT NULL
+    """, [question.q_id for question in questions]
+
+
+def decode_rows(rows, question_count):
+    """One chunk of evaluations_query() rows as column arrays."""
+    i_ids, year_levels, months, ratings = zip(*rows)
+    return (
+        np.array(i_ids, dtype=np.int64),
+        np.array(year_levels, dtype=str),
+        np.array(months, dtype=np.int64),
+        np.frombuffer(''.join(ratings).encode('ascii'), dtype=np.uint8).reshape(len(rows), question_count),
+    )
+
+
+def join_chunks(chunks, question_count):
+    """The decoded chunks as (i_ids, year_levels, months, ratings).
+
+    ``ratings`` is an (evaluations x questions) matrix of 1-9, 0 where a
+    question was not answered.
+    """
+    if not chunks:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=str), np.zeros(0, dtype=np.int64),
+                np.zeros((0, question_count), dtype=np.uint8))
+    i_ids, year_levels, months, digits = (np.concatenate(column) for column in zip(*chunks))
+    ratings = digits - ord('0')
+    ratings[ratings > 9] = 0
+    return i_ids, year_levels, months, ratings
+
+
+def read_evaluations(conn, questions):
+    """The evaluation history as column arrays (see join_chunks)."""
+    chunks = []
+    cursor = conn.cursor(pymysql.cursors.SSCursor)
+    try:
+        cursor.execute(*evaluations_query(questions))
+        while True:
+            rows = cursor.fetchmany(ROWS_PER_CHUNK)
+            if not rows:
+                break
+            chunks.append(decode_rows(rows, len(questions)))
+    finally:
+        cursor.close()
+    return join_chunks(chunks, len(questions))
+
+
+def _optional(values, digits=2):
+    """``values`` rounded, as (nested) lists of floats with None for NaN."""
+    rounded = np.round(values, digits).astype(object)
+    rounded[np.isnan(values)] = None
+    return rounded.tolist()
+
+
+def _group_means(groups, group_count, ratings, answered):
+    """Per-group, per-question (means, answer counts); means are NaN where nothing was answered."""
+    question_count = ratings.shape[1]
+    cells = (groups[:, None] * question_count + np.arange(question_count)).ravel()
+    size = group_count * question_count
+    sums = np.bincount(cells, weights=ratings.ravel(), minlength=size).reshape(group_count, question_count)
+    counts = np.bincount(cells, weights=answered.ravel(), minlength=size).reshape(group_count, question_count)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / counts, counts.astype(np.int64)
+
+
+def _breakdown(labels, groups, ratings, answered):
+    means, _ = _group_means(groups, len(labels), ratings, answered)
+    evaluations = np.bincount(groups, minlength=len(labels))
+    return [
+        {'label': label, 'evaluations': int(evaluations[n]), 'means': row}
+        for n, (label, row) in enumerate(zip(labels, _optional(means)))
+    ]
+
+
+def _percentile_ranks(means, counts, min_responses):
+    """Mid-rank percentile of each row within its column, among rows with enough answers."""
+    ranks = np.full(means.shape, np.nan)
+    for q in range(means.shape[1]):
+        ranked = counts[:, q] >= min_responses
+        values = means[ranked, q]
+        if not len(values):
+            continue
+        ordered = np.sort(values)
+        below = np.searchsorted(ordered, values, side='left')
+        tied = np.searchsorted(ordered, values, side='right') - below
+        ranks[ranked, q] = (below + 0.5 * tied) / len(values) * 100
+    return ranks
+
+
+def _trends(months, ratings, answered, term_months):
+    terms, term_index = np.unique(months // term_months, return_inverse=True)
+    means, counts = _group_means(term_index, len(terms), ratings, answered)
+    evaluations = np.bincount(term_index, minlength=len(terms))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        overall = np.nansum(means * counts, axis=1) / counts.sum(axis=1)
+    change = np.diff(overall, prepend=np.nan)
+    trends = []
+    for n, (term, term_overall, term_change, row) in enumerate(zip(terms.tolist(), _optional(overall),
+                                                                   _optional(change), _optional(means))):
+        year, month = divmod(term * term_months, 12)
+        trends.append({
+            'label': f'{year} T{month // term_months + 1}',
+            'evaluations': int(evaluations[n]),
+            'overall': term_overall,
+            'change': term_change,
+            'means': row,
+        })
+    return trends
+
+
+def _correlations(ratings, answered):
+    """Pearson correlation between questions over the evaluations that answered all of them."""
+    complete = ratings[answered.all(axis=1)].astype(np.float64)
+    if len(complete) < 2:
+        return None, len(complete)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        matrix = np.atleast_2d(np.corrcoef(complete, rowvar=False))
+    return _optional(matrix), len(complete)
+
+
+def compute_analytics(questions, instructors, i_ids, year_levels, months, ratings,
+                      term_months=TERM_MONTHS, min_responses=MIN_RESPONSES):
+    """All statistics from the column arrays of read_evaluations(); plain Python values for templates."""
+    answered = ratings > 0
+    ratings = ratings.astype(np.float64)
+
+    instructors = sorted(instructors, key=lambda instructor: instructor.i_id)
+    instructor_ids = np.array([instructor.i_id for instructor in instructors], dtype=np.int64)
+    instructor_index = np.searchsorted(instructor_ids, i_ids)
+    known = instructor_index < len(instructor_ids)
+    known[known] = instructor_ids[instructor_index[known]] == i_ids[known]
+    if not known.all():
+        # Instructors deleted while the rows were being read.
+        instructor_index, year_levels, months = instructor_index[known], year_levels[known], months[known]
+        ratings, answered = ratings[known], answered[known]
+
+    courses, instructor_course = np.unique(np.array([instructor.i_course or '' for instructor in instructors],
+                                                    dtype=str), return_inverse=True)
+    year_labels, year_index = np.unique(year_levels, return_inverse=True)
+
+    overall_means, _ = _group_means(np.zeros(len(ratings), dtype=np.int64), 1, ratings, answered)
+    instructor_means, instructor_counts = _group_means(instructor_index, len(instructors), ratings, answered)
+    percentiles = _percentile_ranks(instructor_means, instructor_counts, min_responses)
+    evaluations_per_instructor = np.bincount(instructor_index, minlength=len(instructors))
+    correlations, complete_evaluations = _correlations(ratings, answered)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        instructor_overall = (np.nansum(instructor_means * instructor_counts, axis=1)
+                              / instructor_counts.sum(axis=1))
+    rows = zip(instructors, evaluations_per_instructor.tolist(), _optional(instructor_overall),
+               _optional(instructor_means), _optional(percentiles, 0))
+    ranking = [
+        {
+            'i_id': instructor.i_id,
+            'name': f'{instructor.i_first_name} {instructor.i_last_name}',
+            'course': instructor.i_course,
+            'evaluations': evaluations,
+            'overall': overall,
+            'means': means,
+            'percentiles': ranks,
+        }
+        for instructor, evaluations, overall, means, ranks in rows if evaluations
+    ]
+    ranking.sort(key=lambda row: -1 if row['overall'] is None else row['overall'], reverse=True)
+
+    return {
+        'questions': list(questions),
+        'evaluation_count': int(len(ratings)),
+        'rating_count': int(answered.sum()),
+        'overall': _optional(overall_means[0]),
+        'by_course': _breakdown([str(c) or 'Unspecified' for c in courses], instructor_course[instructor_index],
+                                ratings, answered),
+        'by_year_level': _breakdown([str(y) or 'Unspecified' for y in year_labels], year_index, ratings, answered),
+        'trends': _trends(months, ratings, answered, term_months),
+        'instructors': ranking,
+        'correlations': correlations,
+        'complete_evaluations': complete_evaluations,
+        'min_responses': min_responses,
+    }
+
+
+def load_analytics(conn, questions, term_months=TERM_MONTHS, min_responses=MIN_RESPONSES):
+    """Read the evaluation history from ``conn`` and compute every statistic."""
+    if np is None:
+        raise AnalyticsUnavailable('The analytics page needs NumPy: pip install numpy')
+    if 12 % term_months:
+        raise ValueError(f'term_months must divide 12, not {term_months}')
+    started = time.perf_counter()
+    instructors = fetch_all(conn, Instructor, f"SELECT {columns(Instructor)} FROM tbl_instructor")
+    columns_read = read_evaluations(conn, questions) if questions else join_chunks([], 0)
+    read_seconds = time.perf_counter() - started
+    result = compute_analytics(questions, instructors, *columns_read,
+                               term_months=term_months, min_responses=min_responses)
+    result['read_ms'] = round(read_seconds * 1000, 1)
+    result['compute_ms'] = round((time.perf_counter() - started - read_seconds) * 1000, 1)
+    result['computed_at'] = datetime.now()
+    return result
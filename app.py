@@ -1,8 +1,37 @@
+import copy
+import io
 import pymysql
-from flask import Flask, render_template, request, url_for, redirect, session, flash, g
+import click
+from flask import (Flask, abort, current_app, render_template, request, url_for, redirect, session, flash, g,
+                   jsonify, make_response, Response, stream_with_context)
+from flask.cli import with_appcontext
+from jinja2 import FileSystemBytecodeCache
 import os
+import time
+from datetime import datetime
 from functools import wraps
 
+from analytics import AnalyticsUnavailable, load_analytics
+from cache import FragmentCache, KeyedVersions, SharedVersion, VersionedCache
+from db_pool import ConnectionPool
+from evaluations import (INSTRUCTOR_EVALUATION_COUNT_SQL, QUESTION_RATING_COUNT_SQL, RATING_SCALE, DuplicateEvaluation,
+                         boolean_query, build_instructor_stats, count_remarks, fetch_remarks, highlight,
+                         rebuild_summary, save_evaluation, search_remarks)
+from exporter import EXPORT_FORMATS, STREAMERS, iter_evaluation_rows
+from importer import CSVImportError, IMPORT_BATCH_SIZE, IMPORT_SPECS, import_csv
+from instrumentation import InstrumentedConnection, QueryRecorder, SlowQueryLog
+from metrics import MetricsRegistry
+from models import (count_approved_students, get_admin_credentials, get_instructor, get_student,
+                    get_student_credentials, get_teacher_credentials, list_instructor_progress,
+                    list_instructors_with_teachers, list_pending_students, list_questions, list_teacher_courses,
+                    list_teacher_instructor_ids, list_teachers)
+from passwords import PasswordHasher, is_hashed
+from rollups import RollupScheduler, read_rollups, rebuild_rollups, refresh_rollups, rollup_status
+from schema import migrate
+from sessions import (MemorySessionStore, PRINCIPAL_KEY, PROFILE_KEY, SQLiteSessionStore,
+                      ServerSideSessionInterface)
+from submission_queue import AlreadyQueued, PENDING_STATES, SubmissionQueue
+
 # --- CONFIGURATION ---
 MYSQL_CONFIG = {
     'host': 'localhost',
@@ -11,44 +40,362 @@ MYSQL_CONFIG = {
     'database': 'evaluation_system',
     'cursorclass': pymysql.cursors.DictCursor
 }
-SECRET_KEY = os.urandom(24)
+DB_POOL = {
+    'min_size': 2,
+    'max_size': 10,
+    'timeout': 5.0,                # seconds to wait for a free connection
+    'recycle': 3600,               # reconnect connections older than this
+    'health_check_interval': 30,   # ping on borrow if idle at least this long
+    'max_idle_time': 300,          # close idle connections above min_size
+}
+ASYNC_DB_POOL = {               # aiomysql pool of the async serving mode (asgi.py)
+    'minsize': 2,
+    'maxsize': 10,
+    'pool_recycle': 3600,
+}
+CACHE_VERSION_DIR = None  # shared by all workers; defaults to <instance>/cache_versions
+ADMIN_COUNTS_TTL = 30     # seconds the admin dashboard counters may be served from cache
+ANALYTICS_TTL = 600            # seconds the analytics page may be served from cache (needs numpy)
+ANALYTICS_TERM_MONTHS = 6      # length of a term in the analytics trends; a divisor of 12
+ANALYTICS_MIN_RESPONSES = 5    # instructors with fewer answers to a question are not ranked on it
+PENDING_PAGE_SIZE = 50
+APPROVAL_CHUNK_SIZE = 500  # rows per UPDATE/commit in bulk approvals
+PAGE_CACHE_SIZE = 500      # rendered results pages / teacher dashboards kept per worker (LRU)
+SLOW_QUERY_MS = 200        # statements at least this slow go to the slow-query log
+SLOW_QUERY_LOG = None      # JSON lines; defaults to <instance>/slow_queries.log
+N_PLUS_ONE_THRESHOLD = 10  # the same statement this often in one request is flagged
+SQL_STATS_HEADERS = False  # send X-DB-* response headers outside debug mode too
+METRICS_DIR = None           # shared by all workers; defaults to <instance>/metrics, serve.py clears it at launch
+METRICS_FLUSH_INTERVAL = 5   # seconds between writes of a worker's metrics file
+METRICS_TOKEN = None         # if set, /metrics requires "Authorization: Bearer <token>"
+SUBMISSION_QUEUE = False       # queue evaluations and write them to MySQL in background batches
+SUBMISSION_QUEUE_PATH = None   # SQLite file shared by all workers; defaults to <instance>/submissions.sqlite3
+SUBMISSION_QUEUE_WORKERS = 2   # drain threads per worker process
+SUBMISSION_BATCH_SIZE = 100    # submissions per MySQL transaction
+ROLLUP_REFRESH_INTERVAL = None # seconds between background refreshes of the report rollups; None: CLI only
+ROLLUP_BATCH_SIZE = 50000      # evaluations folded into the rollups per transaction
+ROLLUP_SETTLE_SECONDS = 60     # evaluations younger than this wait for the next refresh
+PASSWORD_HASHING = {}          # per-role overrides of passwords.DEFAULT_POLICIES
+PASSWORD_HASH_WORKERS = None   # hashing threads per process; defaults to the CPU count
+SESSION_BACKEND = 'sqlite'     # 'sqlite' (shared by all workers), 'memory' (one process) or 'cookie'
+SESSION_PATH = None            # SQLite session store; defaults to <instance>/sessions.sqlite3
+SESSION_MEMORY_MAX_ENTRIES = 10000
+TEMPLATE_CACHE_DIR = None      # compiled templates shared by all workers; defaults to <instance>/template_cache
+SECRET_KEY = None              # shared by all workers; defaults to a key kept in <instance>/secret_key
+
+# Every setting above can be overridden, in this order, by <instance>/settings.py,
+# the file named by $EVALUATION_SETTINGS and FLASK_-prefixed environment
+# variables (FLASK_SECRET_KEY=..., FLASK_MYSQL_CONFIG__password=...).
+
+# --- APPLICATION FACTORY ---
+
+class DeferredSetup:
+    """Routes, hooks and CLI commands recorded here and applied by create_app().
+
+    Endpoints keep the view function names, as with ``@app.route``.
+    """
+
+    def __init__(self):
+        self._registrations = []
+
+    def route(self, rule, **options):
+        def decorator(f):
+            self._registrations.append(lambda app: app.add_url_rule(rule, view_func=f, **options))
+            return f
+        return decorator
+
+    def _hook(name):
+        def decorator(self, f):
+            self._registrations.append(lambda app: getattr(app, name)(f))
+            return f
+        return decorator
+
+    before_request = _hook('before_request')
+    after_request = _hook('after_request')
+    teardown_request = _hook('teardown_request')
+    teardown_appcontext = _hook('teardown_appcontext')
+    del _hook
+
+    def command(self, name):
+        def decorator(f):
+            command = click.command(name)(with_appcontext(f))
+            self._registrations.append(lambda app: app.cli.add_command(command))
+            return command
+        return decorator
+
+    def init_app(self, app):
+        for register in self._registrations:
+            register(app)
+
+setup = DeferredSetup()
+
+def load_secret_key(path):
+    """The key stored at ``path``, created on first use; every worker reads the same one."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(os.urandom(32))
+    try:
+        # link() fails if another process got there first; its key wins.
+        os.link(tmp_path, path)
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp_path)
+    with open(path, 'rb') as f:
+        return f.read()
+
+def create_app(config=None):
+    """Build the app from the settings above, the external config sources and ``config``.
+
+    The pool, caches, logs and queue are module globals, so there is one
+    app per process.
+    """
+    app = Flask(__name__, instance_relative_config=True)
+    app.config.from_object(__name__)
+    # Copies, so settings that override single keys leave the defaults above alone.
+    app.config.update({key: copy.deepcopy(value) for key, value in app.config.items() if isinstance(value, dict)})
+    app.config.from_pyfile('settings.py', silent=True)
+    app.config.from_envvar('EVALUATION_SETTINGS', silent=True)
+    app.config.from_prefixed_env()
+    app.config.update(config or {})
+
+    os.makedirs(app.instance_path, exist_ok=True)
+    if not app.config['SECRET_KEY']:
+        app.config['SECRET_KEY'] = load_secret_key(os.path.join(app.instance_path, 'secret_key'))
+    # Compiled templates go to disk, so a new worker loads bytecode instead of parsing.
+    template_cache_dir = app.config['TEMPLATE_CACHE_DIR'] or os.path.join(app.instance_path, 'template_cache')
+    os.makedirs(template_cache_dir, exist_ok=True)
+    app.jinja_options = dict(app.jinja_options, bytecode_cache=FileSystemBytecodeCache(template_cache_dir))
+
+    init_services(app)
+    setup.init_app(app)
+    return app
+
+def init_services(app):
+    global db_pool, question_cache, admin_counts_cache, slow_query_log, submission_queue, password_hasher
+    global session_store, instructor_versions, results_version, page_cache, analytics_cache, rollup_scheduler
+    db_pool = ConnectionPool(app.config['MYSQL_CONFIG'], **app.config['DB_POOL'])
+
+    cache_version_dir = app.config['CACHE_VERSION_DIR'] or os.path.join(app.instance_path, 'cache_versions')
+    question_cache = VersionedCache('questions', SharedVersion(os.path.join(cache_version_dir, 'questions')))
+    admin_counts_cache = VersionedCache('admin_counts',
+                                        SharedVersion(os.path.join(cache_version_dir, 'admin_counts')),
+                                        ttl=app.config['ADMIN_COUNTS_TTL'])
+    analytics_cache = VersionedCache('analytics', SharedVersion(os.path.join(cache_version_dir, 'analytics')),
+                                     ttl=app.config['ANALYTICS_TTL'])
+    instructor_versions = KeyedVersions(os.path.join(cache_version_dir, 'instructors'))
+    results_version = SharedVersion(os.path.join(cache_version_dir, 'results'))
+    page_cache = FragmentCache('pages', app.config['PAGE_CACHE_SIZE'])
+
+    slow_query_log = SlowQueryLog(app.config['SLOW_QUERY_LOG'] or os.path.join(app.instance_path, 'slow_queries.log'))
+    metrics.configure(app.config['METRICS_DIR'] or os.path.join(app.instance_path, 'metrics'),
+                      flush_interval=app.config['METRICS_FLUSH_INTERVAL'])
+
+    submission_queue = None
+    if app.config['SUBMISSION_QUEUE']:
+        submission_queue = SubmissionQueue(
+            app.config['SUBMISSION_QUEUE_PATH'] or os.path.join(app.instance_path, 'submissions.sqlite3'),
+            db_pool,
+            batch_size=app.config['SUBMISSION_BATCH_SIZE'],
+            workers=app.config['SUBMISSION_QUEUE_WORKERS'],
+            on_saved=record_saved_evaluations,
+        )
+
+    rollup_scheduler = None
+    if app.config['ROLLUP_REFRESH_INTERVAL']:
+        rollup_scheduler = RollupScheduler(
+            db_pool, app.config['ROLLUP_REFRESH_INTERVAL'],
+            batch_size=app.config['ROLLUP_BATCH_SIZE'],
+            settle_seconds=app.config['ROLLUP_SETTLE_SECONDS'],
+            on_error=lambda e: app.logger.warning('Rollup refresh failed: %s', e),
+        )
+
+    password_hasher = PasswordHasher(app.config['PASSWORD_HASHING'], workers=app.config['PASSWORD_HASH_WORKERS'])
+
+    session_store = None
+    if app.config['SESSION_BACKEND'] == 'sqlite':
+        session_store = SQLiteSessionStore(app.config['SESSION_PATH']
+                                           or os.path.join(app.instance_path, 'sessions.sqlite3'))
+    elif app.config['SESSION_BACKEND'] == 'memory':
+        session_store = MemorySessionStore(app.config['SESSION_MEMORY_MAX_ENTRIES'])
+    elif app.config['SESSION_BACKEND'] != 'cookie':
+        raise ValueError(f"Unknown SESSION_BACKEND {app.config['SESSION_BACKEND']!r}")
+    if session_store is not None:
+        app.session_interface = ServerSideSessionInterface(session_store)
+
+def precompile_templates(app):
+    """Compile every template now instead of on first render (before forking, all workers share them)."""
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+def warm_worker(app):
+    """Per-process startup work, run by serve.py in each worker right after the fork."""
+    try:
+        db_pool.warm()
+    except pymysql.err.MySQLError as e:
+        # Not fatal: connections are opened on demand once MySQL is reachable.
+        app.logger.warning('Could not pre-open database connections: %s', e)
+    if submission_queue is not None:
+        submission_queue.start()
+    if rollup_scheduler is not None:
+        rollup_scheduler.start()
+    metrics.flush()
 
-app = Flask(__name__)
-app.config.from_object(__name__)
+def __getattr__(name):
+    # ``app`` (for ``flask --app app``, ``app:app`` in WSGI servers and
+    # ``from app import app``) is built by the factory on first use.
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 # --- DATABASE CONNECTION ---
+db_pool = None
+question_cache = None
+admin_counts_cache = None
+analytics_cache = None
+# Rendered pages are keyed by the versions of what they show: an instructor's
+# version is bumped by new evaluations and by reassigning or deleting it,
+# results_version by rebuilding the summary tables.
+instructor_versions = None
+results_version = None
+page_cache = None
+
 def get_db():
     db = getattr(g, '_database', None)
     if db is None:
-        db = g._database = pymysql.connect(**app.config['MYSQL_CONFIG'])
+        recorder = g.setdefault('_query_recorder', QueryRecorder(current_app.config['SLOW_QUERY_MS'] / 1000))
+        db = g._database = InstrumentedConnection(db_pool.acquire(), recorder)
     return db
 
-@app.teardown_appcontext
+@setup.teardown_appcontext
 def close_connection(exception):
-    db = getattr(g, '_database', None)
+    db = g.pop('_database', None)
     if db is not None:
-        db.close()
+        db_pool.release(db.raw, discard=isinstance(exception, pymysql.err.OperationalError))
+
+# --- SQL INSTRUMENTATION ---
+slow_query_log = None
+
+@setup.after_request
+def add_query_stats(response):
+    app = current_app
+    if not (app.debug or app.config['SQL_STATS_HEADERS']):
+        return response
+    recorder = g.get('_query_recorder') or QueryRecorder()
+    response.headers['X-DB-Query-Count'] = str(recorder.count)
+    response.headers['X-DB-Time-ms'] = f'{recorder.total_time * 1000:.1f}'
+    if app.debug and response.mimetype == 'text/html' and not response.is_streamed:
+        toolbar = render_template('_sql_toolbar.html', recorder=recorder,
+                                  repeated=recorder.repeated(app.config['N_PLUS_ONE_THRESHOLD']))
+        response.set_data(response.get_data(as_text=True).replace('</body>', toolbar + '</body>', 1))
+    return response
+
+@setup.teardown_request
+def log_query_stats(exception):
+    recorder = g.get('_query_recorder')
+    if recorder is None:
+        return
+    app = current_app
+    route = request.endpoint or request.path
+    for sql, seconds in recorder.slow_queries:
+        slow_query_log.write('slow_query', route=route, method=request.method,
+                             duration_ms=round(seconds * 1000, 1), sql=sql)
+    for sql, count in recorder.repeated(app.config['N_PLUS_ONE_THRESHOLD']):
+        app.logger.warning('Possible N+1 query in %s: %d x %s', route, count, sql)
+        slow_query_log.write('n_plus_one', route=route, method=request.method, count=count, sql=sql)
+
+# --- METRICS ---
+metrics = MetricsRegistry()
+requests_total = metrics.counter('http_requests_total', 'Requests handled, by endpoint and status.',
+                                 ('endpoint', 'method', 'status'))
+request_latency = metrics.histogram('http_request_duration_seconds', 'Request latency by endpoint.',
+                                    ('endpoint', 'method'))
+db_queries_total = metrics.counter('db_queries_total', 'SQL statements executed, by endpoint.', ('endpoint',))
+db_request_time = metrics.histogram('db_request_time_seconds', 'Time spent in SQL per request, by endpoint.',
+                                    ('endpoint',))
+evaluations_submitted = metrics.counter('evaluations_submitted_total', 'Evaluations stored.')
+registrations_total = metrics.counter('student_registrations_total', 'Student self-registrations.')
+db_pool_connections = metrics.gauge('db_pool_connections', 'Pooled DB connections by state.', ('state',))
+db_pool_acquired = metrics.counter('db_pool_acquired_total', 'DB connections borrowed from the pool.')
+db_pool_timeouts = metrics.counter('db_pool_timeouts_total', 'Borrows that timed out waiting for a connection.')
+db_pool_wait = metrics.counter('db_pool_wait_seconds_total', 'Time spent waiting to borrow a DB connection.')
+logins_total = metrics.counter('logins_total', 'Login attempts by role and outcome.', ('role', 'outcome'))
+password_check_time = metrics.histogram('password_check_seconds', 'Password verification time, including '
+                                        'waiting for a hashing thread.', ('role',))
+
+def update_pool_metrics():
+    stats = db_pool.stats()
+    db_pool_connections.set(stats['in_use'], state='in_use')
+    db_pool_connections.set(stats['idle'], state='idle')
+    db_pool_acquired.set_total(stats['acquired'])
+    db_pool_timeouts.set_total(stats['timeouts'])
+    db_pool_wait.set_total(stats['wait_time_total'])
+
+@setup.before_request
+def start_request_timer():
+    g._request_started = time.perf_counter()
+
+@setup.after_request
+def record_request_metrics(response):
+    started = g.get('_request_started')
+    if started is None:
+        return response
+    endpoint = request.endpoint or 'unmatched'
+    request_latency.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method)
+    requests_total.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    recorder = g.get('_query_recorder')
+    if recorder is not None:
+        db_queries_total.inc(recorder.count, endpoint=endpoint)
+        db_request_time.observe(recorder.total_time, endpoint=endpoint)
+    update_pool_metrics()
+    metrics.maybe_flush()
+    return response
+
+# --- SUBMISSION QUEUE ---
+submission_queue = None
+
+def record_saved_evaluations(instructor_ids):
+    evaluations_submitted.inc(len(instructor_ids))
+    for instructor_id in set(instructor_ids):
+        instructor_versions.bump(instructor_id)
+
+# --- REPORT ROLLUPS ---
+rollup_scheduler = None  # None unless ROLLUP_REFRESH_INTERVAL is set
+
+@setup.before_request
+def start_rollup_scheduler():
+    if rollup_scheduler is not None:
+        rollup_scheduler.start()
+
+# --- PASSWORDS ---
+password_hasher = None
+
+# --- SESSIONS ---
+session_store = None  # None with SESSION_BACKEND = 'cookie'
+
+@setup.before_request
+def start_submission_queue():
+    # Each worker process drains the queue, including rows left by others.
+    if submission_queue is not None:
+        submission_queue.start()
 
 def init_db():
-    conn = pymysql.connect(
-        host=app.config['MYSQL_CONFIG']['host'],
-        user=app.config['MYSQL_CONFIG']['user'],
-        password=app.config['MYSQL_CONFIG']['password']
-    )
-    
-    with conn.cursor() as cursor:
-        try:
-            with app.open_resource('schema.sql', mode='r') as f:
-                sql_script = f.read().decode('utf8')
-                for statement in sql_script.split(';'):
-                    if statement.strip():
-                        cursor.execute(statement)
-            conn.commit()
-            print("Database initialized successfully!")
-        except Exception as e:
-            print(f"Error during database initialization: {e}")
-        finally:
-            conn.close()
+    """Bring the database schema up to date; existing data is kept."""
+    try:
+        applied = migrate(current_app.config['MYSQL_CONFIG'])
+        print(f"Database is up to date ({len(applied)} migration(s) applied).")
+        return True
+    except Exception as e:
+        print(f"Error during database migration: {e}")
+        return False
 
 # --- DECORATORS (Authorization) ---
 
@@ -71,56 +418,126 @@ def login_required(role):
 
 # --- HELPER FUNCTIONS ---
 
-def get_total_instructors():
-    db = get_db()
-    with db.cursor() as cursor:
-        cursor.execute("SELECT COUNT(*) as count FROM tbl_instructor")
-        return cursor.fetchone()['count'] or 0
+def get_questions():
+    """Ordered question catalogue, cached per process until an admin edits it."""
+    return question_cache.get(lambda: list_questions(get_db()))
+
+def get_admin_counts():
+    """Admin dashboard totals from one query, cached for ADMIN_COUNTS_TTL."""
+    def load():
+        with get_db().cursor() as cursor:
+            cursor.execute("""
+                SELECT
+                    (SELECT COUNT(*) FROM tbl_student WHERE s_status = 'Pending') AS pending_students,
+                    (SELECT COUNT(*) FROM tbl_student) AS total_students,
+                    (SELECT COUNT(*) FROM tbl_teacher) AS total_teachers,
+                    (SELECT COUNT(*) FROM tbl_instructor) AS total_instructors
+            """)
+            return cursor.fetchone()
+    return admin_counts_cache.get(load)
+
+def check_password(stored, password, role):
+    """Verify a login; returns (ok, new_hash) where new_hash should replace the stored value."""
+    started = time.perf_counter()
+    ok, new_hash = password_hasher.check(stored, password, role)
+    password_check_time.observe(time.perf_counter() - started, role=role)
+    logins_total.inc(role=role, outcome='success' if ok else 'failure')
+    return ok, new_hash
+
+def sign_in(principal, profile=None):
+    """Bind the session to a logged-in account ("role:id"); a server-side session gets a new id.
+
+    ``profile`` is cached in the session until the account changes (see
+    forget_profiles); the cookie backend cannot invalidate it, so it is
+    not cached there.
+    """
+    session[PRINCIPAL_KEY] = principal
+    if profile is not None and session_store is not None:
+        session[PROFILE_KEY] = profile
+
+def sign_out(role):
+    if session.get(PRINCIPAL_KEY, '').startswith(f'{role}:'):
+        session.pop(PRINCIPAL_KEY, None)
+        session.pop(PROFILE_KEY, None)
+
+def cached_profile(principal):
+    if session_store is not None and session.get(PRINCIPAL_KEY) == principal:
+        return session.get(PROFILE_KEY)
+    return None
+
+def forget_profiles(role, keys):
+    """Drop the cached profile of these accounts from all of their sessions."""
+    if session_store is not None:
+        session_store.forget_profiles([f'{role}:{key}' for key in keys])
+
+def student_profile(student):
+    return {
+        'id': student.s_schoolID,
+        'status': student.s_status or 'Pending',
+        'email': student.s_email,
+        'year': student.s_year_level
+    }
+
+def results_page_key(endpoint, viewer, instructor_id):
+    return (endpoint, viewer, instructor_id, instructor_versions.get(instructor_id),
+            question_cache.version.get(), results_version.get())
+
+def teacher_dashboard_key(teacher_id, instructor_ids):
+    # Assigning or removing an instructor changes the ID list itself.
+    return ('teacher_dashboard', teacher_id,
+            tuple((instructor_id, instructor_versions.get(instructor_id)) for instructor_id in instructor_ids),
+            admin_counts_cache.version.get(), results_version.get())
+
+def cached_page(key, render):
+    """The page stored under ``key``, or ``render()``'s HTML, which is stored there.
+
+    Sent with an ETag, so a browser revalidating a current page gets a 304.
+    Pages with pending flash messages are rendered fresh (messages show once),
+    and anything but HTML from ``render()`` (e.g. a redirect) is not stored.
+    """
+    if '_flashes' in session:
+        return render()
+    entry = page_cache.get(key)
+    if entry is None:
+        page = render()
+        if not isinstance(page, str):
+            return page
+        entry = page_cache.set(key, page)
+    html, etag = entry
+    response = make_response(('', 304) if request.if_none_match.contains(etag) else html)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 def get_student_evaluation_progress(school_id):
-    db = get_db()
-    total_instructors = get_total_instructors()
-    
-    with db.cursor() as cursor:
-        cursor.execute("""
-            SELECT COUNT(DISTINCT i_id) as count 
-            FROM tbl_evaluation 
-            WHERE s_schoolID = %s
-        """, (school_id,))
-        evaluated_count = cursor.fetchone()['count'] or 0
-        
-        cursor.execute("""
-            SELECT DISTINCT i_id
-            FROM tbl_evaluation 
-            WHERE s_schoolID = %s
-        """, (school_id,))
-        evaluated_ids = [item['i_id'] for item in cursor.fetchall()]
-        
-        if total_instructors > 0:
-            placeholders = ', '.join(['%s'] * len(evaluated_ids))
-            if evaluated_ids:
-                cursor.execute(f"""
-                    SELECT i_id, i_first_name, i_last_name, i_course 
-                    FROM tbl_instructor 
-                    WHERE i_id NOT IN ({placeholders})
-                """, evaluated_ids)
-            else:
-                cursor.execute("SELECT i_id, i_first_name, i_last_name, i_course FROM tbl_instructor")
+    # Counts and the remaining list come from one LEFT JOIN over every instructor.
+    instructors = list_instructor_progress(get_db(), school_id)
+    submissions = submission_queue.for_student(school_id) if submission_queue is not None else []
+    return build_progress(instructors, submissions)
 
-            remaining_instructors_data = cursor.fetchall()
-        else:
-            remaining_instructors_data = []
+def build_progress(instructors, submissions):
+    # Queued submissions are not in MySQL yet but must not be offered again.
+    pending_ids = {s['instructor_id'] for s in submissions if s['status'] in PENDING_STATES}
+    names = {i.i_id: f"{i.i_first_name} {i.i_last_name}" for i in instructors}
+    for submission in submissions:
+        submission['instructor_name'] = names.get(submission['instructor_id'], 'Unknown instructor')
+
+    remaining_instructors_data = [i for i in instructors if not i.evaluated and i.i_id not in pending_ids]
+    total_instructors = len(instructors)
+    evaluated_count = sum(1 for i in instructors if i.evaluated)
 
     return {
         'total_instructors': total_instructors,
         'evaluated_count': evaluated_count,
-        'remaining_instructors': total_instructors - evaluated_count,
-        'remaining_instructors_data': remaining_instructors_data
+        'pending_count': total_instructors - evaluated_count - len(remaining_instructors_data),
+        'remaining_instructors': len(remaining_instructors_data),
+        'remaining_instructors_data': remaining_instructors_data,
+        'submissions': submissions
     }
 
 # --- PUBLIC ROUTES (Student) ---
 
-@app.route('/', methods=['GET', 'POST'])
+@setup.route('/', methods=['GET', 'POST'])
 def index():
     db = get_db()
     progress = {}
@@ -136,22 +553,24 @@ def index():
             school_id = request.form.get('login_school_id')
             password = request.form.get('login_password')
             
-            with db.cursor() as cursor:
-                cursor.execute("SELECT *, s_password FROM tbl_student WHERE s_schoolID = %s", (school_id,))
-                student = cursor.fetchone()
+            student = get_student_credentials(db, school_id)
                 
-            if student:
-                if student['s_status'] != 'Approved':
-                    flash('Your account is pending approval by an administrator.', 'info')
-                    return redirect(url_for('index'))
-                
-                if student['s_password'] == password:
-                    session['student_id'] = student['s_schoolID']
-                    session['student_name'] = f"{student['s_first_name']} {student['s_last_name']}"
-                    flash(f'Welcome back, {student["s_first_name"]}!', 'success')
-                    return redirect(url_for('dashboard'))
-                else:
-                    flash('Invalid School ID or Password.', 'error')
+            if student and student.s_status != 'Approved':
+                flash('Your account is pending approval by an administrator.', 'info')
+                return redirect(url_for('index'))
+
+            ok, new_hash = check_password(student.s_password if student else None, password, 'student')
+            if ok:
+                if new_hash:
+                    with db.cursor() as cursor:
+                        cursor.execute("UPDATE tbl_student SET s_password = %s WHERE s_schoolID = %s",
+                                       (new_hash, student.s_schoolID))
+                    db.commit()
+                session['student_id'] = student.s_schoolID
+                session['student_name'] = f"{student.s_first_name} {student.s_last_name}"
+                sign_in(f'student:{student.s_schoolID}', student_profile(student))
+                flash(f'Welcome back, {student.s_first_name}!', 'success')
+                return redirect(url_for('dashboard'))
             else:
                 flash('Invalid School ID or Password.', 'error')
                 
@@ -167,15 +586,17 @@ def index():
                 flash('All fields are required.', 'error')
                 return redirect(url_for('index'))
             
-            plain_password = password 
+            password_hash = password_hasher.hash(password, 'student')
             
             try:
                 with db.cursor() as cursor:
                     cursor.execute(
                         "INSERT INTO tbl_student (s_schoolID, s_password, s_first_name, s_last_name, s_email, s_year_level, s_status) VALUES (%s, %s, %s, %s, %s, %s, 'Pending')",
-                        (school_id, plain_password, first_name, last_name, email, year_level)
+                        (school_id, password_hash, first_name, last_name, email, year_level)
                     )
                 db.commit()
+                admin_counts_cache.invalidate()
+                registrations_total.inc()
                 flash('Registration successful! Your account is pending administrator approval.', 'success')
                 return redirect(url_for('index', tab='login')) 
             except pymysql.err.IntegrityError:
@@ -185,93 +606,101 @@ def index():
                 
     return render_template('index.html', instructors_empty=instructors_empty)
 
-@app.route('/dashboard')
+@setup.route('/dashboard')
 @login_required('student')
 def dashboard():
-    db = get_db()
     school_id = session['student_id']
-    
-    with db.cursor() as cursor:
-        cursor.execute("SELECT * FROM tbl_student WHERE s_schoolID = %s", (school_id,))
-        student_data = cursor.fetchone()
+    # Read at login and kept in the session until an admin changes the account.
+    student = cached_profile(f'student:{school_id}')
+    if student is None:
+        student = student_profile(get_student(get_db(), school_id))
+        sign_in(f'student:{school_id}', student)
 
     progress = get_student_evaluation_progress(school_id)
-    
-    student_status = student_data.get('s_status', 'Pending')
 
     return render_template('dashboard.html',
-        student={
-            'id': student_data['s_schoolID'],
-            'status': student_status,
-            'email': student_data['s_email'],
-            'year': student_data['s_year_level']
-        },
+        student=student,
         evaluations_count=progress['evaluated_count'],
+        pending_count=progress['pending_count'],
         remaining_instructors=progress['remaining_instructors'],
-        total_instructors=progress['total_instructors']
+        total_instructors=progress['total_instructors'],
+        submissions=progress['submissions']
     )
 
-@app.route('/evaluate', methods=['GET', 'POST'])
+@setup.route('/evaluate', methods=['GET', 'POST'])
 @login_required('student')
 def evaluate():
     db = get_db()
     school_id = session['student_id']
     
-    with db.cursor() as cursor:
-        cursor.execute("SELECT q_id, q_text FROM tbl_evaluation_questions ORDER BY q_order")
-        questions = cursor.fetchall()
-        
-    progress = get_student_evaluation_progress(school_id)
+    questions = get_questions()
     
     if request.method == 'POST':
         instructor_id = request.form.get('instructor')
-        remarks = request.form.get('remarks') 
+        # Blank remarks are stored as NULL so every remark count agrees.
+        remarks = (request.form.get('remarks') or '').strip() or None
+        if instructor_id:
+            try:
+                instructor_id = int(instructor_id)
+            except ValueError:
+                abort(400)
         
         ratings = {}
         for q in questions:
-            rating = request.form.get(f'q_{q["q_id"]}') 
+            rating = request.form.get(f'q_{q.q_id}') 
             if not rating:
-                flash(f'Please ensure all questions are rated. Missing rating for question ID {q["q_id"]}.', 'error')
+                flash(f'Please ensure all questions are rated. Missing rating for question ID {q.q_id}.', 'error')
+                return redirect(url_for('evaluate'))
+            try:
+                rating = int(rating)
+            except ValueError:
+                rating = None
+            if rating not in RATING_SCALE:
+                flash(f'Ratings must be whole numbers from {RATING_SCALE[0]} to {RATING_SCALE[-1]}. '
+                      f'Invalid rating for question ID {q.q_id}.', 'error')
                 return redirect(url_for('evaluate'))
-            ratings[q['q_id']] = int(rating)
+            ratings[q.q_id] = rating
             
         if not instructor_id:
             flash('Please select an instructor to evaluate.', 'error')
             return redirect(url_for('evaluate'))
+
+        if submission_queue is not None:
+            # Write-behind: only the duplicate lookup hits MySQL now.
+            with db.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM tbl_evaluation WHERE s_schoolID = %s AND i_id = %s",
+                               (school_id, instructor_id))
+                already_evaluated = cursor.fetchone() is not None
+            try:
+                if already_evaluated:
+                    raise AlreadyQueued(school_id, instructor_id)
+                submission_queue.enqueue(school_id, instructor_id, remarks, ratings)
+            except AlreadyQueued:
+                flash('You have already evaluated this instructor.', 'error')
+                return redirect(url_for('evaluate'))
+            flash('Evaluation received! It is being saved and will show in your progress shortly.', 'success')
+            return redirect(url_for('dashboard'))
             
         try:
             with db.cursor() as cursor:
-                cursor.execute("""
-                    SELECT COUNT(*) as count 
-                    FROM tbl_evaluation 
-                    WHERE s_schoolID = %s AND i_id = %s
-                """, (school_id, instructor_id))
-                if cursor.fetchone()['count'] > 0:
-                    flash('You have already evaluated this instructor.', 'error')
-                    return redirect(url_for('evaluate'))
-                    
-                cursor.execute("""
-                    INSERT INTO tbl_evaluation (i_id, s_schoolID, remarks)
-                    VALUES (%s, %s, %s)
-                """, (instructor_id, school_id, remarks))
-                
-                evaluation_id = cursor.lastrowid
-                
-                for q_id, rating in ratings.items():
-                    cursor.execute("""
-                        INSERT INTO tbl_evaluation_details (e_id, q_id, rating_value)
-                        VALUES (%s, %s, %s)
-                    """, (evaluation_id, q_id, rating))
+                save_evaluation(cursor, school_id, instructor_id, remarks, ratings)
             
             db.commit()
+            record_saved_evaluations([instructor_id])
             flash('Evaluation submitted successfully! Thank you for your feedback.', 'success')
             return redirect(url_for('dashboard'))
             
+        except DuplicateEvaluation:
+            db.rollback()
+            flash('You have already evaluated this instructor.', 'error')
+            return redirect(url_for('evaluate'))
         except Exception as e:
             db.rollback()
             flash(f'Error submitting evaluation: {e}', 'error')
             return redirect(url_for('evaluate'))
 
+    progress = get_student_evaluation_progress(school_id)
+
     return render_template('evaluate.html',
         instructors=progress['remaining_instructors_data'],
         all_instructors=progress['total_instructors'],
@@ -279,16 +708,17 @@ def evaluate():
     )
 
 
-@app.route('/logout')
+@setup.route('/logout')
 def logout():
     session.pop('student_id', None)
     session.pop('student_name', None)
+    sign_out('student')
     flash('You have been logged out.', 'info')
     return redirect(url_for('index'))
 
 # --- TEACHER ROUTES ---
 
-@app.route('/teacher_login', methods=['GET', 'POST'])
+@setup.route('/teacher_login', methods=['GET', 'POST'])
 def teacher_login():
     if session.get('teacher_id'):
         return redirect(url_for('teacher_dashboard'))
@@ -298,13 +728,17 @@ def teacher_login():
         password = request.form.get('password')
         db = get_db()
         
-        with db.cursor() as cursor:
-            cursor.execute("SELECT *, t_password FROM tbl_teacher WHERE t_username = %s", (username,))
-            teacher = cursor.fetchone()
-            
-        if teacher and teacher['t_password'] == password:
-            session['teacher_id'] = teacher['t_id']
-            session['teacher_name'] = f"{teacher['t_first_name']} {teacher['t_last_name']}"
+        teacher = get_teacher_credentials(db, username)
+
+        ok, new_hash = check_password(teacher.t_password if teacher else None, password, 'teacher')
+        if ok:
+            if new_hash:
+                with db.cursor() as cursor:
+                    cursor.execute("UPDATE tbl_teacher SET t_password = %s WHERE t_id = %s", (new_hash, teacher.t_id))
+                db.commit()
+            session['teacher_id'] = teacher.t_id
+            session['teacher_name'] = f"{teacher.t_first_name} {teacher.t_last_name}"
+            sign_in(f'teacher:{teacher.t_id}')
             flash('Teacher login successful!', 'success')
             return redirect(url_for('teacher_dashboard'))
         else:
@@ -313,96 +747,64 @@ def teacher_login():
     return render_template('teacher_login.html')
 
 
-@app.route('/teacher_dashboard')
+@setup.route('/teacher_dashboard')
 @login_required('teacher')
 def teacher_dashboard():
     db = get_db()
     teacher_id = session['teacher_id']
-    
-    with db.cursor() as cursor:
-        cursor.execute("""
-            SELECT 
-                i.i_id, 
-                i.i_course, 
-                CONCAT(i.i_first_name, ' ', i.i_last_name) AS instructor_name,
-                COUNT(DISTINCT e.e_id) AS evaluation_count,
-                AVG(ed.rating_value) AS average_rating
-            FROM tbl_instructor i
-            LEFT JOIN tbl_evaluation e ON i.i_id = e.i_id
-            LEFT JOIN tbl_evaluation_details ed ON e.e_id = ed.e_id
-            WHERE i.t_id = %s
-            GROUP BY i.i_id, i.i_course, instructor_name
-        """, (teacher_id,))
-        courses = cursor.fetchall()
-        
-        cursor.execute("SELECT COUNT(*) AS count FROM tbl_student WHERE s_status = 'Approved'")
-        total_approved_students = cursor.fetchone()['count']
-        
-    return render_template('teacher_dashboard.html', 
-                           courses=courses, 
-                           total_approved_students=total_approved_students)
 
+    def render():
+        courses = list_teacher_courses(db, teacher_id)
+        total_approved_students = count_approved_students(db)
+
+        return render_template('teacher_dashboard.html',
+                               courses=courses,
+                               total_approved_students=total_approved_students)
+
+    return cached_page(teacher_dashboard_key(teacher_id, list_teacher_instructor_ids(db, teacher_id)), render)
 
-@app.route('/teacher_view_results/<int:instructor_id>')
+
+@setup.route('/teacher_view_results/<int:instructor_id>')
 @login_required('teacher')
 def teacher_view_results(instructor_id):
-    db = get_db()
     teacher_id = session['teacher_id']
-    
-    with db.cursor() as cursor:
-        cursor.execute("SELECT * FROM tbl_instructor WHERE i_id = %s AND t_id = %s", 
-                       (instructor_id, teacher_id))
-        instructor = cursor.fetchone()
-        
+
+    def render():
+        db = get_db()
+        instructor = get_instructor(db, instructor_id, teacher_id=teacher_id)
         if not instructor:
             flash('You are not authorized to view results for this instructor.', 'error')
             return redirect(url_for('teacher_dashboard'))
-            
-        cursor.execute("SELECT q_id, q_text FROM tbl_evaluation_questions ORDER BY q_order")
-        questions = cursor.fetchall()
 
-        question_stats = []
-        for q in questions:
-            cursor.execute("""
-                SELECT 
-                    AVG(ed.rating_value) AS avg_rating,
-                    COUNT(ed.rating_value) AS total_responses
-                FROM tbl_evaluation_details ed
-                JOIN tbl_evaluation e ON ed.e_id = e.e_id
-                WHERE ed.q_id = %s AND e.i_id = %s
-            """, (q['q_id'], instructor_id))
-            stats = cursor.fetchone()
-            question_stats.append({
-                'q_text': q['q_text'],
-                'avg_rating': f"{stats['avg_rating']:.2f}" if stats['avg_rating'] else "N/A",
-                'total_responses': stats['total_responses']
-            })
-            
-        cursor.execute("""
-            SELECT remarks, e_date_submitted 
-            FROM tbl_evaluation 
-            WHERE i_id = %s AND remarks IS NOT NULL AND remarks != ''
-            ORDER BY e_date_submitted DESC
-        """, (instructor_id,))
-        remarks = cursor.fetchall()
-        
-    return render_template('teacher_view_results.html', 
-                           instructor=instructor, 
-                           stats=question_stats, 
-                           remarks=remarks)
+        with db.cursor() as cursor:
+            question_stats = build_instructor_stats(cursor, get_questions(), instructor_id)
+            remark_count = count_remarks(cursor, instructor_id)
+        remarks, next_cursor = fetch_remarks(db, instructor_id)
+
+        return render_template('teacher_view_results.html',
+                               instructor=instructor,
+                               stats=question_stats,
+                               remarks=remarks,
+                               remark_count=remark_count,
+                               next_cursor=next_cursor)
+
+    # Only an authorized render is stored, and reassigning the instructor
+    # bumps its version, so a hit needs no ownership check.
+    return cached_page(results_page_key('teacher_view_results', teacher_id, instructor_id), render)
 
 
-@app.route('/teacher_logout')
+@setup.route('/teacher_logout')
 def teacher_logout():
     session.pop('teacher_id', None)
     session.pop('teacher_name', None)
+    sign_out('teacher')
     flash('You have been logged out.', 'info')
     return redirect(url_for('index'))
 
 
 # --- ADMIN ROUTES ---
 
-@app.route('/admin_login', methods=['GET', 'POST'])
+@setup.route('/admin_login', methods=['GET', 'POST'])
 def admin_login():
     if session.get('admin_id'):
         return redirect(url_for('admin_dashboard'))
@@ -412,13 +814,17 @@ def admin_login():
         password = request.form.get('password')
         db = get_db()
         
-        with db.cursor() as cursor:
-            cursor.execute("SELECT *, a_password FROM tbl_admin WHERE a_username = %s", (username,))
-            admin = cursor.fetchone()
-            
-        if admin and admin['a_password'] == password:
-            session['admin_id'] = admin['a_id']
-            session['admin_name'] = admin['a_username']
+        admin = get_admin_credentials(db, username)
+
+        ok, new_hash = check_password(admin.a_password if admin else None, password, 'admin')
+        if ok:
+            if new_hash:
+                with db.cursor() as cursor:
+                    cursor.execute("UPDATE tbl_admin SET a_password = %s WHERE a_id = %s", (new_hash, admin.a_id))
+                db.commit()
+            session['admin_id'] = admin.a_id
+            session['admin_name'] = admin.a_username
+            sign_in(f'admin:{admin.a_id}')
             flash('Admin login successful!', 'success')
             return redirect(url_for('admin_dashboard'))
         else:
@@ -426,32 +832,91 @@ def admin_login():
             
     return render_template('admin_login.html')
 
-@app.route('/admin_dashboard')
+@setup.route('/admin_dashboard')
 @login_required('admin')
 def admin_dashboard():
-    db = get_db()
+    counts = get_admin_counts()
+    after = request.args.get('after')
+    before = request.args.get('before')
     
-    with db.cursor() as cursor:
-        cursor.execute("SELECT COUNT(*) AS pending FROM tbl_student WHERE s_status = 'Pending'")
-        pending_students = cursor.fetchone()['pending']
-        cursor.execute("SELECT COUNT(*) AS total FROM tbl_student")
-        total_students = cursor.fetchone()['total']
-        cursor.execute("SELECT COUNT(*) AS teachers FROM tbl_teacher")
-        total_teachers = cursor.fetchone()['teachers']
-        cursor.execute("SELECT COUNT(*) AS instructors FROM tbl_instructor")
-        total_instructors = cursor.fetchone()['instructors']
-        
-        cursor.execute("SELECT s_schoolID, s_first_name, s_last_name, s_email, s_year_level FROM tbl_student WHERE s_status = 'Pending' ORDER BY s_schoolID")
-        students = cursor.fetchall()
+    students, has_prev, has_next = list_pending_students(get_db(), after=after, before=before,
+                                                         limit=PENDING_PAGE_SIZE)
         
     return render_template('admin_dashboard.html', 
-                           pending_students=pending_students,
-                           total_students=total_students,
-                           total_teachers=total_teachers,
-                           total_instructors=total_instructors,
-                           students=students)
+                           pending_students=counts['pending_students'],
+                           total_students=counts['total_students'],
+                           total_teachers=counts['total_teachers'],
+                           total_instructors=counts['total_instructors'],
+                           total_questions=len(get_questions()),
+                           students=students,
+                           prev_cursor=students[0].s_schoolID if students and has_prev else None,
+                           next_cursor=students[-1].s_schoolID if students and has_next else None)
 
-@app.route('/approve_student/<string:student_id>')
+def approve_students(db, school_ids=None, year_level=None):
+    """Approve pending students in chunked set-based UPDATEs.
+
+    Approves the given School IDs, or every pending student (optionally only
+    one year level) when no IDs are given. Each chunk is committed on its own
+    so row locks are held briefly. Returns the number of students approved.
+    """
+    approved = 0
+    with db.cursor() as cursor:
+        if school_ids is not None:
+            for start in range(0, len(school_ids), APPROVAL_CHUNK_SIZE):
+                chunk = school_ids[start:start + APPROVAL_CHUNK_SIZE]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f"""
+                    UPDATE tbl_student SET s_status = 'Approved'
+                    WHERE s_status = 'Pending' AND s_schoolID IN ({placeholders})
+                """, chunk)
+                approved += cursor.rowcount
+                db.commit()
+                forget_profiles('student', chunk)
+        else:
+            # Pending students cannot log in, so no session holds their profile.
+            year_filter = "AND s_year_level = %s" if year_level else ""
+            params = (year_level,) if year_level else ()
+            while True:
+                cursor.execute(f"""
+                    UPDATE tbl_student SET s_status = 'Approved'
+                    WHERE s_status = 'Pending' {year_filter}
+                    ORDER BY s_schoolID
+                    LIMIT %s
+                """, params + (APPROVAL_CHUNK_SIZE,))
+                approved += cursor.rowcount
+                db.commit()
+                if cursor.rowcount < APPROVAL_CHUNK_SIZE:
+                    break
+    return approved
+
+@setup.route('/approve_students', methods=['POST'])
+@login_required('admin')
+def approve_students_bulk():
+    db = get_db()
+    action = request.form.get('action')
+    
+    try:
+        if action == 'selected':
+            school_ids = request.form.getlist('student_ids')
+            if not school_ids:
+                flash('Select at least one student to approve.', 'error')
+                return redirect(url_for('admin_dashboard'))
+            approved = approve_students(db, school_ids=school_ids)
+        elif action == 'filter':
+            approved = approve_students(db, year_level=request.form.get('year_level') or None)
+        else:
+            flash('Unknown approval action.', 'error')
+            return redirect(url_for('admin_dashboard'))
+        flash(f'{approved} student(s) have been approved.', 'success')
+    except Exception as e:
+        db.rollback()
+        flash(f'Error approving students: {e}', 'error')
+    finally:
+        admin_counts_cache.invalidate()
+        
+    return redirect(url_for('admin_dashboard'))
+
+@setup.route('/approve_student/<string:student_id>')
 @login_required('admin')
 def approve_student(student_id):
     db = get_db()
@@ -462,6 +927,8 @@ def approve_student(student_id):
                 (student_id,)
             )
         db.commit()
+        admin_counts_cache.invalidate()
+        forget_profiles('student', [student_id])
         flash(f'Student {student_id} has been approved.', 'success')
     except Exception as e:
         flash(f'Error approving student: {e}', 'error')
@@ -470,7 +937,7 @@ def approve_student(student_id):
 
 # --- ADMIN: Manage Teachers (Teacher Login Accounts) ---
 
-@app.route('/admin_manage_teachers', methods=['GET', 'POST'])
+@setup.route('/admin_manage_teachers', methods=['GET', 'POST'])
 @login_required('admin')
 def admin_manage_teachers():
     db = get_db()
@@ -487,14 +954,15 @@ def admin_manage_teachers():
             if not all([username, password, first_name, last_name]):
                 flash('All fields are required to add a teacher.', 'error')
             else:
-                plain_password = password
+                password_hash = password_hasher.hash(password, 'teacher')
                 try:
                     with db.cursor() as cursor:
                         cursor.execute(
                             "INSERT INTO tbl_teacher (t_username, t_password, t_first_name, t_last_name) VALUES (%s, %s, %s, %s)",
-                            (username, plain_password, first_name, last_name)
+                            (username, password_hash, first_name, last_name)
                         )
                     db.commit()
+                    admin_counts_cache.invalidate()
                     flash('New teacher account added successfully!', 'success')
                 except pymysql.err.IntegrityError:
                     flash('Username already exists.', 'error')
@@ -511,22 +979,21 @@ def admin_manage_teachers():
                     else:
                         cursor.execute("DELETE FROM tbl_teacher WHERE t_id = %s", (teacher_id,))
                         db.commit()
+                        admin_counts_cache.invalidate()
+                        if session_store is not None:
+                            session_store.end_sessions(f'teacher:{teacher_id}')
                         flash('Teacher account deleted successfully!', 'success')
             except Exception as e:
                 flash(f'Error deleting teacher: {e}', 'error')
             
         return redirect(url_for('admin_manage_teachers'))
         
-    with db.cursor() as cursor:
-        cursor.execute("SELECT t_id, t_username, t_first_name, t_last_name FROM tbl_teacher ORDER BY t_last_name")
-        teachers = cursor.fetchall()
-        
-    return render_template('admin_manage_teachers.html', teachers=teachers)
+    return render_template('admin_manage_teachers.html', teachers=list_teachers(db))
 
 
 # --- ADMIN: Manage Instructors (Courses/Subjects) ---
 
-@app.route('/admin_manage_instructors', methods=['GET', 'POST'])
+@setup.route('/admin_manage_instructors', methods=['GET', 'POST'])
 @login_required('admin')
 def admin_manage_instructors():
     db = get_db()
@@ -546,26 +1013,35 @@ def admin_manage_instructors():
                         (i_first_name, i_last_name, i_course)
                     )
                 db.commit()
+                admin_counts_cache.invalidate()
                 flash('New instructor added successfully!', 'success')
             except Exception as e:
                 flash(f'Error adding instructor: {e}', 'error')
 
         elif action == 'delete':
-            i_id = request.form.get('i_id')
+            try:
+                i_id = int(request.form.get('i_id', ''))
+            except ValueError:
+                abort(400)
             try:
                 with db.cursor() as cursor:
-                    cursor.execute("SELECT COUNT(*) AS count FROM tbl_evaluation WHERE i_id = %s", (i_id,))
+                    cursor.execute(INSTRUCTOR_EVALUATION_COUNT_SQL, (i_id,))
                     if cursor.fetchone()['count'] > 0:
                         flash('Cannot delete instructor. Evaluations exist.', 'error')
                     else:
                         cursor.execute("DELETE FROM tbl_instructor WHERE i_id = %s", (i_id,))
                         db.commit()
+                        admin_counts_cache.invalidate()
+                        instructor_versions.bump(i_id)
                         flash('Instructor deleted successfully!', 'success')
             except Exception as e:
                 flash(f'Error deleting instructor: {e}', 'error')
 
         elif action == 'assign_teacher':
-            i_id = request.form.get('i_id')
+            try:
+                i_id = int(request.form.get('i_id', ''))
+            except ValueError:
+                abort(400)
             t_id = request.form.get('t_id')
             
             try:
@@ -576,82 +1052,203 @@ def admin_manage_instructors():
                         (new_t_id, i_id)
                     )
                 db.commit()
+                instructor_versions.bump(i_id)
                 flash('Teacher assignment updated successfully!', 'success')
             except Exception as e:
                 flash(f'Error assigning teacher: {e}', 'error')
                 
         return redirect(url_for('admin_manage_instructors'))
         
-    with db.cursor() as cursor:
-        cursor.execute("""
-            SELECT 
-                i.*, 
-                CONCAT(t.t_first_name, ' ', t.t_last_name) AS teacher_name,
-                t.t_id AS assigned_teacher_id
-            FROM tbl_instructor i
-            LEFT JOIN tbl_teacher t ON i.t_id = t.t_id
-            ORDER BY i.i_last_name
-        """)
-        instructors = cursor.fetchall()
-        
-        cursor.execute("SELECT t_id, t_first_name, t_last_name FROM tbl_teacher ORDER BY t_last_name")
-        teachers = cursor.fetchall()
-        
     return render_template('admin_manage_instructors.html', 
-                           instructors=instructors, 
-                           teachers=teachers)
+                           instructors=list_instructors_with_teachers(db), 
+                           teachers=list_teachers(db))
 
-@app.route('/admin_view_evaluations/<int:instructor_id>')
+@setup.route('/admin_view_evaluations/<int:instructor_id>')
 @login_required('admin')
 def admin_view_evaluations(instructor_id):
-    db = get_db()
-
-    with db.cursor() as cursor:
-        cursor.execute("SELECT * FROM tbl_instructor WHERE i_id = %s", (instructor_id,))
-        instructor = cursor.fetchone()
-        
+    def render():
+        db = get_db()
+        instructor = get_instructor(db, instructor_id)
         if not instructor:
             flash('Instructor not found.', 'error')
             return redirect(url_for('admin_manage_instructors'))
-            
-        cursor.execute("SELECT q_id, q_text FROM tbl_evaluation_questions ORDER BY q_order")
-        questions = cursor.fetchall()
 
-        question_stats = []
-        for q in questions:
-            cursor.execute("""
-                SELECT 
-                    AVG(ed.rating_value) AS avg_rating,
-                    COUNT(ed.rating_value) AS total_responses
-                FROM tbl_evaluation_details ed
-                JOIN tbl_evaluation e ON ed.e_id = e.e_id
-                WHERE ed.q_id = %s AND e.i_id = %s
-            """, (q['q_id'], instructor_id))
-            stats = cursor.fetchone()
-            question_stats.append({
-                'q_text': q['q_text'],
-                'avg_rating': f"{stats['avg_rating']:.2f}" if stats['avg_rating'] else "N/A",
-                'total_responses': stats['total_responses']
-            })
-            
-        cursor.execute("""
-            SELECT e.remarks, e.e_date_submitted, s.s_year_level 
-            FROM tbl_evaluation e
-            JOIN tbl_student s ON e.s_schoolID = s.s_schoolID
-            WHERE e.i_id = %s AND e.remarks IS NOT NULL AND e.remarks != ''
-            ORDER BY e.e_date_submitted DESC
-        """, (instructor_id,))
-        remarks = cursor.fetchall()
+        with db.cursor() as cursor:
+            question_stats = build_instructor_stats(cursor, get_questions(), instructor_id)
+            remark_count = count_remarks(cursor, instructor_id)
+        remarks, next_cursor = fetch_remarks(db, instructor_id, with_year_level=True)
+
+        return render_template('admin_view_evaluations.html',
+                               instructor=instructor,
+                               stats=question_stats,
+                               remarks=remarks,
+                               remark_count=remark_count,
+                               next_cursor=next_cursor)
+
+    return cached_page(results_page_key('admin_view_evaluations', session['admin_id'], instructor_id), render)
+
+# --- ADMIN: Remarks Search ---
+
+@setup.route('/admin_search_remarks')
+@login_required('admin')
+def admin_search_remarks():
+    args = request.args
+    text = args.get('q', '').strip()
+    filters = {
+        'instructor_id': args.get('instructor_id', type=int),
+        'course': args.get('course') or None,
+        'year_level': args.get('year_level') or None,
+    }
+    for name in ('date_from', 'date_to'):
+        value = args.get(name)
+        try:
+            filters[name] = datetime.strptime(value, '%Y-%m-%d') if value else None
+        except ValueError:
+            flash(f'Ignored the invalid date "{value}" (expected YYYY-MM-DD).', 'error')
+            filters[name] = None
+
+    db = get_db()
+    instructors = list_instructors_with_teachers(db)
+    page = max(args.get('page', 1, type=int), 1)
+    searched = bool(text) or any(value is not None for value in filters.values())
+    hits, has_next = search_remarks(db, text, page=page, **filters) if searched else ([], False)
+    terms = boolean_query(text)[1]
+
+    return render_template('admin_search_remarks.html',
+                           text=text,
+                           filters=filters,
+                           instructors=instructors,
+                           courses=sorted({instructor.i_course for instructor in instructors if instructor.i_course}),
+                           searched=searched,
+                           hits=[(hit, highlight(hit.remarks, terms)) for hit in hits],
+                           page=page,
+                           has_next=has_next,
+                           query_args={name: value for name, value in args.items() if name != 'page'})
+
+# --- ADMIN: Analytics ---
+
+@setup.route('/admin_analytics', methods=['GET', 'POST'])
+@login_required('admin')
+def admin_analytics():
+    """Cross-instructor statistics over every evaluation, recomputed every ANALYTICS_TTL or on request."""
+    if request.method == 'POST':
+        analytics_cache.invalidate()
+        return redirect(url_for('admin_analytics'))
+
+    config = current_app.config
+    try:
+        result = analytics_cache.get(lambda: load_analytics(get_db(), get_questions(),
+                                                            term_months=config['ANALYTICS_TERM_MONTHS'],
+                                                            min_responses=config['ANALYTICS_MIN_RESPONSES']))
+    except AnalyticsUnavailable as e:
+        flash(str(e), 'error')
+        return redirect(url_for('admin_dashboard'))
+
+    return render_template('admin_analytics.html', analytics=result)
+
+@setup.route('/remarks/<int:instructor_id>')
+def remarks_feed(instructor_id):
+    """Next page of remarks for the "more remarks" button on the results pages."""
+    is_admin = bool(session.get('admin_id'))
+    teacher_id = session.get('teacher_id')
+    if not is_admin and not teacher_id:
+        return jsonify({'error': 'Please log in to access this page.'}), 401
+        
+    db = get_db()
+    if not is_admin and not get_instructor(db, instructor_id, teacher_id=teacher_id):
+        return jsonify({'error': 'You are not authorized to view results for this instructor.'}), 403
+                
+    remarks, next_cursor = fetch_remarks(db, instructor_id, after=request.args.get('cursor'),
+                                         with_year_level=is_admin)
         
-    return render_template('admin_view_evaluations.html', 
-                           instructor=instructor, 
-                           stats=question_stats, 
-                           remarks=remarks)
+    return jsonify({
+        'remarks': [{
+            'remarks': remark.remarks,
+            'submitted': remark.e_date_submitted.strftime('%Y-%m-%d %H:%M'),
+            'year_level': remark.s_year_level,
+        } for remark in remarks],
+        'next_cursor': next_cursor,
+    })
+
+
+# --- ADMIN: Export Evaluations ---
+
+@setup.route('/admin_export/<string:fmt>')
+@login_required('admin')
+def admin_export(fmt):
+    if fmt not in EXPORT_FORMATS:
+        flash('Unsupported export format.', 'error')
+        return redirect(url_for('admin_manage_instructors'))
+        
+    instructor_id = request.args.get('instructor_id', type=int)
+    course = request.args.get('course')
+    rows = iter_evaluation_rows(get_db(), instructor_id=instructor_id, course=course)
+    
+    filename = 'evaluations'
+    if instructor_id is not None:
+        filename += f'_instructor_{instructor_id}'
+    if course:
+        filename += '_' + ''.join(c if c.isalnum() else '_' for c in course)
+        
+    # stream_with_context keeps the app context (and the pooled connection)
+    # alive until the last chunk has been sent.
+    return Response(
+        stream_with_context(STREAMERS[fmt](rows)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={filename}.{fmt}'}
+    )
+
+
+# --- ADMIN: Bulk CSV Import ---
+
+@setup.route('/admin_import', methods=['GET', 'POST'])
+@login_required('admin')
+def admin_import():
+    result = None
+    
+    if request.method == 'POST':
+        kind = request.form.get('kind')
+        upload = request.files.get('csv_file')
+        
+        if not upload or not upload.filename:
+            flash('Please choose a CSV file to import.', 'error')
+            return redirect(url_for('admin_import'))
+            
+        db = get_db()
+        try:
+            stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+            result = import_csv(db, kind, stream, password_hasher)
+            flash(f'Imported {result.inserted} {kind}; {result.rejected} row(s) rejected.',
+                  'success' if not result.rejected else 'info')
+        except (CSVImportError, UnicodeDecodeError) as e:
+            flash(f'Import failed: {e}', 'error')
+        except Exception as e:
+            db.rollback()
+            flash(f'Error during import: {e}', 'error')
+        finally:
+            admin_counts_cache.invalidate()
+            
+    return render_template('admin_import.html', specs=IMPORT_SPECS, result=result)
+
+@setup.command('import-csv')
+@click.argument('kind', type=click.Choice(list(IMPORT_SPECS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True, help='Rows per INSERT/commit.')
+def import_csv_command(kind, path, batch_size):
+    """Import students, teachers or instructors from a CSV file."""
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        result = import_csv(get_db(), kind, f, password_hasher, batch_size=batch_size)
+    admin_counts_cache.invalidate()
+    
+    for line_no, message in result.errors:
+        print(f"line {line_no}: {message}")
+    print(f"Imported {result.inserted} {kind}, rejected {result.rejected} "
+          f"in {result.elapsed:.2f}s ({result.rows_per_second:.0f} rows/s).")
 
 
 # --- ADMIN: Manage Questions ---
 
-@app.route('/admin_manage_questions', methods=['GET', 'POST'])
+@setup.route('/admin_manage_questions', methods=['GET', 'POST'])
 @login_required('admin')
 def admin_manage_questions():
     db = get_db()
@@ -673,6 +1270,7 @@ def admin_manage_questions():
                                     (text, q_id)
                                 )
                 db.commit()
+                question_cache.invalidate()
                 flash('Evaluation questions updated successfully!', 'success')
             except Exception as e:
                 flash(f'Error updating questions: {e}', 'error')
@@ -692,6 +1290,7 @@ def admin_manage_questions():
                         (q_text, new_order)
                     )
                 db.commit()
+                question_cache.invalidate()
                 flash('New question added successfully!', 'success')
             except Exception as e:
                 flash(f'Error adding question: {e}', 'error')
@@ -702,12 +1301,13 @@ def admin_manage_questions():
             q_id = request.form.get('q_id_to_delete')
             try:
                 with db.cursor() as cursor:
-                    cursor.execute("SELECT COUNT(*) AS count FROM tbl_evaluation_details WHERE q_id = %s", (q_id,))
+                    cursor.execute(QUESTION_RATING_COUNT_SQL, (q_id,))
                     if cursor.fetchone()['count'] > 0:
                         flash('Cannot delete question. Existing evaluations use it.', 'error')
                     else:
                         cursor.execute("DELETE FROM tbl_evaluation_questions WHERE q_id = %s", (q_id,))
                         db.commit()
+                        question_cache.invalidate()
                         flash('Question deleted successfully!', 'success')
             except Exception as e:
                 flash(f'Error deleting question: {e}', 'error')
@@ -715,25 +1315,135 @@ def admin_manage_questions():
             return redirect(url_for('admin_manage_questions'))
 
             
-    with db.cursor() as cursor:
-        cursor.execute("SELECT q_id, q_text, q_order FROM tbl_evaluation_questions ORDER BY q_order")
-        questions = cursor.fetchall()
-        
-    return render_template('admin_manage_questions.html', questions=questions)
+    return render_template('admin_manage_questions.html', questions=get_questions())
 
 
-@app.route('/admin_logout')
+@setup.route('/admin_logout')
 def admin_logout():
     session.pop('admin_id', None)
     session.pop('admin_name', None)
+    sign_out('admin')
     flash('You have been logged out.', 'info')
     return redirect(url_for('index'))
 
-@app.route('/init_db')
-def initial_setup():
+@setup.route('/admin_system_stats')
+@login_required('admin')
+def admin_system_stats():
+    return jsonify({
+        'db_pool': db_pool.stats(),
+        'caches': {cache.name: cache.stats() for cache in (question_cache, admin_counts_cache, analytics_cache, page_cache)},
+        'submission_queue': submission_queue.stats() if submission_queue is not None else None,
+        'sessions': session_store.stats() if session_store is not None else {'backend': 'cookie'},
+        'rollups': rollup_status(get_db()),
+    })
+
+@setup.route('/metrics')
+def metrics_endpoint():
+    token = current_app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    update_pool_metrics()
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@setup.command('rebuild-summary')
+def rebuild_summary_command():
+    """Regenerate the rating summary tables from raw evaluation data."""
+    rebuild_summary(get_db())
+    results_version.bump()
+    print("Rating summary rebuilt.")
+
+@setup.command('refresh-rollups')
+@click.option('--full', is_flag=True, help='Recompute every rollup from scratch instead of folding in new evaluations.')
+@click.option('--batch-size', type=int, help='Evaluations folded per commit (default: ROLLUP_BATCH_SIZE).')
+def refresh_rollups_command(full, batch_size):
+    """Fold evaluations submitted since the last run into the report rollups."""
+    settle_seconds = current_app.config['ROLLUP_SETTLE_SECONDS']
+    if full:
+        result = rebuild_rollups(get_db(), settle_seconds=settle_seconds)
+        print(f"Rollups rebuilt up to evaluation {result.end_e_id} in {result.elapsed:.2f}s.")
+    else:
+        result = refresh_rollups(get_db(), batch_size=batch_size or current_app.config['ROLLUP_BATCH_SIZE'],
+                                 settle_seconds=settle_seconds)
+        print(f"Folded evaluations {result.start_e_id + 1}-{result.end_e_id} in {result.batches} batch(es), "
+              f"{result.elapsed:.2f}s." if result.batches else "Rollups already up to date.")
+
+@setup.command('rollup-report')
+@click.argument('dimension', type=click.Choice(['course', 'year_level', 'instructor']))
+def rollup_report_command(dimension):
+    """Print per-question averages by course, year level or instructor from the report rollups."""
+    db = get_db()
+    questions = get_questions()
+    status = rollup_status(db)
+    print(f"As of evaluation {status['last_e_id']} ({status['pending']} newer not included).")
+    print('\t'.join([dimension] + [f'Q{n}' for n in range(1, len(questions) + 1)] + ['evaluations']))
+    for group in read_rollups(db, dimension, questions):
+        means = ['-' if mean is None else f'{mean:.2f}' for mean in group['means']]
+        print('\t'.join([group['label'], *means, str(group['evaluations'])]))
+
+@setup.command('drain-submissions')
+def drain_submissions_command():
+    """Write every queued evaluation submission to the database now."""
+    if submission_queue is None:
+        print("The submission queue is disabled (SUBMISSION_QUEUE = False).")
+        return
+    total = 0
+    while True:
+        processed = submission_queue.drain_once()
+        if not processed:
+            break
+        total += processed
+    print(f"{total} submission(s) processed; queue: {submission_queue.stats()}")
+
+@setup.command('hash-passwords')
+@click.option('--batch-size', default=500, show_default=True, help='Accounts hashed and updated per commit.')
+def hash_passwords_command(batch_size):
+    """Replace plaintext passwords left from before hashing."""
+    accounts = (
+        ('student', 'tbl_student', 's_schoolID', 's_password'),
+        ('teacher', 'tbl_teacher', 't_id', 't_password'),
+        ('admin', 'tbl_admin', 'a_id', 'a_password'),
+    )
+    db = get_db()
+    for role, table, key, column in accounts:
+        total = 0
+        last_key = None
+        while True:
+            after = f"WHERE {key} > %s" if last_key is not None else ""
+            params = (last_key, batch_size) if last_key is not None else (batch_size,)
+            with db.cursor() as cursor:
+                cursor.execute(f"""
+                    SELECT {key} AS account_key, {column} AS password FROM {table}
+                    {after}
+                    ORDER BY {key} LIMIT %s
+                """, params)
+                rows = cursor.fetchall()
+            if not rows:
+                break
+            last_key = rows[-1]['account_key']
+            # Decided here rather than in SQL: a plaintext password may itself start with '$'.
+            rows = [row for row in rows if not is_hashed(row['password'])]
+            if not rows:
+                continue
+            hashes = password_hasher.map_hash([row['password'] for row in rows], role)
+            with db.cursor() as cursor:
+                cursor.executemany(f"UPDATE {table} SET {column} = %s WHERE {key} = %s",
+                                   [(new_hash, row['account_key']) for new_hash, row in zip(hashes, rows)])
+            db.commit()
+            total += len(rows)
+        print(f"{role}: {total} plaintext password(s) hashed.")
+
+@setup.command('migrate')
+def migrate_command():
+    """Apply pending schema migrations."""
     init_db()
-    flash('Database setup complete. All passwords are now set to "password".', 'info')
+
+@setup.route('/init_db')
+def initial_setup():
+    if init_db():
+        flash('Database setup complete. The database schema is up to date.', 'info')
+    else:
+        flash('Database setup failed. Check the server log for details.', 'error')
     return redirect(url_for('index'))
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
@@ -0,0 +1,347 @@
+"""Async (ASGI) serving mode.
+
+The read-heavy pages (student dashboard, teacher dashboard, both results
+pages and the remarks feed) are served by async Quart views over an
+aiomysql pool. The independent queries of a page run concurrently on
+separate pooled connections, and no thread is pinned while MySQL works.
+Every other route is handed to the regular Flask app, which runs in a
+thread pool, so logins, forms and admin tools behave exactly as in the
+sync mode. Both apps share the templates, the sessions (cookie or
+server-side store) and the cross-process caches.
+
+    pip install quart aiomysql hypercorn
+    hypercorn asgi:application --bind 0.0.0.0:8000 --workers 4
+
+quart, aiomysql and hypercorn are optional; the sync app does not need them.
+"""
+import asyncio
+import time
+from functools import wraps
+
+try:
+    import aiomysql
+    from hypercorn.middleware import AsyncioWSGIMiddleware
+    from quart import (Quart, flash, g, jsonify, make_response, redirect, render_template, request, session,
+                       url_for)
+    from quart.sessions import SessionInterface
+except ImportError as e:
+    raise ImportError('The async serving mode needs quart, aiomysql and hypercorn: '
+                      'pip install quart aiomysql hypercorn') from e
+
+from werkzeug.exceptions import HTTPException
+
+import app as wsgi
+from evaluations import REMARK_COUNT_SQL, page_remarks, remarks_query, stats_from_summary_rows, summary_rows_query
+from models import (APPROVED_STUDENTS_SQL, INSTRUCTOR_BY_ID_SQL, INSTRUCTOR_PROGRESS_SQL, QUESTIONS_SQL,
+                    STUDENT_BY_ID_SQL, TEACHER_COURSES_SQL, TEACHER_INSTRUCTOR_IDS_SQL, TEACHER_INSTRUCTOR_SQL,
+                    CourseSummary, Instructor, InstructorProgress, Question, Student)
+from sessions import PRINCIPAL_KEY, PROFILE_KEY, ServerSideSessionInterface
+
+flask_app = wsgi.app
+quart_app = Quart(__name__, template_folder=flask_app.template_folder, static_folder=flask_app.static_folder)
+quart_app.config.update(flask_app.config)
+
+
+class QuartSessionInterface(SessionInterface):
+    """The Flask app's server-side session store, used from the async views."""
+
+    def __init__(self, sessions):
+        self.sessions = sessions
+
+    async def open_session(self, app, request):
+        sid = request.cookies.get(self.sessions.get_cookie_name(app))
+        return await asyncio.to_thread(self.sessions.load, sid)
+
+    async def save_session(self, app, session, response):
+        sid = await asyncio.to_thread(self.sessions.persist, app, session)
+        self.sessions.set_cookie(app, session, response, sid)
+
+
+if isinstance(flask_app.session_interface, ServerSideSessionInterface):
+    quart_app.session_interface = QuartSessionInterface(flask_app.session_interface)
+
+db_pool = None
+
+
+@quart_app.before_serving
+async def open_db_pool():
+    global db_pool
+    mysql = flask_app.config['MYSQL_CONFIG']
+    # autocommit: every read sees current data instead of a transaction snapshot.
+    db_pool = await aiomysql.create_pool(host=mysql['host'], user=mysql['user'], password=mysql['password'],
+                                         db=mysql['database'], autocommit=True, **quart_app.config['ASYNC_DB_POOL'])
+
+
+@quart_app.after_serving
+async def close_db_pool():
+    db_pool.close()
+    await db_pool.wait_closed()
+
+
+async def fetch_rows(sql, params=(), cursor_class=aiomysql.Cursor):
+    async with db_pool.acquire() as conn:
+        async with conn.cursor(cursor_class) as cursor:
+            await cursor.execute(sql, params)
+            return await cursor.fetchall()
+
+
+async def fetch_one(row_type, sql, params=()):
+    rows = await fetch_rows(sql, params)
+    return row_type._make(rows[0]) if rows else None
+
+
+async def fetch_all(row_type, sql, params=()):
+    return [row_type._make(row) for row in await fetch_rows(sql, params)]
+
+
+async def get_questions():
+    async def load():
+        return tuple(await fetch_all(Question, QUESTIONS_SQL))
+    return await wsgi.question_cache.get_async(load)
+
+
+async def get_instructor_stats(instructor_id):
+    sql, params = summary_rows_query([instructor_id])
+    questions, rows = await asyncio.gather(get_questions(), fetch_rows(sql, params, aiomysql.DictCursor))
+    return stats_from_summary_rows(questions, [instructor_id], rows)[instructor_id]
+
+
+async def count_remarks(instructor_id):
+    rows = await fetch_rows(REMARK_COUNT_SQL, (instructor_id,))
+    return rows[0][0] if rows else 0
+
+
+async def fetch_remarks(instructor_id, after=None, with_year_level=False):
+    sql, params = remarks_query(instructor_id, after, with_year_level=with_year_level)
+    return page_remarks(await fetch_rows(sql, params))
+
+
+async def get_student_profile(school_id):
+    # Same session profile cache as app.cached_profile() / app.sign_in().
+    principal = f'student:{school_id}'
+    if wsgi.session_store is not None and session.get(PRINCIPAL_KEY) == principal and session.get(PROFILE_KEY):
+        return session[PROFILE_KEY]
+    profile = wsgi.student_profile(await fetch_one(Student, STUDENT_BY_ID_SQL, (school_id,)))
+    if wsgi.session_store is not None:
+        session[PRINCIPAL_KEY] = principal
+        session[PROFILE_KEY] = profile
+    return profile
+
+
+async def queued_submissions(school_id):
+    queue = wsgi.submission_queue
+    return await asyncio.to_thread(queue.for_student, school_id) if queue is not None else []
+
+
+async def cached_page(key, render):
+    # app.cached_page() for coroutine renderers; same cache and keys.
+    if '_flashes' in session:
+        return await render()
+    entry = wsgi.page_cache.get(key)
+    if entry is None:
+        page = await render()
+        if not isinstance(page, str):
+            return page
+        entry = wsgi.page_cache.set(key, page)
+    html, etag = entry
+    response = await make_response(('', 304) if request.if_none_match.contains(etag) else html)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+# --- DECORATORS (Authorization) ---
+
+LOGIN_REDIRECTS = {
+    'student': ('student_id', 'index', 'Please log in to access this page.'),
+    'teacher': ('teacher_id', 'teacher_login', 'Please log in to access this page.'),
+    'admin': ('admin_id', 'admin_login', 'Please log in as an administrator.'),
+}
+
+
+def login_required(role):
+    session_key, login_endpoint, message = LOGIN_REDIRECTS[role]
+
+    def wrapper(f):
+        @wraps(f)
+        async def decorated_function(*args, **kwargs):
+            if not session.get(session_key):
+                await flash(message, 'info')
+                return redirect(url_for(login_endpoint))
+            return await f(*args, **kwargs)
+        return decorated_function
+    return wrapper
+
+
+@quart_app.before_request
+async def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@quart_app.after_request
+async def record_request_metrics(response):
+    endpoint = request.endpoint or 'unmatched'
+    wsgi.request_latency.observe(time.perf_counter() - g.request_started, endpoint=endpoint, method=request.method)
+    wsgi.requests_total.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    wsgi.metrics.maybe_flush()
+    return response
+
+
+# --- ASYNC ROUTES ---
+
+@quart_app.route('/dashboard')
+@login_required('student')
+async def dashboard():
+    school_id = session['student_id']
+    student, instructors, submissions = await asyncio.gather(
+        get_student_profile(school_id),
+        fetch_all(InstructorProgress, INSTRUCTOR_PROGRESS_SQL, (school_id,)),
+        queued_submissions(school_id),
+    )
+    progress = wsgi.build_progress(instructors, submissions)
+
+    return await render_template('dashboard.html',
+        student=student,
+        evaluations_count=progress['evaluated_count'],
+        pending_count=progress['pending_count'],
+        remaining_instructors=progress['remaining_instructors'],
+        total_instructors=progress['total_instructors'],
+        submissions=progress['submissions']
+    )
+
+
+@quart_app.route('/teacher_dashboard')
+@login_required('teacher')
+async def teacher_dashboard():
+    teacher_id = session['teacher_id']
+
+    async def render():
+        courses, approved = await asyncio.gather(
+            fetch_all(CourseSummary, TEACHER_COURSES_SQL, (teacher_id,)),
+            fetch_rows(APPROVED_STUDENTS_SQL),
+        )
+        return await render_template('teacher_dashboard.html',
+                                     courses=courses,
+                                     total_approved_students=approved[0][0])
+
+    instructor_ids = [row[0] for row in await fetch_rows(TEACHER_INSTRUCTOR_IDS_SQL, (teacher_id,))]
+    return await cached_page(wsgi.teacher_dashboard_key(teacher_id, instructor_ids), render)
+
+
+@quart_app.route('/teacher_view_results/<int:instructor_id>')
+@login_required('teacher')
+async def teacher_view_results(instructor_id):
+    teacher_id = session['teacher_id']
+
+    async def render():
+        # The ownership check runs alongside the other queries; their results
+        # are dropped unless it passes.
+        instructor, question_stats, remark_count, (remarks, next_cursor) = await asyncio.gather(
+            fetch_one(Instructor, TEACHER_INSTRUCTOR_SQL, (instructor_id, teacher_id)),
+            get_instructor_stats(instructor_id),
+            count_remarks(instructor_id),
+            fetch_remarks(instructor_id),
+        )
+        if not instructor:
+            await flash('You are not authorized to view results for this instructor.', 'error')
+            return redirect(url_for('teacher_dashboard'))
+
+        return await render_template('teacher_view_results.html',
+                                     instructor=instructor,
+                                     stats=question_stats,
+                                     remarks=remarks,
+                                     remark_count=remark_count,
+                                     next_cursor=next_cursor)
+
+    return await cached_page(wsgi.results_page_key('teacher_view_results', teacher_id, instructor_id), render)
+
+
+@quart_app.route('/admin_view_evaluations/<int:instructor_id>')
+@login_required('admin')
+async def admin_view_evaluations(instructor_id):
+    async def render():
+        instructor, question_stats, remark_count, (remarks, next_cursor) = await asyncio.gather(
+            fetch_one(Instructor, INSTRUCTOR_BY_ID_SQL, (instructor_id,)),
+            get_instructor_stats(instructor_id),
+            count_remarks(instructor_id),
+            fetch_remarks(instructor_id, with_year_level=True),
+        )
+        if not instructor:
+            await flash('Instructor not found.', 'error')
+            return redirect(url_for('admin_manage_instructors'))
+
+        return await render_template('admin_view_evaluations.html',
+                                     instructor=instructor,
+                                     stats=question_stats,
+                                     remarks=remarks,
+                                     remark_count=remark_count,
+                                     next_cursor=next_cursor)
+
+    return await cached_page(wsgi.results_page_key('admin_view_evaluations', session['admin_id'], instructor_id),
+                             render)
+
+
+@quart_app.route('/remarks/<int:instructor_id>')
+async def remarks_feed(instructor_id):
+    is_admin = bool(session.get('admin_id'))
+    teacher_id = session.get('teacher_id')
+    if not is_admin and not teacher_id:
+        return jsonify({'error': 'Please log in to access this page.'}), 401
+
+    if not is_admin and not await fetch_one(Instructor, TEACHER_INSTRUCTOR_SQL, (instructor_id, teacher_id)):
+        return jsonify({'error': 'You are not authorized to view results for this instructor.'}), 403
+
+    remarks, next_cursor = await fetch_remarks(instructor_id, after=request.args.get('cursor'),
+                                               with_year_level=is_admin)
+    return jsonify({
+        'remarks': [{
+            'remarks': remark.remarks,
+            'submitted': remark.e_date_submitted.strftime('%Y-%m-%d %H:%M'),
+            'year_level': remark.s_year_level,
+        } for remark in remarks],
+        'next_cursor': next_cursor,
+    })
+
+
+# --- DISPATCH ---
+
+async def _served_by_wsgi(**kwargs):
+    raise RuntimeError('Dispatched to the WSGI app; registered only so url_for() can build it.')
+
+
+ASYNC_ENDPOINTS = {'static'} | {
+    endpoint for endpoint in quart_app.view_functions if endpoint != 'static'
+}
+
+# Templates build URLs for every route, so the Quart app knows all of them.
+for rule in flask_app.url_map.iter_rules():
+    if rule.endpoint not in quart_app.view_functions:
+        quart_app.add_url_rule(rule.rule, endpoint=rule.endpoint, view_func=_served_by_wsgi, methods=rule.methods)
+
+
+class Dispatcher:
+    """Routes each HTTP request to the async views or to the WSGI app."""
+
+    def __init__(self, async_app, wsgi_app, async_endpoints):
+        self.async_app = async_app
+        # The WSGI side buffers request bodies; leave room for CSV imports.
+        self.wsgi_app = AsyncioWSGIMiddleware(wsgi_app, max_body_size=wsgi_app.config['MAX_CONTENT_LENGTH']
+                                              or 64 * 1024 * 1024)
+        self.async_endpoints = async_endpoints
+        self.urls = async_app.url_map.bind('localhost')
+
+    def is_async(self, scope):
+        try:
+            endpoint, _ = self.urls.match(scope['path'], method=scope['method'])
+        except HTTPException:
+            return False
+        return endpoint in self.async_endpoints
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and not self.is_async(scope):
+            await self.wsgi_app(scope, receive, send)
+        else:
+            await self.async_app(scope, receive, send)
+
+
+application = Dispatcher(quart_app, flask_app, ASYNC_ENDPOINTS)
@@ -0,0 +1,93 @@
+"""Time of the cross-instructor analytics (analytics.py).
+
+    python benchmarks/bench_analytics.py [--evaluations 250000 --questions 4]
+    python benchmarks/bench_analytics.py --db    # the configured database
+
+Without --db, rows shaped like the pivoted evaluations query are generated
+in memory, so the decoding and the vectorized pass are timed alone; the
+default is one million detail rows. With --db the whole analytics page load
+(query, transfer, decoding and statistics) runs against the configured
+database, e.g. one filled by benchmarks/seed.py.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import ROWS_PER_CHUNK, compute_analytics, decode_rows, join_chunks, load_analytics
+from models import Instructor, Question
+
+YEAR_LEVELS = ('1st Year', '2nd Year', '3rd Year', '4th Year')
+COURSES = ('OOP', 'Data Structures', 'Algorithms', 'Databases', 'Networks')
+
+
+def synthetic(evaluations, question_count, instructor_count, seed):
+    rng = random.Random(seed)
+    questions = [Question(q, f'Question {q}', q) for q in range(1, question_count + 1)]
+    instructors = [Instructor(i, 'Instructor', f'Last{i}', COURSES[i % len(COURSES)], None)
+                   for i in range(1, instructor_count + 1)]
+    first_month = 2022 * 12
+    rows = [
+        (rng.randint(1, instructor_count), rng.choice(YEAR_LEVELS), first_month + rng.randrange(48),
+         ''.join(rng.choice('12345') for _ in range(question_count)))
+        for _ in range(evaluations)
+    ]
+    return questions, instructors, rows
+
+
+def run_synthetic(args):
+    questions, instructors, rows = synthetic(args.evaluations, args.questions, args.instructors, args.seed)
+    print(f'{len(rows)} evaluations x {len(questions)} questions = {len(rows) * len(questions)} detail rows, '
+          f'{len(instructors)} instructors')
+    best_decode = best_compute = None
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        chunks = [decode_rows(rows[n:n + ROWS_PER_CHUNK], len(questions))
+                  for n in range(0, len(rows), ROWS_PER_CHUNK)]
+        columns_read = join_chunks(chunks, len(questions))
+        decoded = time.perf_counter()
+        compute_analytics(questions, instructors, *columns_read)
+        finished = time.perf_counter()
+        best_decode = min(best_decode or decoded - started, decoded - started)
+        best_compute = min(best_compute or finished - decoded, finished - decoded)
+    print(f'  decode   {best_decode * 1000:8.1f} ms')
+    print(f'  compute  {best_compute * 1000:8.1f} ms')
+    print(f'  total    {(best_decode + best_compute) * 1000:8.1f} ms (best of {args.repeat})')
+
+
+def run_db(args):
+    import pymysql
+    from app import app
+    from models import list_questions
+
+    conn = pymysql.connect(**app.config['MYSQL_CONFIG'])
+    try:
+        questions = list_questions(conn)
+        for _ in range(args.repeat):
+            result = load_analytics(conn, questions)
+            print(f"{result['rating_count']} ratings in {result['evaluation_count']} evaluations: "
+                  f"read {result['read_ms']} ms, compute {result['compute_ms']} ms")
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--evaluations', type=int, default=250000)
+    parser.add_argument('--questions', type=int, default=4)
+    parser.add_argument('--instructors', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--db', action='store_true', help='Load the analytics from the configured database.')
+    args = parser.parse_args()
+    if args.db:
+        run_db(args)
+    else:
+        run_synthetic(args)
+
+
+if __name__ == '__main__':
+    main()
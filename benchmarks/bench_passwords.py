@@ -0,0 +1,70 @@
+"""Logins per second per core for each password hashing cost setting.
+
+No database is needed; this times the hashing layer alone, which is what
+bounds login throughput during a burst.
+
+    python benchmarks/bench_passwords.py [--seconds 2] [--threads 4]
+
+For every setting it reports single-thread verifications per second (one
+core) and the rate with --threads hashing threads in parallel, which shows
+how far hashlib scales across cores with the GIL released.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passwords import DEFAULT_POLICIES, hash_password, verify_password
+
+SETTINGS = [
+    {'scheme': 'scrypt', 'ln': 12, 'r': 8, 'p': 1},
+    {'scheme': 'scrypt', 'ln': 14, 'r': 8, 'p': 1},
+    {'scheme': 'scrypt', 'ln': 15, 'r': 8, 'p': 1},
+    {'scheme': 'scrypt', 'ln': 16, 'r': 8, 'p': 1},
+    {'scheme': 'pbkdf2-sha256', 'i': 100000},
+    {'scheme': 'pbkdf2-sha256', 'i': 300000},
+    {'scheme': 'pbkdf2-sha256', 'i': 600000},
+]
+
+
+def describe(policy):
+    params = ','.join(f'{k}={v}' for k, v in policy.items() if k != 'scheme')
+    roles = [role for role, default in DEFAULT_POLICIES.items() if default == policy]
+    return f"{policy['scheme']} {params}" + (f"  [{', '.join(roles)}]" if roles else '')
+
+
+def rate(stored, seconds, threads):
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        n = 0
+        while time.perf_counter() < deadline:
+            verify_password(stored, 'correct horse battery staple')
+            n += 1
+        return n
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        total = sum(pool.map(lambda _: worker(), range(threads)))
+    return total / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=2.0, help='Time spent on each measurement.')
+    parser.add_argument('--threads', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(f"{'setting':<44} {'ms/login':>9} {'logins/s/core':>14} {f'logins/s x{args.threads}':>16}")
+    for policy in SETTINGS:
+        stored = hash_password('correct horse battery staple', policy)
+        single = rate(stored, args.seconds, 1)
+        parallel = rate(stored, args.seconds, args.threads)
+        print(f"{describe(policy):<44} {1000 / single:>9.1f} {single:>14.1f} {parallel:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
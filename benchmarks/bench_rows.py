@@ -0,0 +1,111 @@
+"""Memory and allocations of dict rows vs the row types in models.py.
+
+    python benchmarks/bench_rows.py [--rows 50000]
+    python benchmarks/bench_rows.py --db    # read real listing queries
+
+Without --db, rows shaped like the pending-students and instructor listing
+pages are built the way pymysql does it: DictCursor turns each row tuple
+into a dict, while models.py keeps it as a namedtuple. With --db the same
+queries are read through both cursor classes from the configured database.
+Peak traced memory and allocated blocks are measured with tracemalloc.
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import InstructorListing, Student, columns
+
+
+def synthetic_rows(row_type, count):
+    samples = {
+        Student: lambda n: (f'S{n:07d}', 'Student', f'Last{n}', f's{n:07d}@example.invalid', '2nd Year', 'Pending'),
+        InstructorListing: lambda n: (n, 'Instructor', f'Last{n}', f'Course {n % 40}', n % 200, f'Teacher {n % 200}'),
+    }
+    return [samples[row_type](n) for n in range(count)]
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    before_blocks = len(tracemalloc.take_snapshot().traces)
+    started = time.perf_counter()
+    rows = build()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    blocks = len(tracemalloc.take_snapshot().traces) - before_blocks
+    tracemalloc.stop()
+    del rows
+    return peak, blocks, elapsed
+
+
+def report(label, count, dict_result, tuple_result):
+    print(f"\n{label} ({count} rows)")
+    print(f"  {'':<12} {'peak KiB':>10} {'blocks':>10} {'build ms':>10}")
+    for name, (peak, blocks, elapsed) in (('dict rows', dict_result), ('namedtuple', tuple_result)):
+        print(f"  {name:<12} {peak / 1024:>10.0f} {blocks:>10} {elapsed * 1000:>10.1f}")
+    print(f"  namedtuple rows use {tuple_result[0] / dict_result[0]:.0%} of the dict rows' peak memory")
+
+
+def run_synthetic(count):
+    for row_type in (Student, InstructorListing):
+        raw = synthetic_rows(row_type, count)
+        fields = row_type._fields
+        dict_result = measure(lambda: [dict(zip(fields, row)) for row in raw])
+        tuple_result = measure(lambda: [row_type._make(row) for row in raw])
+        report(row_type.__name__, count, dict_result, tuple_result)
+
+
+def run_db():
+    import pymysql
+    from app import app
+
+    queries = {
+        Student: f"SELECT {columns(Student)} FROM tbl_student ORDER BY s_schoolID",
+        InstructorListing: """
+            SELECT i.i_id, i.i_first_name, i.i_last_name, i.i_course, t.t_id,
+                   CONCAT(t.t_first_name, ' ', t.t_last_name)
+            FROM tbl_instructor i LEFT JOIN tbl_teacher t ON i.t_id = t.t_id
+            ORDER BY i.i_last_name
+        """,
+    }
+    conn = pymysql.connect(**app.config['MYSQL_CONFIG'])
+    try:
+        for row_type, sql in queries.items():
+            def read_dicts():
+                with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                    cursor.execute(sql)
+                    return cursor.fetchall()
+
+            def read_tuples():
+                with conn.cursor(pymysql.cursors.Cursor) as cursor:
+                    cursor.execute(sql)
+                    return [row_type._make(row) for row in cursor.fetchall()]
+
+            dict_result = measure(read_dicts)
+            tuple_result = measure(read_tuples)
+            with conn.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) AS n FROM ({sql}) q")
+                count = cursor.fetchone()['n']
+            report(row_type.__name__, count, dict_result, tuple_result)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000, help='Synthetic rows per listing.')
+    parser.add_argument('--db', action='store_true', help='Read the listings from the configured database.')
+    args = parser.parse_args()
+    if args.db:
+        run_db()
+    else:
+        run_synthetic(args.rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Throughput of the sync (WSGI) and async (ASGI) serving modes.
+
+Starts each server in turn on the seeded database, drives it with
+benchmarks/load_test.py at the same concurrency and prints both reports.
+The async mode needs quart, aiomysql and hypercorn installed.
+
+    python benchmarks/bench_serving.py --concurrency 500 --duration 60 --page-views 5
+
+Both servers use --workers processes; the sync one is serve.py, the
+pre-forking launcher. Pass --sync-command to measure another WSGI server
+(e.g. "gunicorn -w 4 --threads 32 -b 127.0.0.1:{port} app:app").
+"""
+import argparse
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Server did not start listening on port {port}')
+
+
+def run_mode(name, command, port, load_args):
+    print(f'\n=== {name}: {command}', flush=True)
+    server = subprocess.Popen(shlex.split(command), cwd=ROOT)
+    try:
+        wait_for_port(port)
+        subprocess.run([sys.executable, os.path.join(ROOT, 'benchmarks', 'load_test.py'),
+                        f'http://127.0.0.1:{port}'] + load_args, cwd=ROOT, check=True)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--sync-command', help='Sync server command; {port} is filled in.')
+    parser.add_argument('--modes', nargs='+', choices=('sync', 'async'), default=['sync', 'async'])
+    args, load_args = parser.parse_known_args()
+    if '--concurrency' not in load_args:
+        load_args += ['--concurrency', '500']
+
+    commands = {
+        'sync': args.sync_command or f'{sys.executable} serve.py --port {{port}} --workers {args.workers}',
+        'async': f'{sys.executable} -m hypercorn asgi:application --bind 127.0.0.1:{{port}} --workers {args.workers}',
+    }
+    for n, mode in enumerate(args.modes):
+        port = args.port + n
+        run_mode(mode, commands[mode].format(port=port), port, load_args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Statements and latency per evaluation submission.
+
+Compares the old per-question insert loop with evaluations.save_evaluation
+for several question counts. Everything runs inside one transaction on the
+configured database and is rolled back at the end.
+
+    python benchmarks/bench_submit.py --submissions 200 --questions 4 20 40
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymysql
+
+from app import app
+from evaluations import save_evaluation
+
+
+class CountingCursor(pymysql.cursors.DictCursor):
+    # executemany() funnels through execute() once per statement it sends,
+    # so a multi-row INSERT counts as one.
+    statements = 0
+
+    def execute(self, query, args=None):
+        CountingCursor.statements += 1
+        return super().execute(query, args)
+
+
+def legacy_save(cursor, school_id, instructor_id, remarks, ratings):
+    cursor.execute(
+        "SELECT COUNT(*) as count FROM tbl_evaluation WHERE s_schoolID = %s AND i_id = %s",
+        (school_id, instructor_id),
+    )
+    cursor.fetchone()
+    cursor.execute(
+        "INSERT INTO tbl_evaluation (i_id, s_schoolID, remarks) VALUES (%s, %s, %s)",
+        (instructor_id, school_id, remarks),
+    )
+    evaluation_id = cursor.lastrowid
+    for q_id, rating in ratings.items():
+        cursor.execute(
+            "INSERT INTO tbl_evaluation_details (e_id, q_id, rating_value) VALUES (%s, %s, %s)",
+            (evaluation_id, q_id, rating),
+        )
+
+
+def seed(cursor, submissions, questions):
+    cursor.execute(
+        "INSERT INTO tbl_instructor (i_first_name, i_last_name, i_course) VALUES ('Bench', 'Mark', 'BENCH')"
+    )
+    instructor_id = cursor.lastrowid
+    cursor.execute("SELECT COALESCE(MAX(q_order), 0) AS max_order FROM tbl_evaluation_questions")
+    first_order = cursor.fetchone()['max_order'] + 1
+    cursor.executemany(
+        "INSERT INTO tbl_evaluation_questions (q_text, q_order) VALUES (%s, %s)",
+        [(f'Bench question {n}', first_order + n) for n in range(questions)],
+    )
+    cursor.execute("SELECT q_id FROM tbl_evaluation_questions WHERE q_order >= %s", (first_order,))
+    q_ids = [row['q_id'] for row in cursor.fetchall()]
+    school_ids = [f'bench-{n}' for n in range(submissions)]
+    cursor.executemany(
+        "INSERT INTO tbl_student (s_schoolID, s_password, s_first_name, s_last_name, s_email, s_year_level, s_status) "
+        "VALUES (%s, 'x', 'Bench', 'Student', %s, '1st Year', 'Approved')",
+        [(school_id, f'{school_id}@bench.invalid') for school_id in school_ids],
+    )
+    return instructor_id, q_ids, school_ids
+
+
+def run(conn, save, submissions, questions):
+    with conn.cursor(CountingCursor) as cursor:
+        instructor_id, q_ids, school_ids = seed(cursor, submissions, questions)
+        CountingCursor.statements = 0
+        started = time.perf_counter()
+        for n, school_id in enumerate(school_ids):
+            ratings = {q_id: (n + q_id) % 5 + 1 for q_id in q_ids}
+            save(cursor, school_id, instructor_id, 'benchmark', ratings)
+        elapsed = time.perf_counter() - started
+    conn.rollback()
+    return CountingCursor.statements / submissions, elapsed / submissions * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--submissions', type=int, default=200)
+    parser.add_argument('--questions', type=int, nargs='+', default=[4, 20, 40])
+    args = parser.parse_args()
+
+    conn = pymysql.connect(**app.config['MYSQL_CONFIG'])
+    try:
+        print(f"{'questions':>9}  {'mode':<8}  {'stmts/submit':>12}  {'ms/submit':>9}")
+        for questions in args.questions:
+            for name, save in (('legacy', legacy_save), ('batched', save_evaluation)):
+                statements, ms = run(conn, save, args.submissions, questions)
+                print(f"{questions:>9}  {name:<8}  {statements:>12.1f}  {ms:>9.2f}")
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
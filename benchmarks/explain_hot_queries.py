@@ -0,0 +1,88 @@
+"""EXPLAIN the hot queries of app.py and fail on unexpected full table scans.
+
+Run against a realistically sized database; on a near-empty one MySQL may
+prefer scans simply because the tables are tiny.
+
+    python benchmarks/explain_hot_queries.py
+
+Exits with status 1 if any query plan contains a full scan (type ALL) of a
+table not listed as an intended scan for that query.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymysql
+
+from app import app
+from evaluations import (INSTRUCTOR_EVALUATION_COUNT_SQL, QUESTION_RATING_COUNT_SQL, REMARK_COUNT_SQL, remarks_query,
+                         search_query, summary_rows_query)
+from exporter import export_query
+from models import (APPROVED_STUDENTS_SQL, INSTRUCTOR_PROGRESS_SQL, PENDING_STUDENTS_SQL, STUDENT_CREDENTIALS_SQL,
+                    TEACHER_COURSES_SQL, TEACHER_INSTRUCTOR_IDS_SQL, TEACHERS_SQL)
+
+# (name, sample params -> (sql, params), tables the query is meant to read in
+# full). The statements are the ones the app runs; sample values come from
+# sample_params().
+HOT_QUERIES = [
+    ('student login', lambda p: (STUDENT_CREDENTIALS_SQL, (p['school_id'],)), set()),
+    ('student progress', lambda p: (INSTRUCTOR_PROGRESS_SQL, (p['school_id'],)), {'i'}),
+    ('teacher dashboard', lambda p: (TEACHER_COURSES_SQL, (p['teacher_id'],)), set()),
+    ('teacher instructor ids', lambda p: (TEACHER_INSTRUCTOR_IDS_SQL, (p['teacher_id'],)), set()),
+    ('question stats', lambda p: summary_rows_query([p['instructor_id']]), set()),
+    ('remark count', lambda p: (REMARK_COUNT_SQL, (p['instructor_id'],)), set()),
+    ('remarks page', lambda p: remarks_query(p['instructor_id'], with_year_level=True), set()),
+    ('remarks search', lambda p: search_query('helpful examples'), set()),
+    ('pending students page', lambda p: (PENDING_STUDENTS_SQL, ('', 51)), set()),
+    ('approved students count', lambda p: (APPROVED_STUDENTS_SQL, ()), set()),
+    ('question in use', lambda p: (QUESTION_RATING_COUNT_SQL, (p['question_id'],)), set()),
+    ('instructor has evaluations', lambda p: (INSTRUCTOR_EVALUATION_COUNT_SQL, (p['instructor_id'],)), set()),
+    ('teacher listing', lambda p: (TEACHERS_SQL, ()), {'tbl_teacher'}),
+    ('instructor export', lambda p: export_query(p['instructor_id']), set()),
+]
+
+
+def sample_params(cursor):
+    cursor.execute("SELECT s_schoolID FROM tbl_student LIMIT 1")
+    school_id = (cursor.fetchone() or {}).get('s_schoolID', '')
+    cursor.execute("SELECT i_id, COALESCE(t_id, 0) AS t_id FROM tbl_instructor WHERE t_id IS NOT NULL LIMIT 1")
+    instructor = cursor.fetchone() or {'i_id': 0, 't_id': 0}
+    cursor.execute("SELECT q_id FROM tbl_evaluation_questions LIMIT 1")
+    question_id = (cursor.fetchone() or {}).get('q_id', 0)
+    return {
+        'school_id': school_id,
+        'instructor_id': instructor['i_id'],
+        'teacher_id': instructor['t_id'],
+        'question_id': question_id,
+    }
+
+
+def main():
+    conn = pymysql.connect(**app.config['MYSQL_CONFIG'])
+    failures = 0
+    try:
+        with conn.cursor() as cursor:
+            params = sample_params(cursor)
+            for name, build, allowed_scans in HOT_QUERIES:
+                sql, query_params = build(params)
+                cursor.execute("EXPLAIN " + sql, query_params)
+                scans = [
+                    row for row in cursor.fetchall()
+                    if row['type'] == 'ALL' and row['table'] not in allowed_scans
+                ]
+                status = 'FULL SCAN' if scans else 'ok'
+                print(f"{status:<9}  {name}")
+                for row in scans:
+                    print(f"           table={row['table']} rows={row['rows']} extra={row.get('Extra')}")
+                failures += bool(scans)
+    finally:
+        conn.close()
+
+    if failures:
+        print(f"\n{failures} hot query plan(s) fall back to a full table scan.")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
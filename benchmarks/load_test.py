@@ -0,0 +1,203 @@
+"""Concurrent load test against a running instance of the app.
+
+Virtual users log in and walk the real routes over HTTP, so the same run
+works against any serving mode (flask run, a pre-forked launcher, ASGI).
+It expects data created by benchmarks/seed.py.
+
+    python benchmarks/load_test.py http://127.0.0.1:5000 \
+        --concurrency 50 --duration 60 --students 50000 --teachers 200
+
+Prints p50/p95/p99 latency and throughput per route. Queries per request
+come from the X-DB-Query-Count header, sent when the server runs in debug
+mode or with SQL_STATS_HEADERS on. With --mysql-status it also reports
+statements per request from the MySQL "Questions" counter, which counts
+every client of the server, so run it on an otherwise idle database.
+"""
+import argparse
+import http.cookiejar
+import itertools
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = 'password'
+STUDENT_ID = 'S{:07d}'  # as generated by benchmarks/seed.py
+INSTRUCTOR_OPTION = re.compile(r'<option value="(\d+)">')
+QUESTION_INPUT = re.compile(r'name="q_(\d+)"')
+RESULTS_LINK = re.compile(r'/teacher_view_results/(\d+)')
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.queries = defaultdict(list)
+
+    def record(self, name, seconds, ok, query_count=None):
+        with self.lock:
+            self.latencies[name].append(seconds)
+            if not ok:
+                self.errors[name] += 1
+            if query_count is not None:
+                self.queries[name].append(query_count)
+
+
+class Client:
+    def __init__(self, base_url, stats):
+        self.base_url = base_url.rstrip('/')
+        self.stats = stats
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect()
+        )
+
+    def request(self, name, path, form=None):
+        data = urllib.parse.urlencode(form, doseq=True).encode() if form is not None else None
+        started = time.perf_counter()
+        try:
+            response = self.opener.open(self.base_url + path, data=data, timeout=60)
+            status, headers, body = response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            status, headers, body = e.code, e.headers, e.read()
+        except OSError:
+            self.stats.record(name, time.perf_counter() - started, False)
+            return None
+        query_count = headers.get('X-DB-Query-Count')
+        self.stats.record(name, time.perf_counter() - started, status < 400,
+                          int(query_count) if query_count else None)
+        return body.decode('utf-8', 'replace')
+
+
+def student_session(client, school_id, rng, page_views=1):
+    client.request('POST / (login)', '/', {
+        'action': 'login', 'login_school_id': school_id, 'login_password': PASSWORD,
+    })
+    for _ in range(page_views):
+        client.request('GET /dashboard', '/dashboard')
+    page = client.request('GET /evaluate', '/evaluate')
+    if not page:
+        return
+    instructors = INSTRUCTOR_OPTION.findall(page)
+    questions = set(QUESTION_INPUT.findall(page))
+    if instructors:
+        form = {f'q_{q_id}': rng.randint(1, 5) for q_id in questions}
+        form.update({'instructor': rng.choice(instructors), 'remarks': 'load test'})
+        client.request('POST /evaluate', '/evaluate', form)
+
+
+def teacher_session(client, username, rng, page_views=1):
+    client.request('POST /teacher_login', '/teacher_login', {'username': username, 'password': PASSWORD})
+    for _ in range(page_views):
+        page = client.request('GET /teacher_dashboard', '/teacher_dashboard')
+        instructor_ids = RESULTS_LINK.findall(page or '')
+        if instructor_ids:
+            client.request('GET /teacher_view_results', f'/teacher_view_results/{rng.choice(instructor_ids)}')
+
+
+def admin_session(client, instructor_count, rng, page_views=1):
+    client.request('POST /admin_login', '/admin_login', {'username': 'admin', 'password': PASSWORD})
+    client.request('GET /admin_dashboard', '/admin_dashboard')
+    for _ in range(page_views):
+        client.request('GET /admin_view_evaluations',
+                       f'/admin_view_evaluations/{rng.randint(1, instructor_count)}')
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def mysql_questions():
+    import pymysql
+    from app import app
+    conn = pymysql.connect(**app.config['MYSQL_CONFIG'])
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SHOW GLOBAL STATUS LIKE 'Questions'")
+            return int(cursor.fetchone()['Value'])
+    finally:
+        conn.close()
+
+
+def report(stats, elapsed, questions_delta):
+    total_requests = sum(len(v) for v in stats.latencies.values())
+    print(f"\n{'route':<28} {'requests':>8} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'q/req':>6}")
+    for name in sorted(stats.latencies):
+        values = sorted(stats.latencies[name])
+        queries = stats.queries.get(name)
+        per_request = f"{sum(queries) / len(queries):6.1f}" if queries else '     -'
+        print(f"{name:<28} {len(values):>8} {stats.errors[name]:>6} "
+              f"{percentile(values, 0.50) * 1000:>8.1f} {percentile(values, 0.95) * 1000:>8.1f} "
+              f"{percentile(values, 0.99) * 1000:>8.1f} {len(values) / elapsed:>8.1f} {per_request}")
+    print(f"\n{total_requests} requests in {elapsed:.1f}s = {total_requests / elapsed:.1f} req/s")
+    if questions_delta is not None and total_requests:
+        print(f"MySQL statements per request (server-wide): {questions_delta / total_requests:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('base_url')
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run.')
+    parser.add_argument('--students', type=int, default=50000, help='Seeded student count.')
+    parser.add_argument('--teachers', type=int, default=200, help='Seeded teacher count.')
+    parser.add_argument('--instructors', type=int, default=2000, help='Seeded instructor count.')
+    parser.add_argument('--mix', default='8,1,1', help='Relative weight of student,teacher,admin sessions.')
+    parser.add_argument('--page-views', type=int, default=1,
+                        help='Read pages viewed per login, to weight the mix toward reads.')
+    parser.add_argument('--mysql-status', action='store_true', help='Report server-wide statements per request.')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    weights = [int(w) for w in args.mix.split(',')]
+    stats = Stats()
+    # Students are handed out in order so concurrent users never share one.
+    student_numbers = itertools.count(1)
+    numbers_lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+
+    def virtual_user(worker):
+        rng = random.Random(args.seed * 1000 + worker)
+        while time.monotonic() < deadline:
+            client = Client(args.base_url, stats)
+            kind = rng.choices(('student', 'teacher', 'admin'), weights)[0]
+            if kind == 'student':
+                with numbers_lock:
+                    number = next(student_numbers)
+                student_session(client, STUDENT_ID.format((number - 1) % args.students + 1), rng,
+                                args.page_views)
+            elif kind == 'teacher':
+                teacher_session(client, f'teacher{rng.randint(1, args.teachers)}', rng, args.page_views)
+            else:
+                admin_session(client, args.instructors, rng, args.page_views)
+
+    questions_before = mysql_questions() if args.mysql_status else None
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for worker in range(args.concurrency):
+            pool.submit(virtual_user, worker)
+    elapsed = time.monotonic() - started
+    questions_delta = mysql_questions() - questions_before if args.mysql_status else None
+
+    report(stats, elapsed, questions_delta)
+
+
+if __name__ == '__main__':
+    main()
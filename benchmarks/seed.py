@@ -0,0 +1,188 @@
+"""Fill the configured database with synthetic data at a chosen scale.
+
+    python benchmarks/seed.py --students 50000 --instructors 2000 \
+        --questions 40 --evaluations-per-student 25 --truncate
+
+Rows go in with large multi-row INSERTs, foreign-key checks off (and unique
+checks too with --truncate), and a commit per chunk. The rating summaries
+and report rollups are rebuilt at the end. Everything is generated from --seed, so runs are repeatable. Run it on a
+freshly migrated database or pass --truncate; student IDs always start at 1.
+
+Accounts created (all with the password "password"):
+    students   S0000001, S0000002, ...   (10% left Pending)
+    teachers   teacher1, teacher2, ...
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymysql
+
+from app import app
+from evaluations import rebuild_summary
+from passwords import DEFAULT_POLICIES, hash_password
+from rollups import rebuild_rollups
+
+CHUNK_SIZE = 5000
+YEAR_LEVELS = ('1st Year', '2nd Year', '3rd Year', '4th Year')
+COURSES = ('OOP', 'Data Structures', 'Algorithms', 'Databases', 'Networks', 'Operating Systems',
+           'Web Development', 'Discrete Math', 'Statistics', 'Software Engineering')
+REMARK_WORDS = ('clear', 'helpful', 'engaging', 'fast', 'slow', 'organized', 'fair', 'strict',
+                'patient', 'confusing', 'examples', 'lectures', 'feedback', 'projects', 'exams',
+                'great', 'needs', 'more', 'practice', 'explains', 'well', 'late', 'prepared')
+DATA_TABLES = ('tbl_rating_summary', 'tbl_instructor_summary', 'tbl_evaluation_details',
+               'tbl_evaluation', 'tbl_student', 'tbl_instructor', 'tbl_teacher')
+
+STUDENT_ID = 'S{:07d}'
+
+
+def student_id(n):
+    return STUDENT_ID.format(n)
+
+
+def bulk_insert(conn, sql, rows, label):
+    started = time.perf_counter()
+    total = 0
+    chunk = []
+    with conn.cursor() as cursor:
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= CHUNK_SIZE:
+                cursor.executemany(sql, chunk)
+                conn.commit()
+                total += len(chunk)
+                chunk = []
+        if chunk:
+            cursor.executemany(sql, chunk)
+            conn.commit()
+            total += len(chunk)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<20} {total:>10} rows  {elapsed:7.1f}s  {total / elapsed if elapsed else 0:9.0f} rows/s")
+    return total
+
+
+def next_id(cursor, table, column):
+    cursor.execute(f"SELECT COALESCE(MAX({column}), 0) + 1 AS next_id FROM {table}")
+    return cursor.fetchone()['next_id']
+
+
+def seed(conn, args):
+    rng = random.Random(args.seed)
+    now = datetime.now().replace(microsecond=0)
+    # One hash per role, shared by every synthetic account: logins pay the
+    # real hashing cost without the seeder paying it per row.
+    policies = dict(DEFAULT_POLICIES, **app.config['PASSWORD_HASHING'])
+    teacher_hash = hash_password('password', policies['teacher'])
+    student_hash = hash_password('password', policies['student'])
+
+    with conn.cursor() as cursor:
+        cursor.execute("SET foreign_key_checks = 0")
+        if args.truncate:
+            for table in DATA_TABLES:
+                cursor.execute(f"TRUNCATE TABLE {table}")
+            # Only safe on empty tables: InnoDB may then skip checking
+            # secondary UNIQUE keys, and generated IDs cannot collide.
+            cursor.execute("SET unique_checks = 0")
+        first_teacher = next_id(cursor, 'tbl_teacher', 't_id')
+        first_instructor = next_id(cursor, 'tbl_instructor', 'i_id')
+        first_evaluation = next_id(cursor, 'tbl_evaluation', 'e_id')
+        cursor.execute("SELECT COALESCE(MAX(q_order), 0) AS max_order, COUNT(*) AS count FROM tbl_evaluation_questions")
+        questions = cursor.fetchone()
+    conn.commit()
+
+    missing_questions = max(args.questions - questions['count'], 0)
+    bulk_insert(conn, "INSERT INTO tbl_evaluation_questions (q_text, q_order) VALUES (%s, %s)", (
+        (f'Synthetic question {n + 1}', questions['max_order'] + n + 1) for n in range(missing_questions)
+    ), 'questions')
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT q_id FROM tbl_evaluation_questions ORDER BY q_order LIMIT %s", (args.questions,))
+        q_ids = [row['q_id'] for row in cursor.fetchall()]
+
+    bulk_insert(conn, "INSERT INTO tbl_teacher (t_id, t_username, t_password, t_first_name, t_last_name) "
+                      "VALUES (%s, %s, %s, %s, %s)", (
+        (first_teacher + n, f'teacher{first_teacher + n}', teacher_hash, 'Teacher', f'Last{rng.randrange(10 ** 6):06d}')
+        for n in range(args.teachers)
+    ), 'teachers')
+
+    instructor_ids = list(range(first_instructor, first_instructor + args.instructors))
+    bulk_insert(conn, "INSERT INTO tbl_instructor (i_id, i_first_name, i_last_name, i_course, t_id) "
+                      "VALUES (%s, %s, %s, %s, %s)", (
+        (i_id, 'Instructor', f'Last{rng.randrange(10 ** 6):06d}',
+         f'{rng.choice(COURSES)} {rng.randint(1, 4)}',
+         first_teacher + n % args.teachers if args.teachers else None)
+        for n, i_id in enumerate(instructor_ids)
+    ), 'instructors')
+
+    bulk_insert(conn, "INSERT INTO tbl_student (s_schoolID, s_password, s_first_name, s_last_name, s_email, "
+                      "s_year_level, s_status, s_date_registered) "
+                      "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)", (
+        (student_id(n), student_hash, 'Student', f'Last{n}', f'{student_id(n).lower()}@example.invalid',
+         rng.choice(YEAR_LEVELS), 'Pending' if rng.random() < 0.1 else 'Approved',
+         now - timedelta(days=rng.randint(0, 730)))
+        for n in range(1, args.students + 1)
+    ), 'students')
+
+    # e_ids are assigned here rather than by AUTO_INCREMENT, so the detail
+    # rows below can reference them without reading anything back.
+    per_student = min(args.evaluations_per_student, len(instructor_ids))
+
+    def evaluation_rows():
+        e_id = first_evaluation
+        for n in range(1, args.students + 1):
+            for i_id in rng.sample(instructor_ids, per_student):
+                remarks = ' '.join(rng.choices(REMARK_WORDS, k=rng.randint(4, 14))) if rng.random() < 0.3 else None
+                submitted = now - timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60))
+                yield (e_id, i_id, student_id(n), remarks, submitted)
+                e_id += 1
+
+    evaluation_count = bulk_insert(conn, "INSERT INTO tbl_evaluation (e_id, i_id, s_schoolID, remarks, e_date_submitted) "
+                                         "VALUES (%s, %s, %s, %s, %s)", evaluation_rows(), 'evaluations')
+
+    def detail_rows():
+        for e_id in range(first_evaluation, first_evaluation + evaluation_count):
+            bias = rng.randint(-1, 1)
+            for q_id in q_ids:
+                yield (e_id, q_id, min(max(rng.randint(2, 5) + bias, 1), 5))
+
+    bulk_insert(conn, "INSERT INTO tbl_evaluation_details (e_id, q_id, rating_value) VALUES (%s, %s, %s)",
+                detail_rows(), 'evaluation details')
+
+    started = time.perf_counter()
+    with conn.cursor() as cursor:
+        cursor.execute("SET unique_checks = 1, foreign_key_checks = 1")
+    rebuild_summary(conn)
+    print(f"  {'rating summaries':<20} {'rebuilt':>10}       {time.perf_counter() - started:7.1f}s")
+
+    # Also resets the high-water mark, which --truncate leaves past the new e_ids.
+    started = time.perf_counter()
+    rebuild_rollups(conn, settle_seconds=0)
+    print(f"  {'report rollups':<20} {'rebuilt':>10}       {time.perf_counter() - started:7.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=50000)
+    parser.add_argument('--teachers', type=int, default=200)
+    parser.add_argument('--instructors', type=int, default=2000)
+    parser.add_argument('--questions', type=int, default=40)
+    parser.add_argument('--evaluations-per-student', type=int, default=25)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--truncate', action='store_true',
+                        help='Empty students, teachers, instructors and evaluations first.')
+    args = parser.parse_args()
+
+    conn = pymysql.connect(**app.config['MYSQL_CONFIG'])
+    try:
+        print(f"Seeding {app.config['MYSQL_CONFIG']['database']}...")
+        seed(conn, args)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
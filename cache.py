@@ -0,0 +1,179 @@
+"""In-process caches kept consistent across worker processes.
+
+Each worker holds its own copy of the cached value. A small version file
+shared by all workers on the host records the current generation; writers
+replace it on invalidation and every reader compares it before serving its
+local copy, so a change made through any worker is seen by all of them on
+their next read.
+
+``FragmentCache`` holds rendered pages under keys that contain the versions
+they were rendered from: a bump makes the next lookup use a new key, and
+the old entry ages out of the LRU.
+"""
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+def _read_version(path):
+    try:
+        with open(path, 'r') as f:
+            return f.read()
+    except FileNotFoundError:
+        return ''
+
+
+def _write_version(path):
+    # A fresh random token instead of a counter: no read-modify-write, so
+    # concurrent bumps from several processes need no file locking.
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(uuid.uuid4().hex)
+    os.replace(tmp_path, path)
+
+
+class SharedVersion:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def get(self):
+        return _read_version(self.path)
+
+    def bump(self):
+        _write_version(self.path)
+
+
+class KeyedVersions:
+    """One shared version per integer key (e.g. per instructor id), as files in ``directory``.
+
+    Keys must be ints: the key names a file, and '01' and '1' would name two
+    versions of the same instructor.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        if not isinstance(key, int) or isinstance(key, bool):
+            raise TypeError(f'version keys must be ints, not {type(key).__name__}')
+        return os.path.join(self.directory, str(key))
+
+    def get(self, key):
+        return _read_version(self._path(key))
+
+    def bump(self, key):
+        _write_version(self._path(key))
+
+
+class VersionedCache:
+    """Single cached value, reloaded when the shared version changes.
+
+    With ``ttl`` set, the value is also reloaded once it is older than
+    ``ttl`` seconds, for data that can change without an explicit
+    invalidation.
+    """
+
+    def __init__(self, name, version, ttl=None):
+        self.name = name
+        self.version = version
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._value = _MISSING
+        self._value_version = None
+        self._expires_at = None
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, version):
+        with self._lock:
+            if (self._value is not _MISSING and self._value_version == version
+                    and (self._expires_at is None or time.monotonic() < self._expires_at)):
+                self.hits += 1
+                return self._value
+            self.misses += 1
+            return _MISSING
+
+    def _store(self, value, version):
+        # Tag the value with the version read *before* loading, so a bump that
+        # races with the load forces another reload on the next call.
+        with self._lock:
+            self._value = value
+            self._value_version = version
+            self._expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        return value
+
+    def get(self, loader):
+        version = self.version.get()
+        value = self._lookup(version)
+        if value is _MISSING:
+            value = self._store(loader(), version)
+        return value
+
+    async def get_async(self, loader):
+        """``get`` for coroutines: ``loader`` is a coroutine function."""
+        version = self.version.get()
+        value = self._lookup(version)
+        if value is _MISSING:
+            value = self._store(await loader(), version)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._value = _MISSING
+        self.version.bump()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'version': self._value_version,
+            }
+
+
+class FragmentCache:
+    """Rendered HTML with its ETag, at most ``max_entries`` per process (LRU)."""
+
+    def __init__(self, name, max_entries=500):
+        self.name = name
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """``(html, etag)`` for ``key``, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, html):
+        entry = (html, hashlib.sha1(html.encode('utf8')).hexdigest())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+            }
@@ -0,0 +1,214 @@
+"""Bounded, thread-safe pool of pymysql connections.
+
+Each worker process owns its own pool. Connections inherited across a
+fork are dropped (never closed, since the parent still uses the socket)
+and the child starts with an empty pool.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class _PooledConnection:
+    __slots__ = ('conn', 'created_at', 'last_used')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    def __init__(self, connect_kwargs, min_size=1, max_size=10, timeout=5.0,
+                 recycle=3600, health_check_interval=30, max_idle_time=300):
+        if min_size > max_size:
+            raise ValueError('min_size cannot be larger than max_size')
+        self.connect_kwargs = dict(connect_kwargs)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.health_check_interval = health_check_interval
+        self.max_idle_time = max_idle_time
+        self._cond = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = deque()
+        self._in_use = {}
+        self._size = 0
+        self._counters = {
+            'acquired': 0,
+            'created': 0,
+            'recycled': 0,
+            'discarded': 0,
+            'timeouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+        }
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _connect(self):
+        return _PooledConnection(pymysql.connect(**self.connect_kwargs))
+
+    def _close(self, pooled):
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+
+    def _is_usable(self, pooled, now):
+        """None if ``pooled`` can be handed out, else the counter to charge its removal to.
+
+        May ping the server, so it is called without holding the lock.
+        """
+        if self.recycle is not None and now - pooled.created_at >= self.recycle:
+            return 'recycled'
+        if now - pooled.last_used >= self.health_check_interval:
+            try:
+                pooled.conn.ping(reconnect=False)
+            except Exception:
+                return 'discarded'
+        return None
+
+    def warm(self):
+        """Open connections until the pool holds at least ``min_size``."""
+        with self._cond:
+            self._check_pid()
+            while self._size < self.min_size:
+                self._idle.append(self._connect())
+                self._size += 1
+                self._counters['created'] += 1
+
+    def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        while True:
+            with self._cond:
+                self._check_pid()
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        raise PoolTimeout(
+                            f'No database connection available within {self.timeout}s '
+                            f'(pool size {self.max_size})'
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+                if not self._idle:
+                    # Reserve the slot, then connect without holding the lock.
+                    self._size += 1
+                    break
+                # The candidate keeps its slot while it is checked outside the lock.
+                pooled = self._idle.pop()
+
+            reason = self._is_usable(pooled, time.monotonic())
+            if reason is None:
+                with self._cond:
+                    return self._checkout(pooled, started, waited)
+            self._close(pooled)
+            with self._cond:
+                self._counters[reason] += 1
+                self._size -= 1
+                self._cond.notify()
+
+        try:
+            pooled = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._counters['created'] += 1
+            return self._checkout(pooled, started, waited)
+
+    def _checkout(self, pooled, started, waited):
+        wait_time = time.monotonic() - started
+        self._counters['acquired'] += 1
+        if waited:
+            self._counters['waits'] += 1
+        self._counters['wait_time_total'] += wait_time
+        self._counters['wait_time_max'] = max(self._counters['wait_time_max'], wait_time)
+        self._in_use[id(pooled.conn)] = pooled
+        return pooled.conn
+
+    def release(self, conn, discard=False):
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            pooled = self._in_use.pop(id(conn), None)
+        if pooled is None:
+            return
+
+        if not discard:
+            try:
+                # End any open transaction so the next borrower never sees a
+                # stale REPEATABLE READ snapshot or uncommitted writes.
+                if conn.open and conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                    conn.rollback()
+                discard = not conn.open
+            except Exception:
+                discard = True
+
+        with self._cond:
+            now = time.monotonic()
+            if discard:
+                self._counters['discarded'] += 1
+                self._size -= 1
+                stale = [pooled]
+            else:
+                pooled.last_used = now
+                self._idle.append(pooled)
+                stale = self._prune_idle(now)
+            self._cond.notify()
+        for pooled in stale:
+            self._close(pooled)
+
+    def _prune_idle(self, now):
+        """Take the idle connections past ``max_idle_time`` out of the pool; the caller closes them."""
+        # Oldest idle connections sit at the left end of the deque.
+        stale = []
+        while (self._size > self.min_size and self._idle
+               and now - self._idle[0].last_used >= self.max_idle_time):
+            stale.append(self._idle.popleft())
+            self._size -= 1
+        return stale
+
+    def close(self):
+        with self._cond:
+            while self._idle:
+                self._close(self._idle.pop())
+                self._size -= 1
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            self._check_pid()
+            stats = dict(self._counters)
+            stats.update({
+                'pid': self._pid,
+                'size': self._size,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            })
+        acquired = stats['acquired']
+        stats['wait_time_avg'] = stats['wait_time_total'] / acquired if acquired else 0.0
+        return stats
@@ -0,0 +1,377 @@
+"""Evaluation results: per-question rating statistics for instructors."""
+import math
+import re
+from datetime import datetime, timedelta
+
+import pymysql
+from markupsafe import Markup, escape
+from pymysql.constants import ER
+
+from models import Remark, RemarkHit
+
+RATING_SCALE = (1, 2, 3, 4, 5)
+RATING_COLUMNS = ', '.join(f'rs_rating_{value}' for value in RATING_SCALE)
+REMARKS_PAGE_SIZE = 20
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGES = 50  # ranked hits are paged by OFFSET, so deep pages are cut off
+SEARCH_MIN_WORD = 3    # innodb_ft_min_token_size; shorter words are not in the index
+
+
+class DuplicateEvaluation(Exception):
+    pass
+
+
+def summary_rows_query(instructor_ids):
+    """(sql, params) reading the tbl_rating_summary rows of ``instructor_ids`` as dict rows."""
+    placeholders = ', '.join(['%s'] * len(instructor_ids))
+    return f"""
+        SELECT i_id, q_id, rs_count, rs_sum, rs_sum_sq, {RATING_COLUMNS}
+        FROM tbl_rating_summary
+        WHERE i_id IN ({placeholders})
+    """, list(instructor_ids)
+
+
+def stats_from_summary_rows(questions, instructor_ids, rows):
+    """Per-question stats for every instructor: {i_id: [stat, ...]} in question order."""
+    per_instructor = {i_id: {} for i_id in instructor_ids}
+    for row in rows:
+        per_instructor[row['i_id']][row['q_id']] = row
+    return {
+        i_id: [summarize_ratings(q, per_question.get(q.q_id)) for q in questions]
+        for i_id, per_question in per_instructor.items()
+    }
+
+
+def _median(distribution, total):
+    ordered = sorted(distribution.items())
+
+    def value_at(position):
+        seen = 0
+        for value, count in ordered:
+            seen += count
+            if seen > position:
+                return value
+
+    if total % 2:
+        return value_at(total // 2)
+    return (value_at(total // 2 - 1) + value_at(total // 2)) / 2
+
+
+def summarize_ratings(q, summary):
+    total = summary['rs_count'] if summary else 0
+    distribution = {
+        value: summary[f'rs_rating_{value}'] if summary else 0
+        for value in RATING_SCALE
+    }
+    stat = {
+        'q_id': q.q_id,
+        'q_text': q.q_text,
+        'total_responses': total,
+        'distribution': distribution,
+        'avg_rating': "N/A",
+        'median': "N/A",
+        'std_dev': "N/A",
+    }
+    if total:
+        mean = summary['rs_sum'] / total
+        variance = max(summary['rs_sum_sq'] / total - mean ** 2, 0)
+        stat['avg_rating'] = f"{mean:.2f}"
+        stat['median'] = f"{_median(distribution, total):.1f}"
+        stat['std_dev'] = f"{math.sqrt(variance):.2f}"
+    return stat
+
+
+def build_question_stats(cursor, questions, instructor_ids):
+    """Per-question stats for every instructor in ``instructor_ids``.
+
+    Returns {i_id: [stat, ...]} with one stat per question, in question order.
+    """
+    rows = ()
+    if instructor_ids:
+        cursor.execute(*summary_rows_query(instructor_ids))
+        rows = cursor.fetchall()
+    return stats_from_summary_rows(questions, instructor_ids, rows)
+
+
+def build_instructor_stats(cursor, questions, instructor_id):
+    return build_question_stats(cursor, questions, [instructor_id])[instructor_id]
+
+
+# --- RATING SUMMARY MAINTENANCE ---
+# tbl_rating_summary keeps running count, sum, sum of squares and the 1-5
+# distribution per (instructor, question); tbl_instructor_summary keeps the
+# number of submitted evaluations and written remarks per instructor. Both are updated in the
+# same transaction as the evaluation insert, so reads never touch the raw
+# detail rows.
+
+_RATING_PLACEHOLDERS = ', '.join(['%s'] * len(RATING_SCALE))
+_RATING_INCREMENTS = ', '.join(
+    f'rs_rating_{value} = rs_rating_{value} + VALUES(rs_rating_{value})'
+    for value in RATING_SCALE
+)
+_RATING_SUMS = ', '.join(f'SUM(ed.rating_value = {value})' for value in RATING_SCALE)
+
+
+def record_in_summary(cursor, instructor_id, ratings, has_remarks=False):
+    """Fold one submitted evaluation ({q_id: rating}) into the summaries."""
+    # Every VALUES item must be a placeholder for pymysql to send this as a
+    # single multi-row INSERT.
+    cursor.executemany(f"""
+        INSERT INTO tbl_rating_summary (i_id, q_id, rs_count, rs_sum, rs_sum_sq, {RATING_COLUMNS})
+        VALUES (%s, %s, %s, %s, %s, {_RATING_PLACEHOLDERS})
+        ON DUPLICATE KEY UPDATE
+            rs_count = rs_count + VALUES(rs_count),
+            rs_sum = rs_sum + VALUES(rs_sum),
+            rs_sum_sq = rs_sum_sq + VALUES(rs_sum_sq),
+            {_RATING_INCREMENTS}
+    """, [
+        (instructor_id, q_id, 1, rating, rating * rating,
+         *(int(rating == value) for value in RATING_SCALE))
+        for q_id, rating in ratings.items()
+    ])
+    cursor.execute("""
+        INSERT INTO tbl_instructor_summary (i_id, is_evaluation_count, is_remark_count)
+        VALUES (%s, 1, %s)
+        ON DUPLICATE KEY UPDATE
+            is_evaluation_count = is_evaluation_count + 1,
+            is_remark_count = is_remark_count + VALUES(is_remark_count)
+    """, (instructor_id, int(has_remarks)))
+
+
+def rebuild_summary(db):
+    """Regenerate both summary tables from the raw evaluation rows."""
+    with db.cursor() as cursor:
+        cursor.execute("DELETE FROM tbl_rating_summary")
+        cursor.execute("DELETE FROM tbl_instructor_summary")
+        cursor.execute(f"""
+            INSERT INTO tbl_rating_summary (i_id, q_id, rs_count, rs_sum, rs_sum_sq, {RATING_COLUMNS})
+            SELECT
+                e.i_id,
+                ed.q_id,
+                COUNT(*),
+                SUM(ed.rating_value),
+                SUM(ed.rating_value * ed.rating_value),
+                {_RATING_SUMS}
+            FROM tbl_evaluation e
+            JOIN tbl_evaluation_details ed ON ed.e_id = e.e_id
+            GROUP BY e.i_id, ed.q_id
+        """)
+        cursor.execute("""
+            INSERT INTO tbl_instructor_summary (i_id, is_evaluation_count, is_remark_count)
+            SELECT i_id, COUNT(*), SUM(remarks IS NOT NULL AND remarks != '')
+            FROM tbl_evaluation
+            GROUP BY i_id
+        """)
+    db.commit()
+
+
+# --- SUBMISSION ---
+
+def save_evaluation(cursor, school_id, instructor_id, remarks, ratings):
+    """Write one evaluation with a fixed number of statements.
+
+    The parent row, all detail rows (one multi-row INSERT) and the summary
+    upserts go out as four statements whatever the number of questions.
+    A second evaluation of the same instructor is rejected by the
+    ``unique_evaluation`` key and surfaces as DuplicateEvaluation; the caller
+    owns the transaction and should roll back.
+    """
+    try:
+        cursor.execute("""
+            INSERT INTO tbl_evaluation (i_id, s_schoolID, remarks)
+            VALUES (%s, %s, %s)
+        """, (instructor_id, school_id, remarks))
+    except pymysql.err.IntegrityError as e:
+        if e.args[0] == ER.DUP_ENTRY:
+            raise DuplicateEvaluation(school_id, instructor_id) from e
+        raise
+
+    evaluation_id = cursor.lastrowid
+    cursor.executemany("""
+        INSERT INTO tbl_evaluation_details (e_id, q_id, rating_value)
+        VALUES (%s, %s, %s)
+    """, [(evaluation_id, q_id, rating) for q_id, rating in ratings.items()])
+
+    # Same test as the SQL `remarks != ''`, which ignores trailing spaces.
+    record_in_summary(cursor, instructor_id, ratings, has_remarks=bool(remarks and remarks.rstrip(' ')))
+    return evaluation_id
+
+
+# Checked before an instructor or a question that evaluations refer to is deleted.
+INSTRUCTOR_EVALUATION_COUNT_SQL = "SELECT COUNT(*) AS count FROM tbl_evaluation WHERE i_id = %s"
+QUESTION_RATING_COUNT_SQL = "SELECT COUNT(*) AS count FROM tbl_evaluation_details WHERE q_id = %s"
+
+
+# --- REMARKS ---
+# Remarks are paged newest first with a keyset cursor of
+# (e_date_submitted, e_id), walked backwards along
+# idx_evaluation_instructor_date (i_id, e_date_submitted), so every page
+# costs the same however many remarks an instructor has.
+
+def encode_remarks_cursor(remark):
+    return f"{remark.e_date_submitted:%Y-%m-%d %H:%M:%S}_{remark.e_id}"
+
+
+def decode_remarks_cursor(token):
+    try:
+        submitted, e_id = token.rsplit('_', 1)
+        return datetime.strptime(submitted, '%Y-%m-%d %H:%M:%S'), int(e_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def remarks_query(instructor_id, after=None, limit=REMARKS_PAGE_SIZE, with_year_level=False):
+    """(sql, params) for one page of remarks as Remark-shaped tuples, plus one look-ahead row."""
+    conditions = ["e.i_id = %s", "e.remarks IS NOT NULL", "e.remarks != ''"]
+    params = [instructor_id]
+    position = decode_remarks_cursor(after) if after else None
+    if position:
+        conditions.append("(e.e_date_submitted < %s OR (e.e_date_submitted = %s AND e.e_id < %s))")
+        params.extend([position[0], position[0], position[1]])
+
+    year_level_column = "s.s_year_level" if with_year_level else "NULL"
+    student_join = "JOIN tbl_student s ON e.s_schoolID = s.s_schoolID" if with_year_level else ""
+    return f"""
+        SELECT e.e_id, e.remarks, e.e_date_submitted, {year_level_column}
+        FROM tbl_evaluation e
+        {student_join}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY e.e_date_submitted DESC, e.e_id DESC
+        LIMIT %s
+    """, params + [limit + 1]
+
+
+def page_remarks(rows, limit=REMARKS_PAGE_SIZE):
+    """Turn the rows of remarks_query into (remarks, next_cursor or None)."""
+    remarks = [Remark._make(row) for row in rows]
+    next_cursor = None
+    if len(remarks) > limit:
+        remarks = remarks[:limit]
+        next_cursor = encode_remarks_cursor(remarks[-1])
+    return remarks, next_cursor
+
+
+def fetch_remarks(db, instructor_id, after=None, limit=REMARKS_PAGE_SIZE, with_year_level=False):
+    """One page of non-empty Remark rows; returns (remarks, next_cursor or None)."""
+    with db.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute(*remarks_query(instructor_id, after, limit, with_year_level))
+        return page_remarks(cursor.fetchall(), limit)
+
+
+REMARK_COUNT_SQL = "SELECT is_remark_count FROM tbl_instructor_summary WHERE i_id = %s"
+
+
+def count_remarks(cursor, instructor_id):
+    cursor.execute(REMARK_COUNT_SQL, (instructor_id,))
+    row = cursor.fetchone()
+    return row['is_remark_count'] if row else 0
+
+
+# --- REMARKS SEARCH ---
+# Keyword and phrase search over every remark through the FULLTEXT index
+# ft_evaluation_remarks, which InnoDB updates as evaluations are inserted.
+
+_SEARCH_TOKEN = re.compile(r'(-?)"([^"]*)"?|(\S+)')
+_WORD = re.compile(r'\w+')
+
+
+def boolean_query(text):
+    """Turn a search box entry into a MATCH ... AGAINST boolean-mode query.
+
+    Every word is required, "quoted phrases" must appear as written, a
+    leading - excludes a word or phrase and a trailing * matches by prefix;
+    other operator characters and words too short to be indexed are
+    dropped. Returns (query, terms): query is
+    None when nothing is left to look for, terms are the positive words and
+    phrases, for highlighting.
+    """
+    parts = []
+    terms = []
+    for phrase_sign, phrase, token in _SEARCH_TOKEN.findall(text or ''):
+        if token:
+            sign = '-' if token.startswith('-') else '+'
+            words = [word for word in _WORD.findall(token) if len(word) >= SEARCH_MIN_WORD]
+            if not words:
+                continue
+            suffix = '*' if token.endswith('*') else ''
+            parts.extend(f'{sign}{word}{suffix if n == len(words) - 1 else ""}' for n, word in enumerate(words))
+            if sign == '+':
+                terms.extend(word + (suffix if n == len(words) - 1 else '') for n, word in enumerate(words))
+        else:
+            words = _WORD.findall(phrase)
+            if not words:
+                continue
+            sign = phrase_sign or '+'
+            parts.append(f'{sign}"{" ".join(words)}"')
+            if sign == '+':
+                terms.append(' '.join(words))
+    return (' '.join(parts) if terms else None), terms
+
+
+def highlight(text, terms):
+    """``text`` as escaped HTML with the search terms wrapped in <mark>."""
+    if not terms:
+        return escape(text)
+    patterns = []
+    for term in sorted(terms, key=len, reverse=True):
+        prefix = term.endswith('*')
+        pattern = r'\s+'.join(re.escape(word) for word in term.rstrip('*').split())
+        patterns.append(rf'\b{pattern}' + (r'\w*' if prefix else r'\b'))
+    pieces = re.split(f"({'|'.join(patterns)})", text, flags=re.IGNORECASE)
+    return Markup('').join(Markup('<mark>{}</mark>').format(piece) if n % 2 else escape(piece)
+                           for n, piece in enumerate(pieces))
+
+
+def search_query(text, instructor_id=None, course=None, year_level=None, date_from=None, date_to=None,
+                 page=1, per_page=SEARCH_PAGE_SIZE):
+    """(sql, params) for one page of RemarkHit rows, plus one look-ahead row.
+
+    With search text the hits are ranked by relevance; without, the newest
+    remarks matching the filters come first. ``date_to`` is inclusive.
+    """
+    against, _ = boolean_query(text)
+    conditions = ["e.remarks IS NOT NULL", "e.remarks != ''"]
+    params = []
+    if against:
+        conditions.append("MATCH (e.remarks) AGAINST (%s IN BOOLEAN MODE)")
+        params.append(against)
+    if instructor_id is not None:
+        conditions.append("e.i_id = %s")
+        params.append(instructor_id)
+    if course:
+        conditions.append("i.i_course = %s")
+        params.append(course)
+    if year_level:
+        conditions.append("s.s_year_level = %s")
+        params.append(year_level)
+    if date_from:
+        conditions.append("e.e_date_submitted >= %s")
+        params.append(date_from)
+    if date_to:
+        conditions.append("e.e_date_submitted < %s")
+        params.append(date_to + timedelta(days=1))
+
+    score = "MATCH (e.remarks) AGAINST (%s IN BOOLEAN MODE)" if against else "NULL"
+    order = "score DESC, e.e_id DESC" if against else "e.e_date_submitted DESC, e.e_id DESC"
+    return f"""
+        SELECT
+            e.e_id, e.i_id,
+            CONCAT(i.i_first_name, ' ', i.i_last_name) AS instructor_name,
+            i.i_course, s.s_year_level, e.e_date_submitted, e.remarks,
+            {score} AS score
+        FROM tbl_evaluation e
+        JOIN tbl_instructor i ON i.i_id = e.i_id
+        JOIN tbl_student s ON s.s_schoolID = e.s_schoolID
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {order}
+        LIMIT %s OFFSET %s
+    """, ([against] if against else []) + params + [per_page + 1, (page - 1) * per_page]
+
+
+def search_remarks(db, text, page=1, per_page=SEARCH_PAGE_SIZE, **filters):
+    """One page of RemarkHit rows; returns (hits, has_next). Filters as in search_query."""
+    page = min(max(page, 1), SEARCH_MAX_PAGES)
+    with db.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute(*search_query(text, page=page, per_page=per_page, **filters))
+        hits = [RemarkHit._make(row) for row in cursor.fetchall()]
+    return hits[:per_page], len(hits) > per_page and page < SEARCH_MAX_PAGES
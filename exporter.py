@@ -0,0 +1,100 @@
+"""Streaming CSV/JSON export of evaluation history.
+
+Rows are read through an unbuffered (server-side) cursor and turned into
+output chunks by generators, so an export of the full history never holds
+more than one chunk of rows in the worker's memory.
+"""
+import csv
+import io
+import json
+
+import pymysql
+
+EXPORT_COLUMNS = (
+    'e_id', 'i_id', 'instructor_name', 'i_course', 's_schoolID', 's_year_level',
+    'e_date_submitted', 'q_id', 'q_text', 'rating_value', 'remarks',
+)
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'json': 'application/json',
+}
+ROWS_PER_CHUNK = 500
+
+
+def export_query(instructor_id=None, course=None):
+    """(sql, params) reading every evaluation detail row in EXPORT_COLUMNS order."""
+    conditions = []
+    params = []
+    if instructor_id is not None:
+        conditions.append("e.i_id = %s")
+        params.append(instructor_id)
+    if course:
+        conditions.append("i.i_course = %s")
+        params.append(course)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"""
+        SELECT
+            e.e_id, e.i_id,
+            CONCAT(i.i_first_name, ' ', i.i_last_name) AS instructor_name,
+            i.i_course, e.s_schoolID, s.s_year_level, e.e_date_submitted,
+            ed.q_id, q.q_text, ed.rating_value, e.remarks
+        FROM tbl_evaluation e
+        JOIN tbl_instructor i ON i.i_id = e.i_id
+        JOIN tbl_student s ON s.s_schoolID = e.s_schoolID
+        JOIN tbl_evaluation_details ed ON ed.e_id = e.e_id
+        JOIN tbl_evaluation_questions q ON q.q_id = ed.q_id
+        {where}
+        ORDER BY e.e_id, ed.ed_id
+    """, params
+
+
+def iter_evaluation_rows(conn, instructor_id=None, course=None):
+    """Yield one tuple (in EXPORT_COLUMNS order) per evaluation detail row."""
+    cursor = conn.cursor(pymysql.cursors.SSCursor)
+    try:
+        cursor.execute(*export_query(instructor_id, course))
+        while True:
+            rows = cursor.fetchmany(ROWS_PER_CHUNK)
+            if not rows:
+                break
+            yield from rows
+    except GeneratorExit:
+        # The client went away mid-stream. Closing an unbuffered cursor would
+        # read every remaining row off the socket first, so drop the
+        # connection instead; the pool discards closed connections.
+        conn.close()
+        raise
+    else:
+        cursor.close()
+
+
+def stream_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for n, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if n % ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_json(rows):
+    yield '['
+    separator = '\n'
+    chunk = []
+    for row in rows:
+        chunk.append(separator + json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str))
+        separator = ',\n'
+        if len(chunk) >= ROWS_PER_CHUNK:
+            yield ''.join(chunk)
+            chunk = []
+    yield ''.join(chunk) + '\n]\n'
+
+
+STREAMERS = {
+    'csv': stream_csv,
+    'json': stream_json,
+}
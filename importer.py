@@ -0,0 +1,209 @@
+"""Bulk CSV import of students, teachers and instructors.
+
+Files are read row by row and written in batches, so memory use depends on
+the batch size, not the file size. Each batch is validated (required
+fields, column lengths, duplicates within the batch and against the
+database, unknown teacher IDs), its passwords hashed in parallel, inserted with one multi-row
+INSERT and committed on its own.
+Bad rows are reported with their line number and skipped; they never abort
+the rest of the file.
+"""
+import csv
+import time
+
+import pymysql
+
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+IMPORT_SPECS = {
+    'students': {
+        'table': 'tbl_student',
+        'required': ['s_schoolID', 's_password', 's_first_name', 's_last_name', 's_email', 's_year_level'],
+        'optional': {'s_status': 'Approved'},
+        'unique': ['s_schoolID', 's_email'],
+        'max_lengths': {'s_schoolID': 20, 's_first_name': 255, 's_last_name': 255, 's_email': 255,
+                        's_year_level': 50},
+        'passwords': {'s_password': 'student'},
+    },
+    'teachers': {
+        'table': 'tbl_teacher',
+        'required': ['t_username', 't_password', 't_first_name', 't_last_name'],
+        'optional': {},
+        'unique': ['t_username'],
+        'max_lengths': {'t_username': 50, 't_first_name': 255, 't_last_name': 255},
+        'passwords': {'t_password': 'teacher'},
+    },
+    'instructors': {
+        'table': 'tbl_instructor',
+        'required': ['i_first_name', 'i_last_name', 'i_course'],
+        'optional': {'t_id': None},
+        'unique': [],
+        'max_lengths': {'i_first_name': 255, 'i_last_name': 255, 'i_course': 255},
+        'passwords': {},
+    },
+}
+
+STUDENT_STATUSES = ('Pending', 'Approved')
+
+
+class CSVImportError(Exception):
+    """Raised when a file cannot be imported at all (e.g. a bad header)."""
+
+
+class ImportResult:
+    def __init__(self, kind):
+        self.kind = kind
+        self.inserted = 0
+        self.rejected = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def reject(self, line_no, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_no, message))
+
+    @property
+    def rows_per_second(self):
+        total = self.inserted + self.rejected
+        return total / self.elapsed if self.elapsed else 0.0
+
+
+def _columns(spec):
+    return spec['required'] + list(spec['optional'])
+
+
+def _clean_row(spec, row):
+    values = {}
+    for column in spec['required']:
+        value = (row.get(column) or '').strip()
+        if not value:
+            return None, f'missing {column}'
+        values[column] = value
+    for column, default in spec['optional'].items():
+        value = (row.get(column) or '').strip()
+        values[column] = value or default
+    for column, limit in spec['max_lengths'].items():
+        if len(values[column]) > limit:
+            return None, f'{column} is longer than {limit} characters'
+
+    if 's_status' in values and values['s_status'] not in STUDENT_STATUSES:
+        return None, f"s_status must be one of {', '.join(STUDENT_STATUSES)}"
+    if values.get('t_id') is not None:
+        try:
+            values['t_id'] = int(values['t_id'])
+        except ValueError:
+            return None, 't_id must be a number'
+    return values, None
+
+
+def _existing_values(cursor, table, column, values):
+    if not values:
+        return set()
+    placeholders = ', '.join(['%s'] * len(values))
+    cursor.execute(f"SELECT {column} AS value FROM {table} WHERE {column} IN ({placeholders})", list(values))
+    return {row['value'] for row in cursor.fetchall()}
+
+
+def _screen_batch(cursor, spec, batch, result):
+    """Drop rows that would violate a unique key or the teacher FK."""
+    for column in spec['unique']:
+        existing = _existing_values(cursor, spec['table'], column, {values[column] for _, values in batch})
+        seen = set()
+        kept = []
+        for line_no, values in batch:
+            value = values[column]
+            if value in existing:
+                result.reject(line_no, f"duplicate {column} '{value}' already exists")
+            elif value in seen:
+                result.reject(line_no, f"duplicate {column} '{value}' earlier in the file")
+            else:
+                seen.add(value)
+                kept.append((line_no, values))
+        batch = kept
+
+    if 't_id' in spec['optional']:
+        t_ids = {values['t_id'] for _, values in batch if values['t_id'] is not None}
+        known = _existing_values(cursor, 'tbl_teacher', 't_id', t_ids)
+        kept = []
+        for line_no, values in batch:
+            if values['t_id'] is not None and values['t_id'] not in known:
+                result.reject(line_no, f"unknown teacher t_id {values['t_id']}")
+            else:
+                kept.append((line_no, values))
+        batch = kept
+    return batch
+
+
+def _hash_passwords(spec, batch, password_hasher):
+    """Replace each password column's plaintext with a hash under its role's policy."""
+    for column, role in spec['passwords'].items():
+        hashes = password_hasher.map_hash([values[column] for _, values in batch], role)
+        for (_, values), password_hash in zip(batch, hashes):
+            values[column] = password_hash
+
+
+def _flush(db, spec, batch, result, password_hasher):
+    columns = _columns(spec)
+    insert_sql = (
+        f"INSERT INTO {spec['table']} ({', '.join(columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))})"
+    )
+    with db.cursor() as cursor:
+        batch = _screen_batch(cursor, spec, batch, result)
+        if not batch:
+            return
+        _hash_passwords(spec, batch, password_hasher)
+        try:
+            cursor.executemany(insert_sql, [[values[c] for c in columns] for _, values in batch])
+            db.commit()
+            result.inserted += len(batch)
+            return
+        except (pymysql.err.IntegrityError, pymysql.err.DataError):
+            # Something slipped past screening (e.g. a concurrent insert):
+            # retry row by row so only the offending rows are rejected.
+            db.rollback()
+
+        for line_no, values in batch:
+            try:
+                cursor.execute(insert_sql, [values[c] for c in columns])
+                result.inserted += 1
+            except (pymysql.err.IntegrityError, pymysql.err.DataError) as e:
+                result.reject(line_no, f'rejected by database: {e.args[1]}')
+        db.commit()
+
+
+def import_csv(db, kind, stream, password_hasher, batch_size=IMPORT_BATCH_SIZE):
+    """Import CSV rows of ``kind`` from a text stream; returns an ImportResult.
+
+    Passwords are stored hashed with ``password_hasher`` (a PasswordHasher)
+    under the policy of the account's role.
+    """
+    spec = IMPORT_SPECS.get(kind)
+    if spec is None:
+        raise CSVImportError(f"Unknown import type '{kind}'.")
+
+    reader = csv.DictReader(stream)
+    missing = [c for c in spec['required'] if c not in (reader.fieldnames or [])]
+    if missing:
+        raise CSVImportError(f"CSV header is missing column(s): {', '.join(missing)}")
+
+    result = ImportResult(kind)
+    batch = []
+    for row in reader:
+        line_no = reader.line_num
+        values, error = _clean_row(spec, row)
+        if error:
+            result.reject(line_no, error)
+            continue
+        batch.append((line_no, values))
+        if len(batch) >= batch_size:
+            _flush(db, spec, batch, result, password_hasher)
+            batch = []
+    if batch:
+        _flush(db, spec, batch, result, password_hasher)
+
+    result.elapsed = time.perf_counter() - result.started
+    return result
@@ -0,0 +1,118 @@
+"""Per-request SQL statistics.
+
+``InstrumentedConnection`` wraps a pymysql connection and hands out cursors
+that time every ``execute``/``executemany`` into a ``QueryRecorder``. The
+recorder keeps the statement count, total database time, the slowest
+statement, statements over the slow-query threshold and how often each
+normalized statement ran, which is what exposes N+1 loops.
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s')
+_VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Reduce a statement to its shape: literals and placeholders become ``?``."""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf8', 'replace')
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    # IN (?, ?, ?) and multi-row VALUES lists differ only in length.
+    sql = _VALUE_LIST.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    def __init__(self, slow_threshold=None):
+        self.slow_threshold = slow_threshold
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest = None
+        self.slow_queries = []
+        self.statements = Counter()
+
+    def record(self, sql, seconds):
+        normalized = normalize_sql(sql)
+        self.count += 1
+        self.total_time += seconds
+        self.statements[normalized] += 1
+        if self.slowest is None or seconds > self.slowest[1]:
+            self.slowest = (normalized, seconds)
+        if self.slow_threshold is not None and seconds >= self.slow_threshold:
+            self.slow_queries.append((normalized, seconds))
+
+    def repeated(self, threshold):
+        """Normalized statements that ran at least ``threshold`` times."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+class InstrumentedCursor:
+    def __init__(self, cursor, recorder):
+        self._cursor = cursor
+        self._recorder = recorder
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(query, args)
+        finally:
+            self._recorder.record(query, time.perf_counter() - started)
+
+    def executemany(self, query, args):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, args)
+        finally:
+            self._recorder.record(query, time.perf_counter() - started)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    def __init__(self, conn, recorder):
+        self.raw = conn
+        self.recorder = recorder
+
+    def cursor(self, cursor=None):
+        return InstrumentedCursor(self.raw.cursor(cursor), self.recorder)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+class SlowQueryLog:
+    """Appends one JSON object per line; safe to share between threads."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def write(self, event, **fields):
+        entry = {'time': datetime.now(timezone.utc).isoformat(timespec='milliseconds'), 'event': event}
+        entry.update(fields)
+        line = json.dumps(entry, default=str) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf8') as f:
+                f.write(line)
@@ -0,0 +1,321 @@
+"""Prometheus-style metrics shared by all worker processes.
+
+Every process keeps its own counters and histograms in memory and, once
+it has served a request, periodically writes them to
+``<directory>/metrics_<pid>.json``; CLI commands and scripts that only
+import the app leave no file. Rendering merges the files of all processes:
+counters and histograms are summed, gauges are summed over the processes
+that are still alive.
+
+The counters and histograms of workers that have exited are folded into
+``metrics_aggregate.json`` and their files deleted (as prometheus_client's
+``mark_process_dead`` does), so totals never go backwards, the directory
+does not grow with every restart, and a new process that reuses a dead
+worker's PID never overwrites its totals. Point ``directory`` at a location
+that is cleared on deploy (``clear()``).
+"""
+import atexit
+import contextlib
+import glob
+import json
+import math
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: dead processes cannot be detected there anyway
+    fcntl = None
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+AGGREGATE_FILE = 'metrics_aggregate.json'
+LOCK_FILE = 'metrics_aggregate.lock'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    if os.name == 'nt':
+        # os.kill() would terminate the process on Windows.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path, pid, values):
+    """Atomically replace ``path`` with ``values`` ({name: {key: value}})."""
+    snapshot = {
+        name: [[list(map(list, key)), value] for key, value in entries.items()]
+        for name, entries in values.items()
+    }
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'pid': pid, 'values': snapshot}, f)
+    os.replace(tmp_path, path)
+
+
+class _Metric:
+    def __init__(self, registry, kind, name, documentation, labelnames):
+        self.registry = registry
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            values = self.registry.values[self.name]
+            values[key] = values.get(key, 0) + amount
+
+    def set_total(self, value, **labels):
+        """Record a count this process already tracks elsewhere (e.g. pool counters)."""
+        key = self._key(labels)
+        with self.registry.lock:
+            self.registry.values[self.name][key] = value
+
+
+class Gauge(_Metric):
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.registry.values[self.name][key] = value
+
+
+class Histogram(_Metric):
+    def __init__(self, registry, kind, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, kind, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            values = self.registry.values[self.name]
+            state = values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum.
+                state = values[key] = [0] * len(self.buckets) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-1] += value
+
+
+class MetricsRegistry:
+    """Metrics can be declared before ``configure()`` sets the directory."""
+
+    def __init__(self, directory=None, flush_interval=5.0):
+        self.directory = None
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.values = {}
+        self._pid = os.getpid()
+        self._last_flush = 0.0
+        self._flushed_pid = None
+        self._exit_hook = False
+        if directory is not None:
+            self.configure(directory)
+
+    def configure(self, directory, flush_interval=None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        if flush_interval is not None:
+            self.flush_interval = flush_interval
+
+    def clear(self):
+        """Delete every process's metrics file, e.g. when (re)starting all workers."""
+        for path in glob.glob(os.path.join(self.directory, 'metrics_*.json')):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self.metrics[metric.name] = metric
+        self.values[metric.name] = {}
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, 'counter', name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(self, 'gauge', name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, 'histogram', name, documentation, labelnames, buckets))
+
+    def _check_pid(self):
+        # A forked worker starts from a copy of the parent's values; those
+        # are already counted in the parent's file.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._last_flush = 0.0
+            for values in self.values.values():
+                values.clear()
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f'metrics_{pid}.json')
+
+    def flush(self):
+        """Write this process's file; the first call also arranges a last flush at exit.
+
+        Called from the request path and by serve.py's worker start-up, never
+        on import, so only serving processes write files.
+        """
+        if self.directory is None:
+            return
+        with self.lock:
+            self._check_pid()
+            snapshot = {name: dict(values) for name, values in self.values.items()}
+            self._last_flush = time.monotonic()
+            first = self._flushed_pid != self._pid
+            self._flushed_pid = self._pid
+            if not self._exit_hook:
+                # Inherited by forked workers, where flush() writes their own file.
+                atexit.register(self.flush)
+                self._exit_hook = True
+        path = self._path(self._pid)
+        if first and os.path.exists(path):
+            # Left by an exited process with the same PID.
+            self._fold_dead([path])
+        _write(path, self._pid, snapshot)
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval or self._pid != os.getpid():
+            self.flush()
+
+    @contextlib.contextmanager
+    def _aggregate_lock(self, exclusive):
+        """Readers share it; folding takes it alone, so no scrape sees a file both folded and not."""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, LOCK_FILE), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _merge(self, merged, entries_by_name, alive):
+        """Add one file's values to ``merged``; gauges only count for live processes."""
+        for name, entries in entries_by_name.items():
+            metric = self.metrics.get(name)
+            if metric is None or (metric.kind == 'gauge' and not alive):
+                continue
+            target = merged.setdefault(name, {})
+            for key, value in entries:
+                key = tuple(map(tuple, key))
+                current = target.get(key)
+                if metric.kind == 'histogram':
+                    target[key] = value if current is None else [a + b for a, b in zip(current, value)]
+                else:
+                    target[key] = value + (current or 0)
+
+    def _fold_dead(self, paths):
+        """Add exited processes' counters and histograms to the aggregate file and delete their files."""
+        if fcntl is None:
+            return
+        aggregate_path = os.path.join(self.directory, AGGREGATE_FILE)
+        with self._aggregate_lock(exclusive=True):
+            merged = {}
+            folded = []
+            for path in paths:
+                data = _read(path)
+                # Gone if another process folded it first; alive if its PID
+                # was reused by a process that has written since.
+                if data is None or (data['pid'] != os.getpid() and _pid_alive(data['pid'])):
+                    continue
+                self._merge(merged, data['values'], alive=False)
+                folded.append(path)
+            if not folded:
+                return
+            aggregate = _read(aggregate_path)
+            if aggregate is not None:
+                self._merge(merged, aggregate['values'], alive=False)
+            _write(aggregate_path, None, merged)
+            for path in folded:
+                os.remove(path)
+
+    def _collect(self):
+        merged = {name: {} for name in self.metrics}
+        dead = []
+        with self._aggregate_lock(exclusive=False):
+            for path in glob.glob(os.path.join(self.directory, 'metrics_*.json')):
+                data = _read(path)
+                if data is None:
+                    continue
+                if data['pid'] is None:  # the aggregate
+                    self._merge(merged, data['values'], alive=False)
+                    continue
+                alive = _pid_alive(data['pid'])
+                self._merge(merged, data['values'], alive)
+                if not alive:
+                    dead.append(path)
+        if dead:
+            self._fold_dead(dead)
+        return merged
+
+    def render(self):
+        """All processes' metrics in the Prometheus text exposition format."""
+        self.flush()
+        merged = self._collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for key, value in sorted(merged[name].items()):
+                if metric.kind != 'histogram':
+                    lines.append(f'{name}{_format_labels(key)} {_format_value(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets, value):
+                    cumulative += count
+                    labels = key + (('le', _format_value(bound)),)
+                    lines.append(f'{name}_bucket{_format_labels(labels)} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(key)} {_format_value(value[-1])}')
+                lines.append(f'{name}_count{_format_labels(key)} {cumulative}')
+        return '\n'.join(lines) + '\n'
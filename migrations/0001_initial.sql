@@ -1,15 +1,4 @@
-CREATE DATABASE IF NOT EXISTS evaluation_system;
-USE evaluation_system;
-
-SET FOREIGN_KEY_CHECKS = 0;
-
-DROP TABLE IF EXISTS tbl_evaluation_details;
-DROP TABLE IF EXISTS tbl_evaluation;
-DROP TABLE IF EXISTS tbl_evaluation_questions;
-DROP TABLE IF EXISTS tbl_instructor;
-DROP TABLE IF EXISTS tbl_teacher;
-DROP TABLE IF EXISTS tbl_student;
-DROP TABLE IF EXISTS tbl_admin;
+-- Baseline schema and seed data (the original schema.sql).
 
 CREATE TABLE tbl_admin (
     a_id       INT          AUTO_INCREMENT PRIMARY KEY,
@@ -0,0 +1,43 @@
+-- Running per-(instructor, question) rating totals, maintained on submit
+CREATE TABLE tbl_rating_summary (
+    i_id        INT    NOT NULL,
+    q_id        INT    NOT NULL,
+    rs_count    INT    NOT NULL DEFAULT 0,
+    rs_sum      BIGINT NOT NULL DEFAULT 0,
+    rs_sum_sq   BIGINT NOT NULL DEFAULT 0,
+    rs_rating_1 INT    NOT NULL DEFAULT 0,
+    rs_rating_2 INT    NOT NULL DEFAULT 0,
+    rs_rating_3 INT    NOT NULL DEFAULT 0,
+    rs_rating_4 INT    NOT NULL DEFAULT 0,
+    rs_rating_5 INT    NOT NULL DEFAULT 0,
+    PRIMARY KEY (i_id, q_id),
+    FOREIGN KEY (i_id) REFERENCES tbl_instructor(i_id) ON DELETE CASCADE,
+    FOREIGN KEY (q_id) REFERENCES tbl_evaluation_questions(q_id) ON DELETE CASCADE
+);
+
+CREATE TABLE tbl_instructor_summary (
+    i_id                INT PRIMARY KEY,
+    is_evaluation_count INT NOT NULL DEFAULT 0,
+    is_remark_count     INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (i_id) REFERENCES tbl_instructor(i_id) ON DELETE CASCADE
+);
+
+-- Backfill from evaluations submitted before the summaries existed
+INSERT INTO tbl_rating_summary
+    (i_id, q_id, rs_count, rs_sum, rs_sum_sq, rs_rating_1, rs_rating_2, rs_rating_3, rs_rating_4, rs_rating_5)
+SELECT
+    e.i_id,
+    ed.q_id,
+    COUNT(*),
+    SUM(ed.rating_value),
+    SUM(ed.rating_value * ed.rating_value),
+    SUM(ed.rating_value = 1), SUM(ed.rating_value = 2), SUM(ed.rating_value = 3),
+    SUM(ed.rating_value = 4), SUM(ed.rating_value = 5)
+FROM tbl_evaluation e
+JOIN tbl_evaluation_details ed ON ed.e_id = e.e_id
+GROUP BY e.i_id, ed.q_id;
+
+INSERT INTO tbl_instructor_summary (i_id, is_evaluation_count, is_remark_count)
+SELECT i_id, COUNT(*), SUM(remarks IS NOT NULL AND remarks != '')
+FROM tbl_evaluation
+GROUP BY i_id;
@@ -0,0 +1,26 @@
+-- Indexes for the access paths used by app.py
+
+-- Pending-students queue and approvals: WHERE s_status = ... ORDER BY s_schoolID
+ALTER TABLE tbl_student
+    ADD KEY idx_student_status (s_status, s_schoolID);
+
+-- Student progress (per-student lookups) and remarks paging newest first
+ALTER TABLE tbl_evaluation
+    ADD KEY idx_evaluation_student (s_schoolID, i_id),
+    ADD KEY idx_evaluation_instructor_date (i_id, e_date_submitted);
+
+-- Detail rows reached from their evaluation (exports, summary rebuilds),
+-- covering the rating so the join never reads the base rows; and by
+-- question for the "question still in use" check.
+ALTER TABLE tbl_evaluation_details
+    ADD KEY idx_details_evaluation (e_id, q_id, rating_value),
+    ADD KEY idx_details_question (q_id, e_id);
+
+-- Teacher dashboard (WHERE t_id = ...) and the instructor listing by last name
+ALTER TABLE tbl_instructor
+    ADD KEY idx_instructor_teacher (t_id, i_id),
+    ADD KEY idx_instructor_last_name (i_last_name);
+
+-- Teacher listings: ORDER BY t_last_name, covering t_first_name
+ALTER TABLE tbl_teacher
+    ADD KEY idx_teacher_last_name (t_last_name, t_first_name);
@@ -0,0 +1,24 @@
+-- Reporting aggregates folded in incrementally past a high-water mark (see rollups.py)
+CREATE TABLE tbl_report_rollup (
+    rr_dimension VARCHAR(20)  NOT NULL,  -- 'instructor', 'question', 'course' or 'year_level'
+    rr_key       VARCHAR(100) NOT NULL,  -- i_id, '' (all evaluations), i_course or s_year_level
+    q_id         INT          NOT NULL,
+    rr_count     INT          NOT NULL DEFAULT 0,
+    rr_sum       BIGINT       NOT NULL DEFAULT 0,
+    rr_sum_sq    BIGINT       NOT NULL DEFAULT 0,
+    rr_rating_1  INT          NOT NULL DEFAULT 0,
+    rr_rating_2  INT          NOT NULL DEFAULT 0,
+    rr_rating_3  INT          NOT NULL DEFAULT 0,
+    rr_rating_4  INT          NOT NULL DEFAULT 0,
+    rr_rating_5  INT          NOT NULL DEFAULT 0,
+    PRIMARY KEY (rr_dimension, rr_key, q_id)
+);
+
+CREATE TABLE tbl_report_watermark (
+    rw_name       VARCHAR(64) PRIMARY KEY,
+    rw_last_e_id  INT         NOT NULL DEFAULT 0,
+    rw_updated_at TIMESTAMP   NULL DEFAULT NULL
+);
+
+-- Starts at 0: the first refresh folds in the existing history batch by batch.
+INSERT INTO tbl_report_watermark (rw_name, rw_last_e_id) VALUES ('report_rollups', 0);
@@ -0,0 +1,5 @@
+-- Full-text search over remarks (admin remarks search). InnoDB keeps the
+-- index current as evaluations are inserted; building it rebuilds the table
+-- once to add the hidden FTS_DOC_ID column.
+ALTER TABLE tbl_evaluation
+    ADD FULLTEXT KEY ft_evaluation_remarks (remarks);
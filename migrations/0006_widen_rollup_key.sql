@@ -0,0 +1,4 @@
+-- Course names and year levels are VARCHAR(255)/VARCHAR(50) in their own
+-- tables; rr_key has to hold the longest of them.
+ALTER TABLE tbl_report_rollup
+    MODIFY rr_key VARCHAR(255) NOT NULL;
@@ -0,0 +1,187 @@
+"""Row types and the queries that load them.
+
+Every query here names its columns and reads through a plain tuple cursor;
+each row becomes a namedtuple (``__slots__ = ()``, no per-row dict) of a
+type that lists exactly those columns. Templates read the fields as
+attributes, exactly as they did with dict rows.
+"""
+from collections import namedtuple
+
+import pymysql
+
+Student = namedtuple('Student', 's_schoolID s_first_name s_last_name s_email s_year_level s_status')
+StudentCredentials = namedtuple('StudentCredentials',
+                                's_schoolID s_password s_first_name s_last_name s_email s_year_level s_status')
+Teacher = namedtuple('Teacher', 't_id t_username t_first_name t_last_name')
+TeacherCredentials = namedtuple('TeacherCredentials', 't_id t_password t_first_name t_last_name')
+AdminCredentials = namedtuple('AdminCredentials', 'a_id a_username a_password')
+Instructor = namedtuple('Instructor', 'i_id i_first_name i_last_name i_course t_id')
+InstructorListing = namedtuple('InstructorListing',
+                               'i_id i_first_name i_last_name i_course assigned_teacher_id teacher_name')
+InstructorProgress = namedtuple('InstructorProgress', 'i_id i_first_name i_last_name i_course evaluated')
+Question = namedtuple('Question', 'q_id q_text q_order')
+Remark = namedtuple('Remark', 'e_id remarks e_date_submitted s_year_level')
+RemarkHit = namedtuple('RemarkHit',
+                       'e_id i_id instructor_name i_course s_year_level e_date_submitted remarks score')
+CourseSummary = namedtuple('CourseSummary', 'i_id i_course instructor_name evaluation_count average_rating')
+
+
+def columns(row_type, alias=None):
+    """The row type's fields as a SELECT list, optionally table-qualified."""
+    prefix = f'{alias}.' if alias else ''
+    return ', '.join(prefix + field for field in row_type._fields)
+
+
+def fetch_one(db, row_type, sql, params=()):
+    with db.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return row_type._make(row) if row is not None else None
+
+
+def fetch_all(db, row_type, sql, params=()):
+    with db.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute(sql, params)
+        return [row_type._make(row) for row in cursor.fetchall()]
+
+
+# Statements shared with the async serving mode (asgi.py).
+STUDENT_BY_ID_SQL = f"SELECT {columns(Student)} FROM tbl_student WHERE s_schoolID = %s"
+INSTRUCTOR_BY_ID_SQL = f"SELECT {columns(Instructor)} FROM tbl_instructor WHERE i_id = %s"
+TEACHER_INSTRUCTOR_SQL = f"SELECT {columns(Instructor)} FROM tbl_instructor WHERE i_id = %s AND t_id = %s"
+TEACHER_INSTRUCTOR_IDS_SQL = "SELECT i_id FROM tbl_instructor WHERE t_id = %s ORDER BY i_id"
+QUESTIONS_SQL = f"SELECT {columns(Question)} FROM tbl_evaluation_questions ORDER BY q_order"
+APPROVED_STUDENTS_SQL = "SELECT COUNT(*) FROM tbl_student WHERE s_status = 'Approved'"
+INSTRUCTOR_PROGRESS_SQL = """
+    SELECT
+        i.i_id, i.i_first_name, i.i_last_name, i.i_course,
+        e.e_id IS NOT NULL AS evaluated
+    FROM tbl_instructor i
+    LEFT JOIN tbl_evaluation e ON e.i_id = i.i_id AND e.s_schoolID = %s
+    ORDER BY i.i_id
+"""
+# Counts and averages come from the summary tables, not the raw evaluations.
+TEACHER_COURSES_SQL = """
+    SELECT
+        i.i_id,
+        i.i_course,
+        CONCAT(i.i_first_name, ' ', i.i_last_name) AS instructor_name,
+        COALESCE(MAX(s.is_evaluation_count), 0) AS evaluation_count,
+        SUM(rs.rs_sum) / SUM(rs.rs_count) AS average_rating
+    FROM tbl_instructor i
+    LEFT JOIN tbl_instructor_summary s ON i.i_id = s.i_id
+    LEFT JOIN tbl_rating_summary rs ON i.i_id = rs.i_id
+    WHERE i.t_id = %s
+    GROUP BY i.i_id, i.i_course, instructor_name
+"""
+# Statements benchmarks/explain_hot_queries.py also checks.
+STUDENT_CREDENTIALS_SQL = f"SELECT {columns(StudentCredentials)} FROM tbl_student WHERE s_schoolID = %s"
+PENDING_STUDENTS_SQL = f"""
+    SELECT {columns(Student)}
+    FROM tbl_student
+    WHERE s_status = 'Pending' AND s_schoolID > %s
+    ORDER BY s_schoolID
+    LIMIT %s
+"""
+TEACHERS_SQL = f"SELECT {columns(Teacher)} FROM tbl_teacher ORDER BY t_last_name, t_first_name"
+
+
+# --- Students ---
+
+def get_student(db, school_id):
+    return fetch_one(db, Student, STUDENT_BY_ID_SQL, (school_id,))
+
+
+def count_approved_students(db):
+    with db.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute(APPROVED_STUDENTS_SQL)
+        return cursor.fetchone()[0]
+
+
+def get_student_credentials(db, school_id):
+    return fetch_one(db, StudentCredentials, STUDENT_CREDENTIALS_SQL, (school_id,))
+
+
+def list_pending_students(db, after=None, before=None, limit=50):
+    """One keyset page of pending students by School ID; returns (students, has_prev, has_next).
+
+    Walks idx_student_status (s_status, s_schoolID) from the last School ID
+    seen instead of an OFFSET scan.
+    """
+    if before:
+        students = fetch_all(db, Student, f"""
+            SELECT {columns(Student)}
+            FROM tbl_student
+            WHERE s_status = 'Pending' AND s_schoolID < %s
+            ORDER BY s_schoolID DESC
+            LIMIT %s
+        """, (before, limit + 1))
+        return students[:limit][::-1], len(students) > limit, True
+
+    students = fetch_all(db, Student, PENDING_STUDENTS_SQL, (after or '', limit + 1))
+    return students[:limit], bool(after), len(students) > limit
+
+
+# --- Teachers and admins ---
+
+def get_teacher_credentials(db, username):
+    return fetch_one(db, TeacherCredentials,
+                     f"SELECT {columns(TeacherCredentials)} FROM tbl_teacher WHERE t_username = %s",
+                     (username,))
+
+
+def get_admin_credentials(db, username):
+    return fetch_one(db, AdminCredentials,
+                     f"SELECT {columns(AdminCredentials)} FROM tbl_admin WHERE a_username = %s",
+                     (username,))
+
+
+def list_teachers(db):
+    return fetch_all(db, Teacher, TEACHERS_SQL)
+
+
+# --- Instructors ---
+
+def get_instructor(db, instructor_id, teacher_id=None):
+    """The instructor, or None; with ``teacher_id`` only if assigned to that teacher."""
+    if teacher_id is None:
+        return fetch_one(db, Instructor, INSTRUCTOR_BY_ID_SQL, (instructor_id,))
+    return fetch_one(db, Instructor, TEACHER_INSTRUCTOR_SQL, (instructor_id, teacher_id))
+
+
+def list_teacher_courses(db, teacher_id):
+    return fetch_all(db, CourseSummary, TEACHER_COURSES_SQL, (teacher_id,))
+
+
+def list_teacher_instructor_ids(db, teacher_id):
+    """Read from idx_instructor_teacher alone; keys the cached teacher dashboard."""
+    with db.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute(TEACHER_INSTRUCTOR_IDS_SQL, (teacher_id,))
+        return [row[0] for row in cursor.fetchall()]
+
+
+def list_instructors_with_teachers(db):
+    return fetch_all(db, InstructorListing, """
+        SELECT
+            i.i_id, i.i_first_name, i.i_last_name, i.i_course,
+            t.t_id AS assigned_teacher_id,
+            CONCAT(t.t_first_name, ' ', t.t_last_name) AS teacher_name
+        FROM tbl_instructor i
+        LEFT JOIN tbl_teacher t ON i.t_id = t.t_id
+        ORDER BY i.i_last_name
+    """)
+
+
+def list_instructor_progress(db, school_id):
+    """Every instructor, flagged by whether this student has evaluated them.
+
+    The flag is an eq_ref lookup on unique_evaluation, so there are no
+    per-ID parameter lists.
+    """
+    return fetch_all(db, InstructorProgress, INSTRUCTOR_PROGRESS_SQL, (school_id,))
+
+
+# --- Questions ---
+
+def list_questions(db):
+    return tuple(fetch_all(db, Question, QUESTIONS_SQL))
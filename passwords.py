@@ -0,0 +1,153 @@
+"""Password hashing with per-role cost settings.
+
+Hashes are stored in a modular-crypt style string that records the scheme
+and its parameters, so the cost can be raised at any time: a login whose
+stored hash uses other parameters (or an old plaintext value) succeeds as
+before and returns a fresh hash for the caller to store.
+
+    $scrypt$ln=14,r=8,p=1$<salt>$<hash>
+    $pbkdf2-sha256$i=600000$<salt>$<hash>
+
+hashlib releases the GIL while hashing, so ``PasswordHasher`` runs the work
+on a bounded thread pool: other requests keep being served during a login
+burst and at most ``workers`` hashes compete for the CPU at once.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+DEFAULT_POLICIES = {
+    'student': {'scheme': 'scrypt', 'ln': 14, 'r': 8, 'p': 1},
+    'teacher': {'scheme': 'scrypt', 'ln': 15, 'r': 8, 'p': 1},
+    'admin': {'scheme': 'scrypt', 'ln': 16, 'r': 8, 'p': 1},
+}
+
+
+def _b64encode(data):
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64decode(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def _scrypt(password, salt, ln, r, p):
+    n = 1 << ln
+    return hashlib.scrypt(password, salt=salt, n=n, r=r, p=p,
+                          maxmem=128 * r * (n + p + 2) + 1024 * 1024, dklen=HASH_BYTES)
+
+
+def _pbkdf2_sha256(password, salt, i):
+    return hashlib.pbkdf2_hmac('sha256', password, salt, i, dklen=HASH_BYTES)
+
+
+# scheme name -> (key derivation function, parameter names in stored order)
+SCHEMES = {
+    'scrypt': (_scrypt, ('ln', 'r', 'p')),
+    'pbkdf2-sha256': (_pbkdf2_sha256, ('i',)),
+}
+
+
+def _parse(stored):
+    """Split a stored hash into (scheme, params, salt, digest); None for legacy plaintext."""
+    if not stored or not stored.startswith('$'):
+        return None
+    parts = stored.split('$')
+    if len(parts) != 5 or parts[1] not in SCHEMES:
+        return None
+    try:
+        params = {name: int(value) for name, value in (item.split('=') for item in parts[2].split(','))}
+        return parts[1], params, _b64decode(parts[3]), _b64decode(parts[4])
+    except ValueError:
+        return None
+
+
+def is_hashed(stored):
+    """Whether ``stored`` is a hash this module wrote, rather than a legacy plaintext password."""
+    return _parse(stored) is not None
+
+
+def hash_password(password, policy):
+    scheme = policy['scheme']
+    derive, names = SCHEMES[scheme]
+    params = {name: policy[name] for name in names}
+    salt = os.urandom(SALT_BYTES)
+    digest = derive(password.encode('utf8'), salt, **params)
+    encoded = ','.join(f'{name}={params[name]}' for name in names)
+    return f'${scheme}${encoded}${_b64encode(salt)}${_b64encode(digest)}'
+
+
+def verify_password(stored, password):
+    parsed = _parse(stored)
+    if parsed is None:
+        # Accounts created before hashing still hold the plaintext.
+        return stored is not None and hmac.compare_digest(stored.encode('utf8'), password.encode('utf8'))
+    scheme, params, salt, digest = parsed
+    derive, names = SCHEMES[scheme]
+    if set(params) != set(names):
+        return False
+    return hmac.compare_digest(derive(password.encode('utf8'), salt, **params), digest)
+
+
+def needs_rehash(stored, policy):
+    parsed = _parse(stored)
+    if parsed is None:
+        return True
+    scheme, params, _, _ = parsed
+    _, names = SCHEMES[policy['scheme']]
+    return scheme != policy['scheme'] or params != {name: policy[name] for name in names}
+
+
+class PasswordHasher:
+    def __init__(self, policies=None, workers=None):
+        self.policies = dict(DEFAULT_POLICIES)
+        self.policies.update(policies or {})
+        self.workers = workers or os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._pid = None
+        self._pool = None
+        # Verified against when the account does not exist, so a failed
+        # login takes as long whether or not the name is known.
+        self._dummy_hashes = {}
+
+    @property
+    def _executor(self):
+        # Threads do not survive a fork; each worker process starts its own.
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+            return self._pool
+
+    def hash(self, password, role):
+        return self._executor.submit(hash_password, password, self.policies[role]).result()
+
+    def _check(self, stored, password, role):
+        policy = self.policies[role]
+        if stored is None:
+            if role not in self._dummy_hashes:
+                self._dummy_hashes[role] = hash_password(os.urandom(16).hex(), policy)
+            verify_password(self._dummy_hashes[role], password)
+            return False, None
+        if not verify_password(stored, password):
+            return False, None
+        return True, hash_password(password, policy) if needs_rehash(stored, policy) else None
+
+    def check(self, stored, password, role):
+        """Verify ``password`` against ``stored`` (None for an unknown account).
+
+        Returns ``(ok, new_hash)``; ``new_hash`` is set when the stored value
+        should be replaced because it is plaintext or uses outdated settings.
+        """
+        return self._executor.submit(self._check, stored, password or '', role).result()
+
+    def map_hash(self, passwords, role):
+        """Hash many passwords in parallel, preserving order."""
+        policy = self.policies[role]
+        return list(self._executor.map(lambda password: hash_password(password, policy), passwords))
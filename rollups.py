@@ -0,0 +1,268 @@
+"""Reporting aggregates maintained incrementally from tbl_evaluation.
+
+``tbl_report_rollup`` holds per-question rating totals (count, sum, sum of
+squares and the 1-5 distribution) for four dimensions:
+
+* ``instructor`` - keyed by i_id
+* ``question``   - every evaluation (key '')
+* ``course``     - keyed by the instructor's i_course
+* ``year_level`` - keyed by the student's s_year_level
+
+``tbl_report_watermark`` records the last e_id folded in (the high-water
+mark). A refresh reads only the evaluations past it, in e_id batches; each
+batch is added to the rollups and moves the mark forward in the same
+transaction, with the mark's row locked, so a refresh that fails or runs
+twice never counts an evaluation twice. Its cost grows with the number of
+new evaluations, not the size of the history.
+
+Evaluations newer than ``settle_seconds`` are left for the next refresh:
+e_ids are allocated before their transaction commits, so a fresh row could
+still be followed by a lower e_id that is not visible yet.
+
+``read_rollups`` turns one dimension into per-question averages as of the
+high-water mark; ``flask rollup-report`` prints them. The analytics page
+computes its own figures from the full history instead, so it never
+depends on when the rollups were last refreshed.
+
+``rebuild_rollups`` recomputes everything from scratch; use it after
+changing evaluations, instructors' courses or students' year levels by
+hand. Refreshes run from ``flask refresh-rollups`` (e.g. nightly from cron)
+or from a RollupScheduler thread in every worker.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+
+import pymysql
+
+from evaluations import RATING_SCALE
+
+WATERMARK = 'report_rollups'
+ROLLUP_LOCK = 'evaluation_system_rollups'
+REFRESH_BATCH_SIZE = 50000  # evaluations folded per transaction
+SETTLE_SECONDS = 60
+
+# dimension -> (key expression, extra join); None groups by question alone
+DIMENSIONS = {
+    'instructor': ("e.i_id", ""),
+    'question': (None, ""),
+    'course': ("COALESCE(i.i_course, '')", "JOIN tbl_instructor i ON i.i_id = e.i_id"),
+    'year_level': ("COALESCE(s.s_year_level, '')", "JOIN tbl_student s ON s.s_schoolID = e.s_schoolID"),
+}
+
+_ROLLUP_RATING_COLUMNS = ', '.join(f'rr_rating_{value}' for value in RATING_SCALE)
+_RATING_SUMS = ', '.join(f'SUM(ed.rating_value = {value})' for value in RATING_SCALE)
+_RATING_INCREMENTS = ',\n'.join(
+    f'rr_rating_{value} = rr_rating_{value} + VALUES(rr_rating_{value})' for value in RATING_SCALE
+)
+
+RefreshResult = namedtuple('RefreshResult', 'start_e_id end_e_id batches elapsed')
+
+
+def _fold(cursor, low, high):
+    """Add the evaluations with low < e_id <= high to every dimension."""
+    for dimension, (key, join) in DIMENSIONS.items():
+        cursor.execute(f"""
+            INSERT INTO tbl_report_rollup
+                (rr_dimension, rr_key, q_id, rr_count, rr_sum, rr_sum_sq, {_ROLLUP_RATING_COLUMNS})
+            SELECT
+                %s, {key or "''"}, ed.q_id,
+                COUNT(*),
+                SUM(ed.rating_value),
+                SUM(ed.rating_value * ed.rating_value),
+                {_RATING_SUMS}
+            FROM tbl_evaluation e
+            {join}
+            JOIN tbl_evaluation_details ed ON ed.e_id = e.e_id
+            WHERE e.e_id > %s AND e.e_id <= %s
+            GROUP BY {f'{key}, ' if key else ''}ed.q_id
+            ON DUPLICATE KEY UPDATE
+                rr_count = rr_count + VALUES(rr_count),
+                rr_sum = rr_sum + VALUES(rr_sum),
+                rr_sum_sq = rr_sum_sq + VALUES(rr_sum_sq),
+                {_RATING_INCREMENTS}
+        """, (dimension, low, high))
+
+
+def _lock_watermark(cursor):
+    """The high-water mark, locked until the transaction ends."""
+    cursor.execute("SELECT rw_last_e_id FROM tbl_report_watermark WHERE rw_name = %s FOR UPDATE", (WATERMARK,))
+    row = cursor.fetchone()
+    if row is None:
+        cursor.execute("INSERT INTO tbl_report_watermark (rw_name, rw_last_e_id) VALUES (%s, 0)", (WATERMARK,))
+        return 0
+    return row[0]
+
+
+def _settled_bound(cursor, low, settle_seconds, batch_size=None):
+    """The highest e_id after ``low`` that may be folded now, or ``low`` if there is none."""
+    cursor.execute("""
+        SELECT MIN(e_id) FROM tbl_evaluation
+        WHERE e_id > %s AND e_date_submitted > NOW() - INTERVAL %s SECOND
+    """, (low, settle_seconds))
+    unsettled = cursor.fetchone()[0]
+    conditions = ["e_id > %s"]
+    params = [low]
+    if unsettled is not None:
+        conditions.append("e_id < %s")
+        params.append(unsettled)
+    limit = ""
+    if batch_size is not None:
+        limit = "ORDER BY e_id LIMIT %s"
+        params.append(batch_size)
+    cursor.execute(f"""
+        SELECT MAX(e_id) FROM (
+            SELECT e_id FROM tbl_evaluation WHERE {' AND '.join(conditions)} {limit}
+        ) batch
+    """, params)
+    high = cursor.fetchone()[0]
+    return high if high is not None else low
+
+
+def _move_watermark(cursor, high):
+    cursor.execute("UPDATE tbl_report_watermark SET rw_last_e_id = %s, rw_updated_at = NOW() WHERE rw_name = %s",
+                   (high, WATERMARK))
+
+
+def refresh_rollups(db, batch_size=REFRESH_BATCH_SIZE, settle_seconds=SETTLE_SECONDS):
+    """Fold the evaluations past the high-water mark into the rollups, one committed batch at a time."""
+    started = time.perf_counter()
+    start = None
+    high = None
+    batches = 0
+    try:
+        with db.cursor(pymysql.cursors.Cursor) as cursor:
+            while True:
+                low = _lock_watermark(cursor)
+                if start is None:
+                    start = low
+                high = _settled_bound(cursor, low, settle_seconds, batch_size)
+                if high == low:
+                    db.commit()
+                    break
+                _fold(cursor, low, high)
+                _move_watermark(cursor, high)
+                db.commit()
+                batches += 1
+    except Exception:
+        db.rollback()
+        raise
+    return RefreshResult(start, high, batches, time.perf_counter() - started)
+
+
+def rebuild_rollups(db, settle_seconds=SETTLE_SECONDS):
+    """Recompute the rollups from every settled evaluation in one transaction."""
+    started = time.perf_counter()
+    try:
+        with db.cursor(pymysql.cursors.Cursor) as cursor:
+            _lock_watermark(cursor)
+            cursor.execute("DELETE FROM tbl_report_rollup")
+            high = _settled_bound(cursor, 0, settle_seconds)
+            _fold(cursor, 0, high)
+            _move_watermark(cursor, high)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return RefreshResult(0, high, 1, time.perf_counter() - started)
+
+
+def read_rollups(db, dimension, questions):
+    """Average rating per question for every key of ``dimension``.
+
+    Returns [{'label', 'evaluations', 'means'}] ordered by key, with ``means``
+    in the order of ``questions`` (None where a question has no answers).
+    Every evaluation rates every question, so a key's evaluations are its
+    largest per-question count.
+    """
+    with db.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute("""
+            SELECT rr_key, q_id, rr_count, rr_sum
+            FROM tbl_report_rollup
+            WHERE rr_dimension = %s
+            ORDER BY rr_key
+        """, (dimension,))
+        rows = cursor.fetchall()
+    positions = {question.q_id: n for n, question in enumerate(questions)}
+    groups = {}
+    for key, q_id, count, total in rows:
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {'label': key or 'Unspecified', 'evaluations': 0, 'means': [None] * len(questions)}
+        group['evaluations'] = max(group['evaluations'], count)
+        if q_id in positions and count:
+            group['means'][positions[q_id]] = round(total / count, 2)
+    return list(groups.values())
+
+
+def rollup_status(db):
+    """The high-water mark, when it last moved and how many evaluations lie beyond it."""
+    with db.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute("""
+            SELECT w.rw_last_e_id, w.rw_updated_at,
+                   (SELECT COUNT(*) FROM tbl_evaluation e WHERE e.e_id > w.rw_last_e_id)
+            FROM tbl_report_watermark w
+            WHERE w.rw_name = %s
+        """, (WATERMARK,))
+        row = cursor.fetchone()
+    if row is None:
+        return {'last_e_id': 0, 'updated_at': None, 'pending': None}
+    return {'last_e_id': row[0], 'updated_at': row[1], 'pending': row[2]}
+
+
+class RollupScheduler:
+    """Refreshes the rollups every ``interval`` seconds from a background thread.
+
+    Every worker process runs one; a MySQL named lock lets only one of them
+    refresh at a time, and the others skip that round.
+    """
+
+    def __init__(self, db_pool, interval, batch_size=REFRESH_BATCH_SIZE, settle_seconds=SETTLE_SECONDS,
+                 on_error=None):
+        self.db_pool = db_pool
+        self.interval = interval
+        self.batch_size = batch_size
+        self.settle_seconds = settle_seconds
+        self.on_error = on_error
+        self.last_result = None
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def start(self):
+        """Start this process's thread (again after a fork)."""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='rollup-scheduler', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.run_once()
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(e)
+
+    def run_once(self):
+        """Refresh now unless another process is; returns the RefreshResult or None."""
+        db = self.db_pool.acquire()
+        broken = False
+        try:
+            with db.cursor(pymysql.cursors.Cursor) as cursor:
+                cursor.execute("SELECT GET_LOCK(%s, 0)", (ROLLUP_LOCK,))
+                if cursor.fetchone()[0] != 1:
+                    return None
+            try:
+                self.last_result = refresh_rollups(db, self.batch_size, self.settle_seconds)
+            finally:
+                with db.cursor(pymysql.cursors.Cursor) as cursor:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (ROLLUP_LOCK,))
+            return self.last_result
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.db_pool.release(db, discard=broken)
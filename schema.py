@@ -0,0 +1,127 @@
+"""Versioned schema migrations.
+
+Migrations are the numbered ``migrations/NNNN_name.sql`` files, applied in
+order and recorded in ``tbl_schema_migrations`` so each runs exactly once.
+Running ``migrate`` again is a no-op once the database is up to date; it
+never drops existing data.
+"""
+import os
+import re
+
+import pymysql
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_FILE = re.compile(r'^(\d+)_([\w-]+)\.sql$')
+MIGRATION_LOCK = 'evaluation_system_migrate'
+
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    return sorted(migrations)
+
+
+def split_statements(sql):
+    """Split a script on ``;`` outside quotes and ``--``/``#``/``/* */`` comments."""
+    statements = []
+    current = []
+    quote = None
+    i = 0
+    while i < len(sql):
+        char = sql[i]
+        if quote:
+            current.append(char)
+            if char == '\\':
+                current.append(sql[i + 1:i + 2])
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in ("'", '"', '`'):
+            quote = char
+            current.append(char)
+        elif sql.startswith('--', i) or char == '#':
+            end = sql.find('\n', i)
+            i = len(sql) if end == -1 else end
+            continue
+        elif sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            i = len(sql) if end == -1 else end + 2
+            continue
+        elif char == ';':
+            statements.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(char)
+        i += 1
+    statements.append(''.join(current).strip())
+    return [statement for statement in statements if statement]
+
+
+def _applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tbl_schema_migrations (
+            version    INT          PRIMARY KEY,
+            name       VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP    DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM tbl_schema_migrations")
+    applied = {row[0] for row in cursor.fetchall()}
+
+    # Databases created by the old schema.sql already hold the baseline
+    # tables; adopt them as version 1 instead of trying to recreate them.
+    if not applied:
+        cursor.execute("SHOW TABLES LIKE 'tbl_admin'")
+        if cursor.fetchone():
+            cursor.execute("INSERT INTO tbl_schema_migrations (version, name) VALUES (1, 'initial')")
+            applied.add(1)
+    return applied
+
+
+def migrate(connect_kwargs, log=print):
+    """Create the database if needed and apply pending migrations.
+
+    Returns the list of (version, name) pairs that were applied.
+    """
+    database = connect_kwargs['database']
+    conn = pymysql.connect(
+        host=connect_kwargs['host'],
+        user=connect_kwargs['user'],
+        password=connect_kwargs['password'],
+        autocommit=True,
+    )
+    applied_now = []
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}`")
+            cursor.execute(f"USE `{database}`")
+
+            # Several workers may start at once; only one migrates at a time.
+            cursor.execute("SELECT GET_LOCK(%s, 60)", (MIGRATION_LOCK,))
+            if cursor.fetchone()[0] != 1:
+                raise RuntimeError('Timed out waiting for another migration to finish.')
+            try:
+                applied = _applied_versions(cursor)
+                for version, name, path in discover_migrations():
+                    if version in applied:
+                        continue
+                    log(f"Applying migration {version:04d}_{name}...")
+                    with open(path, encoding='utf8') as f:
+                        statements = split_statements(f.read())
+                    # MySQL commits DDL implicitly, so a migration is recorded
+                    # only once all of its statements have succeeded.
+                    for statement in statements:
+                        cursor.execute(statement)
+                    cursor.execute(
+                        "INSERT INTO tbl_schema_migrations (version, name) VALUES (%s, %s)",
+                        (version, name),
+                    )
+                    applied_now.append((version, name))
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+    finally:
+        conn.close()
+    return applied_now
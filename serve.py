@@ -0,0 +1,131 @@
+"""Pre-forking multi-process server.
+
+    python serve.py --workers 4 --port 8000
+
+The master process builds the app once (configuration, shared secret key,
+compiled templates), clears the metrics of the previous run, binds the
+listening socket and forks the workers. Each worker opens its own database
+pool and background threads, then serves requests with a threaded Werkzeug
+server on the shared socket, so all cores are used behind one port. Workers
+that die are replaced; SIGTERM or Ctrl-C stops them all.
+
+Settings come from the usual sources (see app.py); --settings is a shortcut
+for $EVALUATION_SETTINGS. Where os.fork() is not available (Windows) a
+single process serves.
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+from werkzeug.serving import make_server
+
+RESPAWN_DELAY = 1.0  # seconds to wait before replacing a worker that died right after starting
+
+
+def bind_socket(host, port, backlog):
+    sock = socket.create_server((host, port), family=socket.AF_INET6 if ':' in host else socket.AF_INET,
+                                backlog=backlog)
+    sock.set_inheritable(True)
+    # Every worker polls the socket; those that lose the race for a
+    # connection get EAGAIN instead of blocking in accept().
+    sock.setblocking(False)
+    return sock
+
+
+def run_worker(app, sock, host):
+    import app as site
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    site.warm_worker(app)
+    server = make_server(host, sock.getsockname()[1], app, threaded=True, fd=sock.fileno())
+    server.serve_forever()
+
+
+def spawn(app, sock, host):
+    pid = os.fork()
+    if pid == 0:
+        status = 0
+        try:
+            run_worker(app, sock, host)
+        except SystemExit as e:
+            status = e.code or 0
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            status = 1
+        finally:
+            # Run atexit handlers (metrics flush) but never return into the master's code.
+            import atexit
+            atexit._run_exitfuncs()
+            os._exit(status)
+    return pid
+
+
+def supervise(app, sock, host, workers):
+    children = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(workers):
+        children[spawn(app, sock, host)] = time.monotonic()
+    print(f'Serving on http://{host}:{sock.getsockname()[1]} with {workers} worker(s)', flush=True)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+        print(f'Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}; starting a new one',
+              file=sys.stderr, flush=True)
+        if time.monotonic() - started < RESPAWN_DELAY:
+            time.sleep(RESPAWN_DELAY)
+        children[spawn(app, sock, host)] = time.monotonic()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--settings', help='Python settings file (same as $EVALUATION_SETTINGS).')
+    args = parser.parse_args()
+
+    if args.settings:
+        os.environ['EVALUATION_SETTINGS'] = os.path.abspath(args.settings)
+
+    import app as site
+    app = site.app = site.create_app()
+    site.precompile_templates(app)
+    site.metrics.clear()
+
+    if not hasattr(os, 'fork'):
+        site.warm_worker(app)
+        make_server(args.host, args.port, app, threaded=True).serve_forever()
+        return
+
+    sock = bind_socket(args.host, args.port, args.backlog)
+    supervise(app, sock, args.host, args.workers)
+
+
+if __name__ == '__main__':
+    main()
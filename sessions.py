@@ -0,0 +1,273 @@
+"""Server-side sessions.
+
+The session cookie carries only a random id; the data lives in a store:
+
+* ``MemorySessionStore`` - LRU with TTL inside one process (single-process
+  deployments such as ``flask run``).
+* ``SQLiteSessionStore`` - a SQLite file shared by every worker on the host.
+
+A session may also hold a cached profile of the logged-in account (its
+"principal", e.g. ``student:S0000001``), so pages need not look the account
+up on every request. The profile is kept apart from the session data, so
+``forget_profiles(principals)`` can drop it from all of those accounts'
+sessions after an admin changes the account, and ``end_sessions(principal)``
+logs the account out everywhere.
+
+Sessions expire after ``PERMANENT_SESSION_LIFETIME`` without a request;
+their expiry is pushed forward once half of it has passed.
+"""
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+PRINCIPAL_KEY = '_principal'
+PROFILE_KEY = '_profile'
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, principal=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = sid is None
+        self.modified = False
+        self.accessed = True
+        # As loaded, to tell a login (new principal) from other changes.
+        self.loaded_principal = principal
+        self.expires_at = expires_at
+
+
+class MemorySessionStore:
+    """Sessions in this process only; the oldest are evicted beyond ``max_entries``."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # sid -> [data, principal, profile, expires_at]
+        self._by_principal = {}
+
+    def _unindex(self, sid, principal):
+        sids = self._by_principal.get(principal)
+        if sids is not None:
+            sids.discard(sid)
+            if not sids:
+                del self._by_principal[principal]
+
+    def _drop(self, sid):
+        record = self._sessions.pop(sid, None)
+        if record is not None:
+            self._unindex(sid, record[1])
+
+    def load(self, sid):
+        with self._lock:
+            record = self._sessions.get(sid)
+            if record is None:
+                return None
+            if record[3] < time.time():
+                self._drop(sid)
+                return None
+            self._sessions.move_to_end(sid)
+            return tuple(record)
+
+    def save(self, sid, data, principal, profile, expires_at):
+        with self._lock:
+            self._drop(sid)
+            self._sessions[sid] = [data, principal, profile, expires_at]
+            if principal is not None:
+                self._by_principal.setdefault(principal, set()).add(sid)
+            while len(self._sessions) > self.max_entries:
+                self._drop(next(iter(self._sessions)))
+
+    def touch(self, sid, expires_at):
+        with self._lock:
+            record = self._sessions.get(sid)
+            if record is not None:
+                record[3] = expires_at
+
+    def delete(self, sid):
+        with self._lock:
+            self._drop(sid)
+
+    def forget_profiles(self, principals):
+        with self._lock:
+            for principal in principals:
+                for sid in self._by_principal.get(principal, ()):
+                    self._sessions[sid][2] = None
+
+    def end_sessions(self, principal):
+        with self._lock:
+            for sid in list(self._by_principal.get(principal, ())):
+                self._drop(sid)
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'sessions': len(self._sessions), 'max_entries': self.max_entries}
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    sid        TEXT PRIMARY KEY,
+    data       TEXT NOT NULL,
+    principal  TEXT,
+    profile    TEXT,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_principal ON sessions (principal);
+CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at);
+"""
+
+
+class SQLiteSessionStore:
+    """Sessions in a SQLite file shared by all worker processes on the host."""
+
+    def __init__(self, path, purge_interval=300):
+        self.path = path
+        self.purge_interval = purge_interval
+        self._lock = threading.Lock()
+        self._pid = None
+        self._idle = []
+        self._last_purge = time.monotonic()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connection(self):
+        # A few reusable connections per process instead of one per call,
+        # since every request loads its session.
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._idle = []
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            yield conn
+        except Exception:
+            conn.close()
+            raise
+        with self._lock:
+            if self._pid == os.getpid():
+                self._idle.append(conn)
+
+    def load(self, sid):
+        with self._connection() as conn:
+            row = conn.execute("SELECT data, principal, profile, expires_at FROM sessions WHERE sid = ?",
+                               (sid,)).fetchone()
+        if row is None or row[3] < time.time():
+            return None
+        return row
+
+    def save(self, sid, data, principal, profile, expires_at):
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO sessions (sid, data, principal, profile, expires_at) "
+                         "VALUES (?, ?, ?, ?, ?)", (sid, data, principal, profile, expires_at))
+            if time.monotonic() - self._last_purge >= self.purge_interval:
+                self._last_purge = time.monotonic()
+                conn.execute("DELETE FROM sessions WHERE expires_at < ?", (time.time(),))
+
+    def touch(self, sid, expires_at):
+        with self._connection() as conn:
+            conn.execute("UPDATE sessions SET expires_at = ? WHERE sid = ?", (expires_at, sid))
+
+    def delete(self, sid):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def forget_profiles(self, principals):
+        with self._connection() as conn:
+            conn.execute("BEGIN")
+            conn.executemany("UPDATE sessions SET profile = NULL WHERE principal = ?",
+                             [(principal,) for principal in principals])
+            conn.execute("COMMIT")
+
+    def end_sessions(self, principal):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE principal = ?", (principal,))
+
+    def stats(self):
+        with self._connection() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM sessions WHERE expires_at >= ?", (time.time(),)).fetchone()[0]
+        return {'backend': 'sqlite', 'sessions': count}
+
+
+class ServerSideSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        return self.load(request.cookies.get(self.get_cookie_name(app)))
+
+    def save_session(self, app, session, response):
+        self.set_cookie(app, session, response, self.persist(app, session))
+
+    # The steps below are shared with the async serving mode (asgi.py).
+
+    def load(self, sid):
+        record = self.store.load(sid) if sid else None
+        if record is None:
+            return ServerSideSession()
+        data, principal, profile, expires_at = record
+        data = self.serializer.loads(data)
+        if profile is not None:
+            data[PROFILE_KEY] = self.serializer.loads(profile)
+        return ServerSideSession(data, sid, principal, expires_at)
+
+    def persist(self, app, session):
+        """Store the session; returns the id for the cookie, '' to delete it or None to leave it."""
+        if not session:
+            if session.sid is not None:
+                self.store.delete(session.sid)
+                return ''
+            return None
+
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        expires_at = time.time() + lifetime
+        if not session.modified:
+            if session.expires_at - time.time() < lifetime / 2:
+                self.store.touch(session.sid, expires_at)
+            return None
+
+        data = dict(session)
+        profile = data.pop(PROFILE_KEY, None)
+        principal = data.get(PRINCIPAL_KEY)
+        sid = session.sid
+        if sid is None or principal != session.loaded_principal:
+            # A new id on every login, so an id planted beforehand is worthless.
+            if sid is not None:
+                self.store.delete(sid)
+            sid = secrets.token_urlsafe(32)
+        self.store.save(sid, self.serializer.dumps(data), principal,
+                        self.serializer.dumps(profile) if profile is not None else None, expires_at)
+        return sid
+
+    def set_cookie(self, app, session, response, sid):
+        response.vary.add('Cookie')
+        if sid is None:
+            return
+        name = self.get_cookie_name(app)
+        options = {
+            'domain': self.get_cookie_domain(app),
+            'path': self.get_cookie_path(app),
+            'secure': self.get_cookie_secure(app),
+            'samesite': self.get_cookie_samesite(app),
+            'httponly': self.get_cookie_httponly(app),
+        }
+        if sid == '':
+            response.delete_cookie(name, **options)
+        else:
+            response.set_cookie(name, sid, expires=self.get_expiration_time(app, session), **options)
@@ -0,0 +1,276 @@
+"""Write-behind queue for evaluation submissions.
+
+Validated submissions are stored in a local SQLite file and acknowledged
+at once. Background threads in every worker process claim them in batches
+and write each batch to MySQL in a single transaction through
+``save_evaluation``, so a burst of submissions costs the database one
+commit per batch instead of one per student.
+
+A partial unique index on (school_id, instructor_id) keeps a student from
+queueing the same instructor twice; ``unique_evaluation`` in MySQL remains
+the final authority. Rows move through ``queued`` -> ``processing`` and are
+deleted once saved, or end as ``duplicate`` / ``failed`` so the student can
+see what happened. If MySQL cannot be reached the batch goes back to
+``queued`` and the threads back off; claims left ``processing`` by a
+crashed worker are requeued after ``stale_after`` seconds.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import pymysql
+
+from evaluations import DuplicateEvaluation, save_evaluation
+
+QUEUED = 'queued'
+PROCESSING = 'processing'
+DUPLICATE = 'duplicate'
+FAILED = 'failed'
+PENDING_STATES = (QUEUED, PROCESSING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    school_id     TEXT    NOT NULL,
+    instructor_id INTEGER NOT NULL,
+    remarks       TEXT,
+    ratings       TEXT    NOT NULL,
+    status        TEXT    NOT NULL DEFAULT 'queued',
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    error         TEXT,
+    claimed_by    TEXT,
+    claimed_at    REAL,
+    created_at    REAL    NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_submissions_pending
+    ON submissions (school_id, instructor_id) WHERE status IN ('queued', 'processing');
+CREATE INDEX IF NOT EXISTS idx_submissions_status ON submissions (status, id);
+CREATE INDEX IF NOT EXISTS idx_submissions_student ON submissions (school_id);
+"""
+
+
+class AlreadyQueued(Exception):
+    pass
+
+
+class SubmissionQueue:
+    def __init__(self, path, db_pool, batch_size=100, workers=2, poll_interval=0.5,
+                 stale_after=300, retention=7 * 24 * 3600, on_saved=None):
+        self.path = path
+        self.db_pool = db_pool
+        self.batch_size = batch_size
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.retention = retention
+        self.on_saved = on_saved
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pid = None
+        self._threads = []
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # --- Web tier ---
+
+    def enqueue(self, school_id, instructor_id, remarks, ratings):
+        """Store a validated submission (``instructor_id`` an int); raises AlreadyQueued for a pending duplicate."""
+        conn = self._connect()
+        try:
+            # Earlier attempts that did not go through are superseded.
+            conn.execute(
+                "DELETE FROM submissions WHERE school_id = ? AND instructor_id = ? "
+                "AND status IN ('duplicate', 'failed')", (school_id, instructor_id)
+            )
+            cursor = conn.execute(
+                "INSERT INTO submissions (school_id, instructor_id, remarks, ratings, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (school_id, instructor_id, remarks, json.dumps(ratings), time.time()),
+            )
+            submission_id = cursor.lastrowid
+        except sqlite3.IntegrityError:
+            raise AlreadyQueued(school_id, instructor_id)
+        finally:
+            conn.close()
+        self.start()
+        self._wakeup.set()
+        return submission_id
+
+    def for_student(self, school_id):
+        """The student's submissions that are still pending or did not go through."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT id, instructor_id, status, error, created_at FROM submissions "
+                "WHERE school_id = ? ORDER BY id", (school_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+    def stats(self):
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM submissions GROUP BY status").fetchall()
+        finally:
+            conn.close()
+        return {row['status']: row['n'] for row in rows}
+
+    # --- Workers ---
+
+    def start(self):
+        """Start this process's drain threads (again after a fork)."""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._threads = [
+                threading.Thread(target=self._run, name=f'submission-queue-{n}', daemon=True)
+                for n in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def _run(self):
+        delay = self.poll_interval
+        while True:
+            try:
+                processed = self.drain_once()
+                delay = self.poll_interval
+            except Exception:
+                processed = 0
+                delay = min(delay * 2, 30)
+            if not processed:
+                self._wakeup.wait(delay)
+                self._wakeup.clear()
+
+    def _claim(self, conn):
+        token = uuid.uuid4().hex
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE submissions SET status = 'queued', claimed_by = NULL "
+                "WHERE status = 'processing' AND claimed_at < ?", (now - self.stale_after,)
+            )
+            conn.execute(
+                "UPDATE submissions SET status = 'processing', claimed_by = ?, claimed_at = ?, "
+                "attempts = attempts + 1 "
+                "WHERE id IN (SELECT id FROM submissions WHERE status = 'queued' ORDER BY id LIMIT ?)",
+                (token, now, self.batch_size),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return conn.execute("SELECT * FROM submissions WHERE claimed_by = ? ORDER BY id", (token,)).fetchall()
+
+    def drain_once(self):
+        """Claim and write one batch; returns the number of submissions handled.
+
+        Raises if the batch could not be written; it is queued again first.
+        """
+        conn = self._connect()
+        try:
+            batch = self._claim(conn)
+            if not batch:
+                conn.execute("DELETE FROM submissions WHERE status IN ('duplicate', 'failed') AND created_at < ?",
+                             (time.time() - self.retention,))
+                return 0
+            try:
+                outcomes = self._write_batch(batch)
+            except Exception as e:
+                self._record_outcomes(conn, {row['id']: (QUEUED, str(e)) for row in batch})
+                raise
+            self._record_outcomes(conn, outcomes)
+            return len(batch)
+        finally:
+            conn.close()
+
+    def _write_batch(self, batch):
+        """Write a batch in one MySQL transaction; maps submission id to (status, error).
+
+        A status of None means the evaluation is stored.
+        """
+        outcomes = {}
+        db = self.db_pool.acquire()
+        broken = False
+        try:
+            with db.cursor() as cursor:
+                for row in batch:
+                    ratings = {int(q_id): rating for q_id, rating in json.loads(row['ratings']).items()}
+                    # A savepoint per submission, so one bad row does not
+                    # undo the rest of the batch.
+                    cursor.execute("SAVEPOINT submission")
+                    try:
+                        save_evaluation(cursor, row['school_id'], row['instructor_id'], row['remarks'], ratings)
+                    except DuplicateEvaluation:
+                        cursor.execute("ROLLBACK TO SAVEPOINT submission")
+                        # On a retry the earlier attempt may have committed
+                        # before its worker died or lost the connection; the
+                        # stored row is this one only if it has these answers.
+                        saved = row['attempts'] > 1 and self._is_stored(db, row, ratings)
+                        outcomes[row['id']] = (None, None) if saved else (DUPLICATE, None)
+                    except Exception as e:
+                        cursor.execute("ROLLBACK TO SAVEPOINT submission")
+                        outcomes[row['id']] = (FAILED, str(e))
+                    else:
+                        outcomes[row['id']] = (None, None)
+            db.commit()
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.db_pool.release(db, discard=broken)
+
+        # on_saved gets the instructor id of every stored evaluation.
+        saved = [row['instructor_id'] for row in batch if outcomes[row['id']][0] is None]
+        if saved and self.on_saved:
+            self.on_saved(saved)
+        return outcomes
+
+    @staticmethod
+    def _is_stored(db, row, ratings):
+        """Whether the student's stored evaluation of the instructor has exactly this submission's answers."""
+        with db.cursor(pymysql.cursors.Cursor) as cursor:
+            cursor.execute("""
+                SELECT e.remarks, ed.q_id, ed.rating_value
+                FROM tbl_evaluation e
+                LEFT JOIN tbl_evaluation_details ed ON ed.e_id = e.e_id
+                WHERE e.s_schoolID = %s AND e.i_id = %s
+            """, (row['school_id'], row['instructor_id']))
+            stored = cursor.fetchall()
+        if not stored:
+            return False
+        stored_ratings = {q_id: rating for _, q_id, rating in stored if q_id is not None}
+        return (stored[0][0] or '') == (row['remarks'] or '') and stored_ratings == ratings
+
+    def _record_outcomes(self, conn, outcomes):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for submission_id, (status, error) in outcomes.items():
+                if status is None:
+                    conn.execute("DELETE FROM submissions WHERE id = ?", (submission_id,))
+                    continue
+                conn.execute(
+                    "UPDATE submissions SET status = ?, error = ?, claimed_by = NULL WHERE id = ?",
+                    (status, error, submission_id),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise